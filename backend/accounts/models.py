@@ -3,10 +3,12 @@ from django.conf import settings
 from django.contrib.auth.models import AbstractUser, Group
 from django.db import models
 from django.db.models.functions import Lower
+from django.db.models.signals import m2m_changed, post_delete
+from django.dispatch import receiver
 from django.utils.translation import gettext as _
 from model_utils.models import TimeStampedModel
 
-from civil_society_vote.common.cache import cache_decorator
+from civil_society_vote.common.cache import cache_decorator, delete_cache_key
 
 # NOTE: If you change the group names here, make sure you also update the names in the live database before deployment
 STAFF_GROUP = "Code4Romania Staff"
@@ -16,6 +18,8 @@ SUPPORT_GROUP = "Support Staff"
 NGO_GROUP = "ONG"
 NGO_USERS_GROUP = "ONG Users"
 
+COMMITTEE_SIZE_CACHE_KEY = "committee_size"
+
 
 class User(AbstractUser, TimeStampedModel):
     # We ignore the "username" field because we will use the email for the authentication
@@ -116,5 +120,23 @@ class CommissionUser(User):
         verbose_name_plural = _("Commission users")
 
 
+@cache_decorator(cache_key=COMMITTEE_SIZE_CACHE_KEY, timeout=settings.TIMEOUT_CACHE_NORMAL)
+def get_committee_size() -> int:
+    """
+    The number of electoral committee members, used as the quorum for confirming a candidate
+    """
+    return User.objects.filter(groups__name=COMMITTEE_GROUP).count()
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def reset_committee_size_on_groups_change(**_):
+    delete_cache_key(COMMITTEE_SIZE_CACHE_KEY)
+
+
+@receiver(post_delete, sender=User)
+def reset_committee_size_on_user_delete(**_):
+    delete_cache_key(COMMITTEE_SIZE_CACHE_KEY)
+
+
 auditlog.register(User, exclude_fields=["password", "last_login"])
 auditlog.register(GroupProxy)
@@ -0,0 +1,87 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from auditlog.cid import get_cid
+from auditlog.context import disable_auditlog
+from auditlog.diff import model_instance_diff
+from auditlog.models import LogEntry
+from django.contrib.contenttypes.models import ContentType
+from django.db import models, transaction
+from django.db.models import QuerySet
+from django.db.models.deletion import Collector
+from django.db.models.signals import pre_save
+from django.utils.encoding import smart_str
+
+AUDIT_BATCH_SIZE = 1000
+
+
+def _build_log_entry(instance: models.Model, action: int, changes: Optional[Dict], cid: Optional[str]) -> LogEntry:
+    log_entry = LogEntry(
+        content_type=ContentType.objects.get_for_model(instance),
+        object_pk=smart_str(instance.pk),
+        object_repr=smart_str(instance),
+        action=action,
+        changes=changes,
+        cid=cid,
+    )
+    if isinstance(instance.pk, int):
+        log_entry.object_id = instance.pk
+
+    # The auditlog middleware sets the actor and the remote address through a pre_save receiver,
+    # which bulk_create doesn't trigger, so we dispatch the signal ourselves before writing the batch
+    pre_save.send(sender=LogEntry, instance=log_entry, raw=False, using=None, update_fields=None)
+
+    return log_entry
+
+
+def bulk_log_changes(instances_with_changes: Iterable[Tuple[models.Model, Dict[str, List[str]]]]) -> List[LogEntry]:
+    """
+    Write one UPDATE audit entry for every (instance, changes) pair with a single bulk insert.
+    The changes have the same format as the ones computed by auditlog: {field_name: [old_value, new_value]}.
+    """
+    cid = get_cid()
+    log_entries = [
+        _build_log_entry(instance, LogEntry.Action.UPDATE, changes, cid)
+        for instance, changes in instances_with_changes
+        if changes
+    ]
+
+    return LogEntry.objects.bulk_create(log_entries, batch_size=AUDIT_BATCH_SIZE)
+
+
+def bulk_log_deletions(instances: Iterable[models.Model]) -> List[LogEntry]:
+    """
+    Write one DELETE audit entry for every instance with a single bulk insert.
+    """
+    cid = get_cid()
+    log_entries = [
+        _build_log_entry(instance, LogEntry.Action.DELETE, model_instance_diff(instance, None), cid)
+        for instance in instances
+    ]
+
+    return LogEntry.objects.bulk_create(log_entries, batch_size=AUDIT_BATCH_SIZE)
+
+
+def bulk_delete_with_audit(queryset: QuerySet) -> int:
+    """
+    Delete all the rows of the queryset while keeping an audit record for each of them, written with a single
+    bulk insert instead of the per-row auditlog signals.
+
+    The rows go through Django's deletion collector, so the CASCADE relations are followed and the pre_delete and
+    post_delete receivers (e.g., the counters and the cached pages) are run for every row. Only the auditlog ones
+    are disabled, so the related rows must be deleted beforehand to keep an audit record of them.
+    A receiver which does a query per row should offer a way to do its work once for the batch
+    (see CandidateConfirmation.bulk_delete).
+    """
+    with transaction.atomic():
+        instances = list(queryset)
+        if not instances:
+            return 0
+
+        bulk_log_deletions(instances)
+
+        collector = Collector(using=queryset.db, origin=queryset)
+        collector.collect(instances)
+        with disable_auditlog():
+            _, deleted_counts = collector.delete()
+
+    return deleted_counts.get(queryset.model._meta.label, 0)
@@ -1,18 +1,44 @@
+import inspect
+import time
+
 from django.conf import settings
 from django.core.cache import cache
+from django.core.cache.backends.db import DatabaseCache
+
+from civil_society_vote.common.instrumentation import record_cache_lookup
+from civil_society_vote.common.metrics import record_cache_lookups
+
+
+class InstrumentedDatabaseCache(DatabaseCache):
+    """
+    The database cache, which counts the hits and the misses of the current request and of the process
+    """
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+
+        started: float = time.perf_counter()
+        values = super().get_many(keys, version)
+        record_cache_lookup(len(values), len(keys) - len(values), (time.perf_counter() - started) * 1000)
+        record_cache_lookups(len(values), len(keys) - len(values))
+
+        return values
 
 
 def cache_decorator(*, timeout: int, cache_key: str = None, cache_key_prefix: str = None):
     def decorator(func):
-        def wrapper(*args, **kwargs):
+        def get_cache_key(*args, **kwargs) -> str:
             if not cache_key and not cache_key_prefix:
                 raise ValueError("Either cache_key or cache_key_prefix must be provided")
 
             if cache_key:
-                _cache_key = cache_key
-            else:
-                cache_suffix = str(hash(f"{func.__name__}__{str(args)}_{str(kwargs)}")).encode("utf-8").hex()
-                _cache_key: str = f"{cache_key_prefix}__{cache_suffix}"
+                return cache_key
+
+            cache_suffix = str(hash(f"{func.__name__}__{str(args)}_{str(kwargs)}")).encode("utf-8").hex()
+            return f"{cache_key_prefix}__{cache_suffix}"
+
+        def wrapper(*args, **kwargs):
+            _cache_key: str = get_cache_key(*args, **kwargs)
 
             if settings.ENABLE_CACHE:
                 sentinel = object()
@@ -27,6 +53,25 @@ def cache_decorator(*, timeout: int, cache_key: str = None, cache_key_prefix: st
 
             return return_value
 
+        async def async_wrapper(*args, **kwargs):
+            _cache_key: str = get_cache_key(*args, **kwargs)
+
+            if settings.ENABLE_CACHE:
+                sentinel = object()
+                cached_value = await cache.aget(_cache_key, sentinel)
+                if cached_value is not sentinel:
+                    return cached_value
+
+            return_value = await func(*args, **kwargs)
+
+            if settings.ENABLE_CACHE:
+                await cache.aset(_cache_key, return_value, timeout=timeout)
+
+            return return_value
+
+        if inspect.iscoroutinefunction(func):
+            return async_wrapper
+
         return wrapper
 
     return decorator
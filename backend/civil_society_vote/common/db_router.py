@@ -0,0 +1,163 @@
+"""
+Read replicas for the read-only pages.
+
+The queries go to the primary database, except for the reads of the GET requests served by the views with
+`read_replica = True` and by the admin changelists, which go to one of the replicas (DATABASE_REPLICAS).
+
+A user reads from the primary database for DATABASE_REPLICA_STICKINESS seconds after any request of theirs
+which wrote to it (e.g., voting or editing), so they always see their own changes, and everyone reads from
+the primary database when the replicas are more than DATABASE_REPLICA_MAX_LAG seconds behind it.
+The pages which may be stored in the page cache are always rendered from the primary database.
+"""
+
+import logging
+import math
+import random
+import re
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Set, Tuple
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.db import DatabaseCache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+# The cookie which keeps the reads of a user on the primary database after their writes
+PRIMARY_DATABASE_COOKIE = "use_primary_db"
+
+# The tables which must always be read along with the latest writes
+PRIMARY_ONLY_APPS = ("django_cache", "django_q", "sessions")
+
+# The statements which write to a table, along with the name of the table
+WRITE_STATEMENT_PATTERN = re.compile(r'\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM)\s+"?([^\s"(]+)', re.IGNORECASE)
+
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+
+class RequestDatabaseState:
+    __slots__ = ("replica_allowed", "wrote_to_primary", "replica_alias")
+
+    def __init__(self):
+        self.replica_allowed: bool = False
+        self.wrote_to_primary: bool = False
+        self.replica_alias: Optional[str] = None
+
+
+_request_database_state: ContextVar[Optional[RequestDatabaseState]] = ContextVar("request_database_state", default=None)
+
+# The last lag of every replica (in seconds) measured by this process, along with the time it was measured
+_replica_lags: Dict[str, Tuple[float, float]] = {}
+
+
+def start_request_database_state() -> RequestDatabaseState:
+    state = RequestDatabaseState()
+    _request_database_state.set(state)
+
+    return state
+
+
+def allow_replica_reads():
+    state: Optional[RequestDatabaseState] = _request_database_state.get()
+    if state:
+        state.replica_allowed = True
+
+
+def get_primary_only_tables() -> Set[str]:
+    """
+    The tables of the PRIMARY_ONLY_APPS and of the database caches, which are never read from the replicas
+    """
+    tables: Set[str] = {
+        model._meta.db_table
+        for model in apps.get_models(include_auto_created=True)
+        if model._meta.app_label in PRIMARY_ONLY_APPS
+    }
+    tables.update(
+        cache._table for cache in map(caches.__getitem__, settings.CACHES) if isinstance(cache, DatabaseCache)
+    )
+
+    return tables
+
+
+def record_primary_writes(execute, sql, params, many, context):
+    """
+    Execute wrapper of the primary database connection, which notes the requests that changed its data.
+
+    The writes to the tables which are never read from the replicas (e.g., the cache misses stored in the
+    database cache) don't keep the user on the primary database.
+    """
+    state: Optional[RequestDatabaseState] = _request_database_state.get()
+    if state and not state.wrote_to_primary:
+        write_statement = WRITE_STATEMENT_PATTERN.match(sql)
+        if write_statement and write_statement.group(1) not in get_primary_only_tables():
+            state.wrote_to_primary = True
+
+    return execute(sql, params, many, context)
+
+
+def end_request_database_state():
+    _request_database_state.set(None)
+
+
+def get_replica_lag(alias: str) -> float:
+    now: float = time.monotonic()
+    measured_lag: Optional[Tuple[float, float]] = _replica_lags.get(alias)
+    if measured_lag and now - measured_lag[0] < settings.DATABASE_REPLICA_LAG_CHECK_INTERVAL:
+        return measured_lag[1]
+
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(REPLICA_LAG_SQL)
+            lag = float(cursor.fetchone()[0] or 0)
+    except DatabaseError:
+        logger.warning("Cannot read the replication lag of the '%s' database", alias, exc_info=True)
+        lag = math.inf
+
+    _replica_lags[alias] = (now, lag)
+
+    return lag
+
+
+def get_replica_alias() -> Optional[str]:
+    """
+    One of the replicas which are not too far behind the primary database, or None if there's none
+    """
+    replicas: List[str] = [
+        alias for alias in settings.DATABASE_REPLICAS if get_replica_lag(alias) <= settings.DATABASE_REPLICA_MAX_LAG
+    ]
+
+    return random.choice(replicas) if replicas else None
+
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints) -> str:
+        state: Optional[RequestDatabaseState] = _request_database_state.get()
+        if not state or not state.replica_allowed or state.wrote_to_primary:
+            return DEFAULT_DB_ALIAS
+
+        if model._meta.app_label in PRIMARY_ONLY_APPS or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+
+        # The same replica is used for the whole request
+        if state.replica_alias is None:
+            state.replica_alias = get_replica_alias() or DEFAULT_DB_ALIAS
+
+        return state.replica_alias
+
+    def db_for_write(self, model, **hints) -> str:
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        # The replicas have the same data as the primary database
+        return True
+
+    def allow_migrate(self, db: str, app_label: str, **hints) -> bool:
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,113 @@
+"""
+The metrics of the current request: the database queries, the cache lookups and the time spent calling NGO Hub
+and the file storage, collected by the RequestMetricsMiddleware.
+
+Outside a request (e.g., in the background tasks) nothing is collected.
+"""
+
+import heapq
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+# The external services timed along with the database and the cache
+SERVICE_NGOHUB = "ngohub"
+SERVICE_STORAGE = "storage"
+
+
+@dataclass
+class RequestMetrics:
+    started: float = field(default_factory=time.perf_counter)
+    queries: int = 0
+    # All the durations are in milliseconds
+    query_time: float = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    cache_time: float = 0
+    service_calls: Dict[str, int] = field(default_factory=dict)
+    service_time: Dict[str, float] = field(default_factory=dict)
+    # The services being called, whose nested calls (e.g., a storage save checking if the file exists) aren't counted
+    active_services: Set[str] = field(default_factory=set)
+    # A heap with the slowest statements, as (duration, SQL) pairs
+    slowest_queries: List[Tuple[float, str]] = field(default_factory=list)
+    slowest_queries_count: int = 5
+
+    @property
+    def duration(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def add_query(self, sql: str, duration: float):
+        self.queries += 1
+        self.query_time += duration
+
+        if len(self.slowest_queries) < self.slowest_queries_count:
+            heapq.heappush(self.slowest_queries, (duration, sql))
+        elif duration > self.slowest_queries[0][0]:
+            heapq.heapreplace(self.slowest_queries, (duration, sql))
+
+    def add_service_call(self, service: str, duration: float):
+        self.service_calls[service] = self.service_calls.get(service, 0) + 1
+        self.service_time[service] = self.service_time.get(service, 0) + duration
+
+    def get_slowest_queries(self) -> List[Tuple[float, str]]:
+        return sorted(self.slowest_queries, reverse=True)
+
+
+_request_metrics: ContextVar[Optional[RequestMetrics]] = ContextVar("request_metrics", default=None)
+
+
+def start_request_metrics(slowest_queries_count: int) -> RequestMetrics:
+    metrics = RequestMetrics(slowest_queries_count=slowest_queries_count)
+    _request_metrics.set(metrics)
+
+    return metrics
+
+
+def end_request_metrics():
+    _request_metrics.set(None)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper of the database connections, which times the queries of the current request
+    """
+    metrics: Optional[RequestMetrics] = _request_metrics.get()
+    if not metrics:
+        return execute(sql, params, many, context)
+
+    started: float = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(sql, (time.perf_counter() - started) * 1000)
+
+
+def record_cache_lookup(hits: int, misses: int, duration: float):
+    metrics: Optional[RequestMetrics] = _request_metrics.get()
+    if not metrics:
+        return
+
+    metrics.cache_hits += hits
+    metrics.cache_misses += misses
+    metrics.cache_time += duration
+
+
+@contextmanager
+def measure_service_call(service: str):
+    """
+    Add the time spent in the block to the time spent calling the given service (e.g., SERVICE_NGOHUB)
+    """
+    metrics: Optional[RequestMetrics] = _request_metrics.get()
+    if not metrics or service in metrics.active_services:
+        yield
+        return
+
+    metrics.active_services.add(service)
+    started: float = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.active_services.discard(service)
+        metrics.add_service_call(service, (time.perf_counter() - started) * 1000)
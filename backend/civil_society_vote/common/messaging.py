@@ -2,11 +2,14 @@ import logging
 from typing import Dict, List, Optional
 
 from django.conf import settings
-from django.core.mail import EmailMultiAlternatives
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.template.loader import get_template, render_to_string
 from django.utils.translation import gettext_lazy as _
 from django_q.tasks import async_task
 
+from civil_society_vote.common.metrics import EMAILS
+from civil_society_vote.common.tracing import trace
+
 logger = logging.getLogger(__name__)
 
 
@@ -26,6 +29,23 @@ def send_email(
         raise ValueError(_("Invalid email send method. Must be 'async' or 'sync'."))
 
 
+def send_email_batch(messages: List[Dict], from_email: Optional[str] = None):
+    """
+    Send a batch of emails as a single background task (or synchronously, depending on the settings).
+    Each message is a dictionary with the "subject", "to_emails", "text_template", "html_template" & "context" keys.
+    """
+    if not messages:
+        return
+
+    if settings.EMAIL_SEND_METHOD == "async":
+        logger.info(f"Asynchronously sending a batch of {len(messages)} emails.")
+        async_task(send_emails_batch, messages, from_email, cluster=settings.BACKGROUND_QUEUE_BATCH)
+    elif settings.EMAIL_SEND_METHOD == "sync":
+        send_emails_batch(messages, from_email)
+    else:
+        raise ValueError(_("Invalid email send method. Must be 'async' or 'sync'."))
+
+
 def async_send_email(
     subject: str,
     to_emails: List[str],
@@ -44,6 +64,7 @@ def async_send_email(
         html_template,
         html_context,
         from_email,
+        cluster=settings.BACKGROUND_QUEUE_NOTIFICATIONS,
     )
 
 
@@ -54,21 +75,47 @@ def send_emails(
     html_template: str,
     html_context: Dict,
     from_email: Optional[str] = None,
+    connection=None,
 ):
     logger.info(f"Sending emails to {len(user_emails)} users.")
 
-    for email in user_emails:
-        text_body = render_to_string(text_template, context=html_context)
+    text_body = render_to_string(text_template, context=html_context)
 
-        html = get_template(html_template)
-        html_content = html.render(html_context)
+    html = get_template(html_template)
+    html_content = html.render(html_context)
 
-        if not from_email:
-            from_email = (
-                settings.DEFAULT_FROM_EMAIL if hasattr(settings, "DEFAULT_FROM_EMAIL") else settings.NO_REPLY_EMAIL
-            )
+    if not from_email:
+        from_email = settings.DEFAULT_FROM_EMAIL if hasattr(settings, "DEFAULT_FROM_EMAIL") else settings.NO_REPLY_EMAIL
+
+    with trace("email.send", "Send the emails", recipients=len(user_emails), template=html_template):
+        for email in user_emails:
+            msg = EmailMultiAlternatives(subject, text_body, from_email, [email], connection=connection)
+            msg.attach_alternative(html_content, "text/html")
+
+            try:
+                msg.send(fail_silently=False)
+            except Exception:
+                EMAILS.labels(result="failed").inc()
+                raise
 
-        msg = EmailMultiAlternatives(subject, text_body, from_email, [email])
-        msg.attach_alternative(html_content, "text/html")
+            EMAILS.labels(result="sent").inc()
 
-        msg.send(fail_silently=False)
+
+def send_emails_batch(messages: List[Dict], from_email: Optional[str] = None):
+    """
+    Send several differently rendered emails reusing a single connection to the email backend.
+    Each message is a dictionary with the arguments of `send_emails`.
+    """
+    logger.info(f"Sending a batch of {len(messages)} emails.")
+
+    with get_connection() as connection:
+        for message in messages:
+            send_emails(
+                message["to_emails"],
+                message["subject"],
+                message["text_template"],
+                message["html_template"],
+                message["context"],
+                from_email,
+                connection=connection,
+            )
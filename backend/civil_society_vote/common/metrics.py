@@ -0,0 +1,125 @@
+"""
+Prometheus metrics of the web requests, the background tasks and the election activity.
+
+With the PROMETHEUS_MULTIPROC_DIR environment variable set (as in the container, where the gunicorn workers and
+the qcluster processes run side by side), every process writes its values to that directory and the scrape endpoint
+adds them up. The directory must be emptied before the processes start.
+
+The depth of the task queues (from the broker) and the recent votes and supports (from the database) are read
+when the metrics are scraped.
+"""
+
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.dispatch import receiver
+from django.utils import timezone
+from django_q.brokers import get_broker
+from django_q.signals import post_execute
+from django_q.utils import get_func_repr
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+HTTP_REQUESTS = Counter(
+    "votong_http_requests",
+    "Requests served, by URL name",
+    ["method", "url_name", "status"],
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "votong_http_request_duration_seconds",
+    "Duration of the requests, by URL name",
+    ["method", "url_name"],
+    buckets=(0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+CACHE_LOOKUPS = Counter(
+    "votong_cache_lookups",
+    "Keys looked up in the cache, by result (hit or miss)",
+    ["result"],
+)
+TASK_DURATION = Histogram(
+    "votong_task_duration_seconds",
+    "Duration of the background tasks, by function and result (success or failure)",
+    ["func", "result"],
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 900),
+)
+NGOHUB_UPDATES = Counter(
+    "votong_ngohub_updates",
+    "Organizations updated from NGO Hub, by result (success, errors or failure)",
+    ["result"],
+)
+EMAILS = Counter(
+    "votong_emails",
+    "Emails sent, by result (sent or failed)",
+    ["result"],
+)
+
+# The period over which the recent votes and supports are counted
+ACTIVITY_PERIOD = timedelta(minutes=1)
+
+
+class ElectionCollector:
+    """
+    The metrics read from the broker and the database on every scrape
+    """
+
+    def collect(self):
+        from hub.models import CandidateSupporter, CandidateVote
+
+        queue_depth = GaugeMetricFamily("votong_queue_depth", "Background tasks waiting, by queue", labels=["queue"])
+        for queue in settings.BACKGROUND_QUEUES:
+            queue_depth.add_metric([queue], get_broker(queue).queue_size())
+        yield queue_depth
+
+        since = timezone.now() - ACTIVITY_PERIOD
+        votes = GaugeMetricFamily("votong_votes_last_minute", "Votes cast in the last minute")
+        votes.add_metric([], CandidateVote.objects.filter(created__gte=since).count())
+        yield votes
+
+        supports = GaugeMetricFamily("votong_supports_last_minute", "Candidate supports given in the last minute")
+        supports.add_metric([], CandidateSupporter.objects.filter(created__gte=since).count())
+        yield supports
+
+
+def record_request(method: str, url_name: str, status_code: int, duration: float):
+    HTTP_REQUESTS.labels(method=method, url_name=url_name, status=str(status_code)).inc()
+    HTTP_REQUEST_DURATION.labels(method=method, url_name=url_name).observe(duration)
+
+
+def record_cache_lookups(hits: int, misses: int):
+    if hits:
+        CACHE_LOOKUPS.labels(result="hit").inc(hits)
+    if misses:
+        CACHE_LOOKUPS.labels(result="miss").inc(misses)
+
+
+@receiver(post_execute)
+def record_task(sender, task: dict, **kwargs):
+    """
+    Time the background tasks, after the cluster monitor saves their results
+    """
+    if not task.get("started") or not task.get("stopped"):
+        return
+
+    TASK_DURATION.labels(
+        func=get_func_repr(task["func"]),
+        result="success" if task.get("success") else "failure",
+    ).observe((task["stopped"] - task["started"]).total_seconds())
+
+
+def generate_metrics() -> bytes:
+    registry = CollectorRegistry()
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry.register(REGISTRY)
+    registry.register(ElectionCollector())
+
+    return generate_latest(registry)
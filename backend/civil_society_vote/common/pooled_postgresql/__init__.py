@@ -0,0 +1,8 @@
+"""
+PostgreSQL database backend which keeps the connections of every process in a pool.
+
+The gunicorn gevent workers serve every request in its own greenlet, with its own Django connection,
+so without a pool every request opens (and closes) a new PostgreSQL connection, and a traffic spike opens
+as many connections as there are requests in progress. With the pool, the connections are reused between
+the requests, and a worker never opens more than the size of its pool.
+"""
@@ -0,0 +1,44 @@
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+from django.utils.asyncio import async_unsafe
+
+from civil_society_vote.common.pooled_postgresql.pool import ConnectionPool, PoolOptions, get_connection_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    The connections are taken from the pool of the process and given back to it when Django closes them,
+    at the end of every request (CONN_MAX_AGE = 0) and of every background task.
+
+    The pool is configured through the "POOL" dictionary of the database settings, with the PoolOptions fields.
+    """
+
+    _connection_pool: ConnectionPool = None
+
+    def get_pool_options(self) -> PoolOptions:
+        return PoolOptions(**self.settings_dict.get("POOL", {}))
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        # The isolation level is read by the parent class only when a new connection is opened
+        self.isolation_level = IsolationLevel(
+            self.settings_dict["OPTIONS"].get("isolation_level", IsolationLevel.READ_COMMITTED)
+        )
+
+        self._connection_pool = get_connection_pool(self.alias, conn_params, self.get_pool_options())
+        return self._connection_pool.getconn(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params))
+
+    @async_unsafe
+    def _close(self):
+        if self.connection is None:
+            return
+
+        with self.wrap_database_errors:
+            if self._connection_pool is None:
+                return self.connection.close()
+
+            if self.in_atomic_block:
+                # Django keeps the connection until the end of the atomic block, so it can't be given to anyone else
+                self.connection.close()
+
+            return self._connection_pool.putconn(self.connection)
@@ -0,0 +1,299 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import psycopg2
+from psycopg2 import extensions
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    pass
+
+
+@dataclass
+class PoolOptions:
+    min_size: int = 1
+    max_size: int = 10
+    # Seconds to wait for a free connection before giving up
+    timeout: float = 10
+    # The idle connections above min_size are closed after this many seconds
+    max_idle: float = 300
+    # The connections are replaced after this many seconds, e.g. to balance them after a database failover
+    max_lifetime: float = 3600
+    # The connections which were idle for longer than this are checked before they are used again
+    check_interval: float = 30
+
+
+@dataclass
+class PoolStats:
+    alias: str
+    max_size: int
+    size: int = 0
+    idle: int = 0
+    in_use: int = 0
+    waiting: int = 0
+    checkouts: int = 0
+    waits: int = 0
+    wait_time: float = 0
+    timeouts: int = 0
+    connections_opened: int = 0
+    connections_closed: int = 0
+    failed_checks: int = 0
+
+
+class _PooledConnection:
+    __slots__ = ("connection", "opened_at", "returned_at")
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.opened_at: float = time.monotonic()
+        self.returned_at: float = self.opened_at
+
+
+class ConnectionPool:
+    """
+    A pool of psycopg2 connections, which is safe to use from threads and, once the threading module is patched
+    by gevent, from greenlets.
+
+    The most recently returned connections are used first, so the other ones stay idle and get closed.
+    """
+
+    def __init__(self, alias: str, options: PoolOptions):
+        self.alias = alias
+        self.options = options
+        self.stats = PoolStats(alias=alias, max_size=options.max_size)
+
+        self._idle: Deque[_PooledConnection] = deque()
+        self._in_use: Dict[int, _PooledConnection] = {}
+        self._condition = threading.Condition()
+
+    def getconn(self, connect: Callable[[], Any]):
+        """
+        Return an idle connection, or open a new one with the connect function if the pool isn't full
+        """
+        deadline: float = time.monotonic() + self.options.timeout
+
+        while True:
+            pooled_connection: Optional[_PooledConnection] = self._reserve(deadline)
+            opened: bool = pooled_connection is None
+
+            if opened:
+                try:
+                    pooled_connection = _PooledConnection(connect())
+                except Exception:
+                    self._release_slot()
+                    raise
+            elif not self._check(pooled_connection):
+                self._discard(pooled_connection)
+                continue
+
+            with self._condition:
+                if opened:
+                    self.stats.connections_opened += 1
+                self.stats.checkouts += 1
+                self._in_use[id(pooled_connection.connection)] = pooled_connection
+                self._update_counts()
+
+            return pooled_connection.connection
+
+    def putconn(self, connection):
+        """
+        Return the connection to the pool, or close it if it's broken or too old
+        """
+        with self._condition:
+            pooled_connection: Optional[_PooledConnection] = self._in_use.pop(id(connection), None)
+
+        if pooled_connection is None:
+            connection.close()
+            return
+
+        if not self._reset(connection) or self._expired(pooled_connection):
+            self._discard(pooled_connection)
+            return
+
+        pooled_connection.returned_at = time.monotonic()
+        with self._condition:
+            self._idle.append(pooled_connection)
+            self._close_idle_connections()
+            self._update_counts()
+            self._condition.notify()
+
+    def close_all(self):
+        with self._condition:
+            idle_connections = list(self._idle)
+            self._idle.clear()
+
+        for pooled_connection in idle_connections:
+            self._discard(pooled_connection)
+
+    def _reserve(self, deadline: float) -> Optional[_PooledConnection]:
+        """
+        Take an idle connection, or reserve the place of a new connection in the pool and return None
+        """
+        with self._condition:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+
+                if self.stats.size < self.options.max_size:
+                    self.stats.size += 1
+                    return None
+
+                remaining: float = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.stats.timeouts += 1
+                    raise PoolTimeout(
+                        f"No database connection available in the '{self.alias}' pool "
+                        f"after {self.options.timeout} seconds"
+                    )
+
+                self.stats.waits += 1
+                self.stats.waiting += 1
+                started_waiting: float = time.monotonic()
+                try:
+                    self._condition.wait(remaining)
+                finally:
+                    self.stats.waiting -= 1
+                    self.stats.wait_time += time.monotonic() - started_waiting
+
+    def _release_slot(self):
+        with self._condition:
+            self.stats.size -= 1
+            self._update_counts()
+            self._condition.notify()
+
+    def _check(self, pooled_connection: _PooledConnection) -> bool:
+        connection = pooled_connection.connection
+        if connection.closed or self._expired(pooled_connection):
+            return False
+
+        if time.monotonic() - pooled_connection.returned_at < self.options.check_interval:
+            return True
+
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+        except psycopg2.Error:
+            self.stats.failed_checks += 1
+            logger.warning("Discarding a broken connection of the '%s' database pool", self.alias)
+            return False
+
+        return True
+
+    def _expired(self, pooled_connection: _PooledConnection) -> bool:
+        return time.monotonic() - pooled_connection.opened_at > self.options.max_lifetime
+
+    @staticmethod
+    def _reset(connection) -> bool:
+        if connection.closed:
+            return False
+
+        try:
+            if connection.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+        except psycopg2.Error:
+            return False
+
+        return connection.info.transaction_status == extensions.TRANSACTION_STATUS_IDLE
+
+    def _close_idle_connections(self):
+        # The oldest idle connections are on the left, they are the first ones not needed anymore
+        now: float = time.monotonic()
+        while len(self._idle) > self.options.min_size and now - self._idle[0].returned_at > self.options.max_idle:
+            pooled_connection: _PooledConnection = self._idle.popleft()
+            self.stats.size -= 1
+            self.stats.connections_closed += 1
+            self._close_quietly(pooled_connection.connection)
+
+    def _discard(self, pooled_connection: _PooledConnection):
+        self._close_quietly(pooled_connection.connection)
+
+        with self._condition:
+            self.stats.connections_closed += 1
+        self._release_slot()
+
+    @staticmethod
+    def _close_quietly(connection):
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+
+    def _update_counts(self):
+        self.stats.idle = len(self._idle)
+        self.stats.in_use = len(self._in_use)
+
+
+# The pools of the current process, by process ID, database alias and connection parameters,
+# since the connections can't be shared with the processes forked after they were opened
+_pools: Dict[Tuple[int, str, str], ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool(alias: str, conn_params: Dict[str, Any], options: PoolOptions) -> ConnectionPool:
+    key = (os.getpid(), alias, repr(sorted(conn_params.items())))
+
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(alias, options)
+
+        return _pools[key]
+
+
+def get_pool_stats() -> List[Dict[str, Any]]:
+    """
+    The statistics of the connection pools of the current process
+    """
+    process_id: int = os.getpid()
+
+    return [asdict(pool.stats) for (pool_process_id, _, _), pool in _pools.items() if pool_process_id == process_id]
+
+
+def close_connection_pools():
+    """
+    Close the idle connections of the pools of the current process, e.g., before Postgres copies the database
+    """
+    process_id: int = os.getpid()
+
+    with _pools_lock:
+        pools: List[ConnectionPool] = [
+            pool for (pool_process_id, _, _), pool in _pools.items() if pool_process_id == process_id
+        ]
+
+    for pool in pools:
+        pool.close_all()
+
+
+def make_psycopg_green():
+    """
+    Let the other greenlets run while psycopg2 waits for the database, when the application runs in
+    the gunicorn gevent workers (which patch the sockets before loading the application)
+    """
+    try:
+        from gevent.monkey import is_module_patched
+        from gevent.socket import wait_read, wait_write
+    except ImportError:
+        return
+
+    if not is_module_patched("socket"):
+        return
+
+    def gevent_wait_callback(connection, timeout=None):
+        while True:
+            state = connection.poll()
+            if state == extensions.POLL_OK:
+                break
+            elif state == extensions.POLL_READ:
+                wait_read(connection.fileno(), timeout=timeout)
+            elif state == extensions.POLL_WRITE:
+                wait_write(connection.fileno(), timeout=timeout)
+            else:
+                raise psycopg2.OperationalError(f"Bad result from poll: {state}")
+
+    extensions.set_wait_callback(gevent_wait_callback)
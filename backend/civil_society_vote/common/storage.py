@@ -0,0 +1,62 @@
+from django.core.files.storage import FileSystemStorage
+from storages.backends.s3boto3 import S3Boto3Storage
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+from civil_society_vote.common.instrumentation import SERVICE_STORAGE, measure_service_call
+
+
+class InstrumentedStorageMixin:
+    """
+    Add the time spent reading, writing and signing the files to the storage time of the current request
+    """
+
+    def _open(self, name, mode="rb"):
+        with measure_service_call(SERVICE_STORAGE):
+            return super()._open(name, mode)
+
+    def _save(self, name, content):
+        with measure_service_call(SERVICE_STORAGE):
+            return super()._save(name, content)
+
+    def delete(self, name):
+        with measure_service_call(SERVICE_STORAGE):
+            return super().delete(name)
+
+    def exists(self, name):
+        with measure_service_call(SERVICE_STORAGE):
+            return super().exists(name)
+
+    def size(self, name):
+        with measure_service_call(SERVICE_STORAGE):
+            return super().size(name)
+
+    def url(self, name, *args, **kwargs):
+        with measure_service_call(SERVICE_STORAGE):
+            return super().url(name, *args, **kwargs)
+
+
+class InstrumentedFileSystemStorage(InstrumentedStorageMixin, FileSystemStorage):
+    pass
+
+
+class InstrumentedS3Storage(InstrumentedStorageMixin, S3Boto3Storage):
+    pass
+
+
+class CollectedStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """
+    Static files with hashed names and Brotli/gzip compressed copies, which nginx serves straight from the disk.
+
+    The files which weren't collected keep their original names, like with DEBUG enabled, instead of failing
+    the page: all of them until `collectstatic` creates the manifest (e.g., in the development environments),
+    and the ones missing from the static directories.
+    """
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            return name
+
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
@@ -0,0 +1,111 @@
+"""
+Sentry performance tracing.
+
+With tail sampling, every transaction is recorded and the decision to keep it is taken once it ends:
+the slow and the failed transactions are always sent to Sentry, the rest of them at the configured sample rate.
+Without it, Sentry keeps the transactions at the sample rate, chosen when they start.
+
+The module is used by the settings, so it doesn't import anything from Django.
+"""
+
+import random
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple, Union
+
+import sentry_sdk
+
+# The span statuses of the server errors, as opposed to the client errors (e.g., "not_found")
+SERVER_ERROR_STATUSES = (
+    "internal_error",
+    "unknown_error",
+    "unavailable",
+    "deadline_exceeded",
+    "data_loss",
+    "aborted",
+    "unimplemented",
+)
+
+# The requests which are never traced, e.g. the health checks and the metrics scrapes
+UNTRACED_PATH_SUFFIXES: Tuple[str, ...] = ("/health/", "/metrics/")
+
+
+def _parse_timestamp(value: Union[str, float, datetime, None]) -> Optional[float]:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+    return value
+
+
+class TraceSampler:
+    def __init__(self, sample_rate: float, tail_sampling: bool, slow_threshold: float):
+        self.sample_rate = sample_rate
+        self.tail_sampling = tail_sampling
+        # Seconds after which a transaction is always kept
+        self.slow_threshold = slow_threshold
+
+    def traces_sampler(self, sampling_context: Dict[str, Any]) -> float:
+        if self._get_path(sampling_context).endswith(UNTRACED_PATH_SUFFIXES):
+            return 0
+
+        if self.tail_sampling:
+            return 1.0
+
+        parent_sampled: Optional[bool] = sampling_context.get("parent_sampled")
+        if parent_sampled is not None:
+            return float(parent_sampled)
+
+        return self.sample_rate
+
+    def before_send_transaction(self, event: Dict[str, Any], hint: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if not self.tail_sampling or self._is_failed(event) or self._is_slow(event):
+            return event
+
+        return event if random.random() < self.sample_rate else None
+
+    @staticmethod
+    def _get_path(sampling_context: Dict[str, Any]) -> str:
+        if wsgi_environ := sampling_context.get("wsgi_environ"):
+            return wsgi_environ.get("PATH_INFO", "")
+        if asgi_scope := sampling_context.get("asgi_scope"):
+            return asgi_scope.get("path", "")
+
+        return ""
+
+    @staticmethod
+    def _is_failed(event: Dict[str, Any]) -> bool:
+        if event.get("contexts", {}).get("trace", {}).get("status") in SERVER_ERROR_STATUSES:
+            return True
+
+        # The spans carry their status among their tags
+        return any(
+            span.get("tags", {}).get("status", span.get("status")) in SERVER_ERROR_STATUSES
+            for span in event.get("spans", [])
+        )
+
+    def _is_slow(self, event: Dict[str, Any]) -> bool:
+        started: Optional[float] = _parse_timestamp(event.get("start_timestamp"))
+        ended: Optional[float] = _parse_timestamp(event.get("timestamp"))
+        if started is None or ended is None:
+            return False
+
+        return ended - started >= self.slow_threshold
+
+
+@contextmanager
+def trace(op: str, name: str, **data):
+    """
+    A span of the current transaction, or a new transaction outside of any (e.g., in the background tasks)
+    """
+    if sentry_sdk.get_current_span() is None:
+        context_manager = sentry_sdk.start_transaction(op=op, name=name)
+    else:
+        context_manager = sentry_sdk.start_span(op=op, name=name)
+
+    with context_manager as span:
+        for key, value in data.items():
+            span.set_data(key, value)
+
+        yield span
@@ -1,16 +1,414 @@
+"""
+The middlewares of the project.
+
+They are all both sync and async capable, like Django's own ones: under ASGI, a synchronous middleware would make
+Django run the rest of the stack, and the async views, through async_to_sync in a thread of their own.
+The work which may block (e.g., loading the user from the session) is still done with sync_to_async.
+"""
+
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from auditlog.cid import set_cid
+from auditlog.context import set_actor
+from auditlog.middleware import AuditlogMiddleware
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+from django.urls import reverse
+from django.utils.decorators import sync_and_async_middleware
+from pyinstrument import Profiler
+from whitenoise.middleware import WhiteNoiseMiddleware
+
 from accounts.models import User
+from civil_society_vote.common.db_router import (
+    PRIMARY_DATABASE_COOKIE,
+    RequestDatabaseState,
+    allow_replica_reads,
+    end_request_database_state,
+    record_primary_writes,
+    start_request_database_state,
+)
+from civil_society_vote.common.instrumentation import (
+    SERVICE_NGOHUB,
+    SERVICE_STORAGE,
+    RequestMetrics,
+    end_request_metrics,
+    record_query,
+    start_request_metrics,
+)
+from civil_society_vote.common.metrics import record_request
+from hub.page_cache import PageCacheMixin, is_page_cacheable
+from hub.request_profiles import acquire_profile_slot, is_profile_requested, save_request_profile
+from hub.request_statistics import record_request_statistics
 
+logger = logging.getLogger(__name__)
 
+
+@sync_and_async_middleware
 def ForceDefaultLanguageMiddleware(get_response):
-    def middleware(request):
-        if request.META.get("HTTP_ACCEPT_LANGUAGE"):
-            del request.META["HTTP_ACCEPT_LANGUAGE"]
-        response = get_response(request)
-        return response
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            request.META.pop("HTTP_ACCEPT_LANGUAGE", None)
+            return await get_response(request)
+
+    else:
+
+        def middleware(request):
+            request.META.pop("HTTP_ACCEPT_LANGUAGE", None)
+            return get_response(request)
 
     return middleware
 
 
+class AsyncCapableMiddleware:
+    """
+    Base of the middlewares which wrap the rest of the stack: __call__ handles the WSGI requests, and __acall__
+    the ASGI ones, without leaving the event loop
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        raise NotImplementedError
+
+    async def __acall__(self, request):
+        raise NotImplementedError
+
+
+def add_execute_wrapper(wrapper: Callable, aliases: Optional[List[str]] = None):
+    """
+    Keep the execute wrapper on the connections for good, instead of adding it around every request.
+
+    Django keeps a connection object in every thread, and the ORM calls of the async views run in a thread of their
+    own, so a wrapper added by an async middleware would miss their queries. The wrappers rely on the state of
+    the current request instead, which is kept in a ContextVar and thus reaches those threads.
+    """
+
+    def add_to_connection(connection, **_):
+        if (aliases is None or connection.alias in aliases) and wrapper not in connection.execute_wrappers:
+            connection.execute_wrappers.append(wrapper)
+
+    connection_created.connect(add_to_connection, weak=False, dispatch_uid=f"execute_wrapper_{wrapper.__name__}")
+    for connection in connections.all(initialized_only=True):
+        add_to_connection(connection)
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise, also running in the event loop under ASGI.
+    The static files are served by nginx, so only the ones it doesn't find are served from a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            # Looking for the file reads the disk
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+
+        return await self.get_response(request)
+
+
+class AsyncAuditlogMiddleware(AuditlogMiddleware):
+    """
+    The auditlog middleware, also running in the event loop under ASGI.
+    The actor is kept in a ContextVar, which reaches the threads of the ORM calls.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None):
+        super().__init__(get_response)
+
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        remote_addr = self._get_remote_addr(request)
+        # The user is lazily loaded from the session
+        user = await sync_to_async(self._get_actor)(request)
+
+        set_cid(request)
+
+        with set_actor(actor=user, remote_addr=remote_addr):
+            return await self.get_response(request)
+
+
+class RequestMetricsMiddleware(AsyncCapableMiddleware):
+    """
+    Time the database queries, the cache lookups and the NGO Hub and storage calls of every request.
+
+    The timings are sent to the staff in a Server-Timing header, the requests slower than SLOW_REQUEST_THRESHOLD
+    milliseconds are logged with their slowest queries, and the totals of every view are kept for the admin
+    and exported to Prometheus.
+    """
+
+    def __init__(self, get_response):
+        if not settings.ENABLE_REQUEST_METRICS:
+            raise MiddlewareNotUsed()
+
+        super().__init__(get_response)
+        add_execute_wrapper(record_query)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        metrics: RequestMetrics = start_request_metrics(settings.SLOW_REQUEST_LOGGED_QUERIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            end_request_metrics()
+
+        self._record_response(request, response, metrics)
+
+        return response
+
+    async def __acall__(self, request):
+        metrics: RequestMetrics = start_request_metrics(settings.SLOW_REQUEST_LOGGED_QUERIES)
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_request_metrics()
+
+        # Checking whether the user is staff may load them from the session, and the statistics are written
+        # to the database once in a while
+        await sync_to_async(self._record_response)(request, response, metrics)
+
+        return response
+
+    def _record_response(self, request, response, metrics: RequestMetrics):
+        duration: float = metrics.duration
+        is_slow: bool = duration >= settings.SLOW_REQUEST_THRESHOLD
+        url_name: str = request.resolver_match.view_name if request.resolver_match else ""
+
+        if is_slow:
+            self._log_slow_request(request, response, url_name, metrics, duration)
+
+        user = getattr(request, "user", None)
+        if user and user.is_staff:
+            response["Server-Timing"] = self._get_server_timing(metrics, duration)
+
+        record_request_statistics(url_name, request.method, response.status_code, metrics, duration, is_slow)
+        record_request(request.method, url_name, response.status_code, duration / 1000)
+
+    @staticmethod
+    def _get_server_timing(metrics: RequestMetrics, duration: float) -> str:
+        timings: List[str] = [
+            f'db;dur={metrics.query_time:.1f};desc="{metrics.queries} queries"',
+            f'cache;dur={metrics.cache_time:.1f};desc="{metrics.cache_hits} hits, {metrics.cache_misses} misses"',
+        ]
+        for service in (SERVICE_NGOHUB, SERVICE_STORAGE):
+            if service in metrics.service_calls:
+                timings.append(
+                    f"{service};dur={metrics.service_time[service]:.1f};"
+                    f'desc="{metrics.service_calls[service]} calls"'
+                )
+        timings.append(f"total;dur={duration:.1f}")
+
+        return ", ".join(timings)
+
+    @staticmethod
+    def _log_slow_request(request, response, url_name: str, metrics: RequestMetrics, duration: float):
+        user = getattr(request, "user", None)
+        record: Dict[str, Any] = {
+            "method": request.method,
+            "path": request.path,
+            "url_name": url_name,
+            "status": response.status_code,
+            "user_id": user.pk if user and user.is_authenticated else None,
+            "duration_ms": round(duration, 1),
+            "queries": metrics.queries,
+            "query_time_ms": round(metrics.query_time, 1),
+            "cache_hits": metrics.cache_hits,
+            "cache_misses": metrics.cache_misses,
+            "cache_time_ms": round(metrics.cache_time, 1),
+            "service_calls": metrics.service_calls,
+            "service_time_ms": {service: round(time, 1) for service, time in metrics.service_time.items()},
+            # The statements without their parameters, which can hold personal data
+            "slowest_queries": [
+                {"duration_ms": round(query_duration, 1), "sql": sql[: settings.SLOW_REQUEST_SQL_LENGTH]}
+                for query_duration, sql in metrics.get_slowest_queries()
+            ],
+        }
+
+        logger.warning("Slow request: %s", json.dumps(record))
+
+
+class ReadReplicaMiddleware(AsyncCapableMiddleware):
+    """
+    Let the read-only views read from the database replicas, unless the user recently wrote to the primary database
+    """
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed()
+
+        super().__init__(get_response)
+        add_execute_wrapper(record_primary_writes, [DEFAULT_DB_ALIAS])
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        state = start_request_database_state()
+        try:
+            response = self.get_response(request)
+        finally:
+            end_request_database_state()
+
+        return self._set_primary_database_cookie(request, response, state)
+
+    async def __acall__(self, request):
+        state = start_request_database_state()
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_request_database_state()
+
+        return self._set_primary_database_cookie(request, response, state)
+
+    @staticmethod
+    def _set_primary_database_cookie(request, response, state: RequestDatabaseState):
+        if state.wrote_to_primary:
+            response.set_cookie(
+                PRIMARY_DATABASE_COOKIE,
+                "1",
+                max_age=settings.DATABASE_REPLICA_STICKINESS,
+                secure=request.is_secure(),
+                httponly=True,
+                samesite="Lax",
+            )
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in ("GET", "HEAD") or PRIMARY_DATABASE_COOKIE in request.COOKIES:
+            return None
+
+        view_class = getattr(view_func, "view_class", None)
+        if view_class and issubclass(view_class, PageCacheMixin) and is_page_cacheable(request):
+            # The cached pages are purged once the changes are committed to the primary database, so a page rendered
+            # meanwhile from a lagging replica would be cached with the old data until the next purge
+            return None
+
+        resolver_match = request.resolver_match
+        is_admin_changelist: bool = resolver_match.namespace == "admin" and (resolver_match.url_name or "").endswith(
+            "_changelist"
+        )
+        if getattr(view_class, "read_replica", False) or is_admin_changelist:
+            allow_replica_reads()
+
+        return None
+
+
+class ProfilerMiddleware(AsyncCapableMiddleware):
+    """
+    Profile the requests of the staff which ask for it, within the REQUEST_PROFILER_RATE_LIMIT.
+
+    The profiles are saved for the admin, and their admin page is sent back in the X-Request-Profile header.
+    It comes before the ImpersonateMiddleware, so the profiles are taken and kept for the staff user who impersonates.
+    With the gevent workers, the samples also include the other requests served by the worker meanwhile,
+    and with the ASGI ones, the async profiling only follows the request's own coroutines.
+    """
+
+    def __init__(self, get_response):
+        if not settings.ENABLE_REQUEST_PROFILER:
+            raise MiddlewareNotUsed()
+
+        super().__init__(get_response)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        user = self._get_profiled_user(request) if is_profile_requested(request) else None
+        if not user:
+            return self.get_response(request)
+
+        profiler = Profiler(interval=settings.REQUEST_PROFILER_INTERVAL)
+        started: float = time.perf_counter()
+        profiler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.stop()
+        duration: float = (time.perf_counter() - started) * 1000
+
+        return self._save_profile(request, response, user, profiler, duration)
+
+    async def __acall__(self, request):
+        # Loading the user is only needed for the requests which ask for a profile
+        user = await sync_to_async(self._get_profiled_user)(request) if is_profile_requested(request) else None
+        if not user:
+            return await self.get_response(request)
+
+        profiler = Profiler(interval=settings.REQUEST_PROFILER_INTERVAL)
+        started: float = time.perf_counter()
+        profiler.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiler.stop()
+        duration: float = (time.perf_counter() - started) * 1000
+
+        return await sync_to_async(self._save_profile)(request, response, user, profiler, duration)
+
+    @staticmethod
+    def _get_profiled_user(request) -> Optional[User]:
+        # The user is kept before the impersonation middleware replaces it
+        user = request.user
+        if user.is_authenticated and user.in_staff_groups() and acquire_profile_slot():
+            return user
+
+        return None
+
+    @staticmethod
+    def _save_profile(request, response, user: User, profiler: Profiler, duration: float):
+        if request_profile := save_request_profile(request, response, user, profiler, duration):
+            response["X-Request-Profile"] = reverse("admin:hub_requestprofile_change", args=[request_profile.pk])
+
+        return response
+
+
 class CaseInsensitiveUserModel(object):
     def authenticate(self, request, username=None, password=None):
         try:
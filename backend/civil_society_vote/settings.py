@@ -15,10 +15,12 @@ from pathlib import Path
 
 import environ
 import sentry_sdk
+from django.core.exceptions import ImproperlyConfigured
 from django.urls import reverse_lazy  # noqa
 
 from civil_society_vote.common.contants import MEBIBYTE
 from civil_society_vote.common.formatting import get_human_readable_size
+from civil_society_vote.common.tracing import TraceSampler
 
 # Environment parameters
 root = Path(__file__).resolve().parent.parent.parent
@@ -44,6 +46,7 @@ env = environ.Env(
     AWS_S3_DEFAULT_CUSTOM_DOMAIN=(str, ""),
     AWS_S3_PUBLIC_CUSTOM_DOMAIN=(str, ""),
     AWS_S3_CUSTOM_DOMAIN=(str, ""),
+    AWS_S3_ENDPOINT_URL=(str, ""),
     AWS_SES_REGION_NAME=(str, ""),
     AWS_SES_INCLUDE_REPORTS=(bool, False),
     AWS_SES_CONFIGURATION_SET_NAME=(str, None),
@@ -69,7 +72,16 @@ env = environ.Env(
     TIME_ZONE=(str, "Europe/Bucharest"),
     DATA_UPLOAD_MAX_MEMORY_SIZE=(int, 3 * MEBIBYTE),
     MAX_DOCUMENT_SIZE=(int, 50 * MEBIBYTE),
+    ENABLE_DIRECT_UPLOADS=(bool, False),
+    DIRECT_UPLOAD_EXPIRATION=(int, 600),
+    SIGNED_URL_EXPIRATION=(int, 3600),
+    SIGNED_URL_MIN_VALIDITY=(int, 300),
     IMPERSONATE_READ_ONLY=(bool, False),
+    USE_ASGI=(bool, False),
+    # cache settings
+    CACHE_MAX_ENTRIES=(int, 5000),
+    ENABLE_PAGE_CACHE=(bool, True),
+    PAGE_CACHE_TIMEOUT=(int, 60 * 15),
     # db settings
     # DATABASE_ENGINE=(str, "sqlite3"),
     DATABASE_NAME=(str, "default"),
@@ -77,12 +89,39 @@ env = environ.Env(
     DATABASE_PASSWORD=(str, ""),
     DATABASE_HOST=(str, "localhost"),
     DATABASE_PORT=(str, "5432"),
+    DATABASE_POOL_ENABLED=(bool, True),
+    DATABASE_POOL_MIN_SIZE=(int, 1),
+    DATABASE_POOL_MAX_SIZE=(int, 10),
+    DATABASE_POOL_TIMEOUT=(float, 10),
+    DATABASE_POOL_MAX_IDLE=(int, 300),
+    DATABASE_POOL_MAX_LIFETIME=(int, 3600),
+    DATABASE_POOL_CHECK_INTERVAL=(int, 30),
+    DATABASE_REPLICA_HOSTS=(list, []),
+    DATABASE_REPLICA_MAX_LAG=(float, 5),
+    DATABASE_REPLICA_LAG_CHECK_INTERVAL=(float, 5),
+    DATABASE_REPLICA_STICKINESS=(int, 15),
+    ENABLE_REQUEST_METRICS=(bool, True),
+    SLOW_REQUEST_THRESHOLD=(int, 1000),
+    SLOW_REQUEST_LOGGED_QUERIES=(int, 5),
+    REQUEST_STATISTICS_FLUSH_INTERVAL=(int, 60),
+    METRICS_TOKEN=(str, ""),
+    ENABLE_REQUEST_PROFILER=(bool, True),
+    REQUEST_PROFILER_RATE_LIMIT=(int, 10),
+    REQUEST_PROFILER_INTERVAL=(float, 0.001),
+    # gunicorn settings
+    GUNICORN_WORKER_CONNECTIONS=(int, 100),
     # Sentry
     SENTRY_DSN=(str, ""),
     SENTRY_TRACES_SAMPLE_RATE=(float, 0),
+    SENTRY_TRACES_TAIL_SAMPLING=(bool, False),
+    SENTRY_SLOW_TRANSACTION_THRESHOLD=(int, 2000),
     SENTRY_PROFILES_SAMPLE_RATE=(float, 0),
     # django-q2 settings
     BACKGROUND_WORKERS_COUNT=(int, 1),
+    BACKGROUND_NGOHUB_WORKERS_COUNT=(int, 1),
+    BACKGROUND_BATCH_WORKERS_COUNT=(int, 1),
+    BACKGROUND_BROKER=(str, "orm"),
+    BACKGROUND_REDIS_URL=(str, "redis://localhost:6379/0"),
     # recaptcha settings
     RECAPTCHA_PUBLIC_KEY=(str, ""),
     RECAPTCHA_PRIVATE_KEY=(str, ""),
@@ -200,17 +239,20 @@ if AWS_SES_INCLUDE_REPORTS:
 MIDDLEWARE = [
     "civil_society_vote.middleware.ForceDefaultLanguageMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "civil_society_vote.middleware.AsyncWhiteNoiseMiddleware",
+    "civil_society_vote.middleware.RequestMetricsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "civil_society_vote.middleware.ProfilerMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "django.middleware.locale.LocaleMiddleware",
     "impersonate.middleware.ImpersonateMiddleware",
     "allauth.account.middleware.AccountMiddleware",
-    "auditlog.middleware.AuditlogMiddleware",
+    "civil_society_vote.middleware.AsyncAuditlogMiddleware",
+    "civil_society_vote.middleware.ReadReplicaMiddleware",
 ]
 
 if DEBUG and env("ENABLE_DEBUG_TOOLBAR"):
@@ -245,12 +287,17 @@ TEMPLATES = [
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
                 "hub.context_processors.hub_settings",
+                "hub.context_processors.viewer_profile",
             ],
         },
     },
 ]
 
 WSGI_APPLICATION = "civil_society_vote.wsgi.application"
+ASGI_APPLICATION = "civil_society_vote.asgi.application"
+
+# When served through ASGI, the read-heavy public pages are handled by their async views
+USE_ASGI = env.bool("USE_ASGI")
 
 # Auditlog configuration
 
@@ -276,13 +323,52 @@ DATABASES = {
     }
 }
 
+# Every process (e.g., every gunicorn worker) keeps its connections in a pool and gives them back to it
+# at the end of each request; the gevent workers never serve more than GUNICORN_WORKER_CONNECTIONS requests
+# at once, so their pools don't need more connections than that.
+# Postgres gets at most (gunicorn workers + qcluster workers of all the queues) * DATABASE_POOL_MAX_SIZE connections.
+if env.bool("DATABASE_POOL_ENABLED"):
+    DATABASES["default"].update(
+        {
+            "ENGINE": "civil_society_vote.common.pooled_postgresql",
+            "CONN_MAX_AGE": 0,
+            "POOL": {
+                "min_size": env.int("DATABASE_POOL_MIN_SIZE"),
+                "max_size": min(env.int("DATABASE_POOL_MAX_SIZE"), env.int("GUNICORN_WORKER_CONNECTIONS")),
+                "timeout": env.float("DATABASE_POOL_TIMEOUT"),
+                "max_idle": env.int("DATABASE_POOL_MAX_IDLE"),
+                "max_lifetime": env.int("DATABASE_POOL_MAX_LIFETIME"),
+                "check_interval": env.int("DATABASE_POOL_CHECK_INTERVAL"),
+            },
+        }
+    )
+
+# The read-only pages read from the replicas, which have the same name, user and password as the primary database
+# (see civil_society_vote.common.db_router)
+DATABASE_REPLICAS = []
+for replica_index, replica_host in enumerate(env.list("DATABASE_REPLICA_HOSTS"), start=1):
+    replica_alias = f"replica_{replica_index}"
+    DATABASES[replica_alias] = {**DATABASES["default"], "HOST": replica_host, "TEST": {"MIRROR": "default"}}
+    DATABASE_REPLICAS.append(replica_alias)
+
+if DATABASE_REPLICAS:
+    DATABASE_ROUTERS = ["civil_society_vote.common.db_router.ReadReplicaRouter"]
+
+# Seconds behind the primary database after which the replicas aren't used anymore
+DATABASE_REPLICA_MAX_LAG = env.float("DATABASE_REPLICA_MAX_LAG")
+DATABASE_REPLICA_LAG_CHECK_INTERVAL = env.float("DATABASE_REPLICA_LAG_CHECK_INTERVAL")
+# Seconds for which a user reads from the primary database after they wrote to it
+DATABASE_REPLICA_STICKINESS = env.int("DATABASE_REPLICA_STICKINESS")
+
 ENABLE_CACHE = env.bool("ENABLE_CACHE", default=not DEBUG)
 if ENABLE_CACHE:
     CACHES = {
         "default": {
-            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "BACKEND": "civil_society_vote.common.cache.InstrumentedDatabaseCache",
             "LOCATION": "civil_vote_cache_default",
             "TIMEOUT": 600,  # default cache timeout in seconds
+            # The anonymous pages are cached as well, besides the smaller values
+            "OPTIONS": {"MAX_ENTRIES": env.int("CACHE_MAX_ENTRIES")},
         }
     }
 else:
@@ -300,6 +386,10 @@ TIMEOUT_CACHE_SHORT = 60  # 1 minute
 TIMEOUT_CACHE_NORMAL = 60 * 15  # 15 minutes
 TIMEOUT_CACHE_LONG = 60 * 60 * 2  # 2 hours
 
+# The public pages are cached whole for the anonymous visitors, per language and per phase (see hub.page_cache)
+ENABLE_PAGE_CACHE = ENABLE_CACHE and env.bool("ENABLE_PAGE_CACHE")
+PAGE_CACHE_TIMEOUT = env.int("PAGE_CACHE_TIMEOUT")
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -351,14 +441,19 @@ MEDIA_URL = f"{public_media_location}/"
 STATIC_ROOT = os.path.abspath(os.path.join(BASE_DIR, "static"))
 MEDIA_ROOT = os.path.abspath(os.path.join(BASE_DIR, "media"))
 
-media_storage = "django.core.files.storage.FileSystemStorage"
-static_storage = "whitenoise.storage.CompressedStaticFilesStorage"
+media_storage = "civil_society_vote.common.storage.InstrumentedFileSystemStorage"
+static_storage = "civil_society_vote.common.storage.CollectedStaticFilesStorage"
+
+# The signed URLs of the private documents are cached until SIGNED_URL_MIN_VALIDITY seconds before they expire
+SIGNED_URL_EXPIRATION = env.int("SIGNED_URL_EXPIRATION")
+SIGNED_URL_MIN_VALIDITY = env.int("SIGNED_URL_MIN_VALIDITY")
+SIGNED_URL_CACHE_TIMEOUT = max(SIGNED_URL_EXPIRATION - SIGNED_URL_MIN_VALIDITY, 0)
 
 default_storage_options = {}
 public_storage_options = {}
 
 if env.bool("USE_S3"):
-    media_storage = "storages.backends.s3boto3.S3Boto3Storage"
+    media_storage = "civil_society_vote.common.storage.InstrumentedS3Storage"
     static_storage = "storages.backends.s3boto3.S3StaticStorage"
 
     # https://django-storages.readthedocs.io/en/latest/backends/amazon-S3.html
@@ -379,6 +474,12 @@ if env.bool("USE_S3"):
     if default_prefix := env.str("AWS_S3_DEFAULT_PREFIX", default=None):
         default_storage_options["location"] = default_prefix
 
+    default_storage_options["querystring_expire"] = SIGNED_URL_EXPIRATION
+
+    # e.g., a local MinIO server standing in for S3
+    if endpoint_url := env.str("AWS_S3_ENDPOINT_URL"):
+        default_storage_options["endpoint_url"] = endpoint_url
+
     if custom_domain := (
         env.str("AWS_S3_CUSTOM_DOMAIN", default=None) or env.str("AWS_S3_DEFAULT_CUSTOM_DOMAIN", default=None)
     ):
@@ -447,6 +548,11 @@ MAX_DOCUMENT_READABLE_SIZE = get_human_readable_size(MAX_DOCUMENT_SIZE)
 MAX_DOCUMENT_SIZE_UNIT = MAX_DOCUMENT_READABLE_SIZE["unit"]
 MAX_DOCUMENT_SIZE_IN_UNIT = MAX_DOCUMENT_READABLE_SIZE["size"]
 
+# The browser uploads the documents straight to the S3 bucket, through presigned POST requests
+ENABLE_DIRECT_UPLOADS = env.bool("USE_S3") and env.bool("ENABLE_DIRECT_UPLOADS")
+# Seconds for which a presigned upload, and the token of the uploaded file, are valid
+DIRECT_UPLOAD_EXPIRATION = env.int("DIRECT_UPLOAD_EXPIRATION")
+
 
 STATICFILES_DIRS = (os.path.abspath(os.path.join(BASE_DIR, "static_extras")),)
 
@@ -486,8 +592,19 @@ else:
 # Django Q2
 # https://django-q2.readthedocs.io/en/stable/brokers.html
 
+# The background tasks are split in queues, each served by its own qcluster process and workers
+# (started with the Q_CLUSTER_NAME environment variable set to the queue name), so that the NGO Hub syncs
+# and the batches never delay the notification emails:
+# - the default queue sends the notification emails, e.g. the vote audit;
+# - the NGO Hub queue updates the organizations, including the hourly schedule;
+# - the batch queue sends the emails in bulk, generates the thumbnails and recomputes the completeness.
+BACKGROUND_QUEUE_NOTIFICATIONS = "votong"
+BACKGROUND_QUEUE_NGOHUB = "votong-ngohub"
+BACKGROUND_QUEUE_BATCH = "votong-batch"
+BACKGROUND_QUEUES = (BACKGROUND_QUEUE_NOTIFICATIONS, BACKGROUND_QUEUE_NGOHUB, BACKGROUND_QUEUE_BATCH)
+
 Q_CLUSTER = {
-    "name": "votong",
+    "name": BACKGROUND_QUEUE_NOTIFICATIONS,
     "workers": env.int("BACKGROUND_WORKERS_COUNT"),
     "recycle": 100,
     "timeout": 900,  # A task must finish in less than 15 minutes
@@ -499,12 +616,28 @@ Q_CLUSTER = {
     "queue_limit": 4,
     "cpu_affinity": 1,
     "label": "Django Q2",
-    "orm": "default",
-    "poll": 2,
     "guard_cycle": 3,
     "catch_up": False,
+    "ALT_CLUSTERS": {
+        BACKGROUND_QUEUE_NGOHUB: {
+            "workers": env.int("BACKGROUND_NGOHUB_WORKERS_COUNT"),
+        },
+        BACKGROUND_QUEUE_BATCH: {
+            "workers": env.int("BACKGROUND_BATCH_WORKERS_COUNT"),
+        },
+    },
 }
 
+# The ORM broker polls the database every couple of seconds from every cluster,
+# while the Redis broker waits for the tasks on a blocking pop
+BACKGROUND_BROKER = env.str("BACKGROUND_BROKER")
+if BACKGROUND_BROKER == "redis":
+    Q_CLUSTER["redis"] = env.str("BACKGROUND_REDIS_URL")
+elif BACKGROUND_BROKER == "orm":
+    Q_CLUSTER.update({"orm": "default", "poll": 2})
+else:
+    raise ImproperlyConfigured(f"Invalid BACKGROUND_BROKER: {BACKGROUND_BROKER}. Must be 'orm' or 'redis'.")
+
 
 CRISPY_ALLOWED_TEMPLATE_PACKS = ("bulma",)
 CRISPY_TEMPLATE_PACK = "bulma"
@@ -542,6 +675,29 @@ AVATAR_PROVIDERS = (
 AVATAR_DEFAULT_URL = "images/photo-placeholder.gif"
 AVATAR_DEFAULT_ADMIN_URL = "images/logomark-300px.png"
 
+# The organization logos and the candidate photos are displayed through thumbnails of these widths
+THUMBNAIL_WIDTHS = (64, 128, 256)
+THUMBNAIL_QUALITY = 80
+
+
+# The database, cache, NGO Hub and storage timings of every request (see RequestMetricsMiddleware)
+ENABLE_REQUEST_METRICS = env.bool("ENABLE_REQUEST_METRICS")
+# Milliseconds after which a request is logged along with its slowest queries
+SLOW_REQUEST_THRESHOLD = env.int("SLOW_REQUEST_THRESHOLD")
+SLOW_REQUEST_LOGGED_QUERIES = env.int("SLOW_REQUEST_LOGGED_QUERIES")
+SLOW_REQUEST_SQL_LENGTH = 1000
+# Seconds between the writes of the per-view statistics of every process
+REQUEST_STATISTICS_FLUSH_INTERVAL = env.int("REQUEST_STATISTICS_FLUSH_INTERVAL")
+
+# The bearer token of the Prometheus scrapers; the /metrics/ endpoint is disabled without it
+METRICS_TOKEN = env.str("METRICS_TOKEN")
+
+# The staff profiling their requests with ?profile=1 or the X-Profile header (see ProfilerMiddleware)
+ENABLE_REQUEST_PROFILER = env.bool("ENABLE_REQUEST_PROFILER")
+# Profiles taken every hour, by all the staff
+REQUEST_PROFILER_RATE_LIMIT = env.int("REQUEST_PROFILER_RATE_LIMIT")
+# Seconds between the samples of the profiler
+REQUEST_PROFILER_INTERVAL = env.float("REQUEST_PROFILER_INTERVAL")
 
 # Django logging
 LOGGING = {
@@ -563,11 +719,18 @@ LOGGING = {
 
 ENABLE_SENTRY = bool(env.str("SENTRY_DSN"))
 if ENABLE_SENTRY:
+    # With tail sampling, all the transactions are recorded, and the ones slower than
+    # SENTRY_SLOW_TRANSACTION_THRESHOLD milliseconds or failed are always sent to Sentry;
+    # the others are sent at SENTRY_TRACES_SAMPLE_RATE (set it to 1.0 to capture 100% of the transactions).
+    trace_sampler = TraceSampler(
+        sample_rate=env.float("SENTRY_TRACES_SAMPLE_RATE"),
+        tail_sampling=env.bool("SENTRY_TRACES_TAIL_SAMPLING"),
+        slow_threshold=env.int("SENTRY_SLOW_TRANSACTION_THRESHOLD") / 1000,
+    )
     sentry_sdk.init(
         dsn=env.str("SENTRY_DSN"),
-        # Set traces_sample_rate to 1.0 to capture 100%
-        # of transactions for performance monitoring.
-        traces_sample_rate=env.float("SENTRY_TRACES_SAMPLE_RATE"),
+        traces_sampler=trace_sampler.traces_sampler,
+        before_send_transaction=trace_sampler.before_send_transaction,
         # Set profiles_sample_rate to 1.0 to profile 100%
         # of sampled transactions.
         # We recommend adjusting this value in production.
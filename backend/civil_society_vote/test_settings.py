@@ -3,3 +3,8 @@ Specific settings for the automated test environment
 """
 
 from .settings import *  # noqa: F405, F403, F401
+
+# The database cache table is only created after the migrations, whose receivers already use the cache
+ENABLE_CACHE = False
+ENABLE_PAGE_CACHE = False
+CACHES["default"] = {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
@@ -8,7 +8,7 @@ from django.urls import include, path, reverse
 from django.utils.translation import gettext_lazy as _
 from django.views.generic.base import RedirectView
 
-from civil_society_vote.views import StaticPageView
+from civil_society_vote.views import MetricsView, StaticPageView
 
 admin.site.site_title = _("Admin Civil Society Vote")
 admin.site.site_header = _("Admin Civil Society Vote") + f" | {settings.VERSION}@{settings.REVISION}"
@@ -124,6 +124,7 @@ urlpatterns_simple = [
         ),
     ),
     path("allauth/", include("allauth.urls")),
+    path("metrics/", MetricsView.as_view(), name="metrics"),
 ]
 
 urlpatterns = urlpatterns_i18n + urlpatterns_simple
@@ -1,10 +1,34 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.views import View
 from django.views.generic.base import TemplateView
+from prometheus_client import CONTENT_TYPE_LATEST
 
+from civil_society_vote.common.metrics import generate_metrics
+from hub.page_cache import PageCacheMixin
 
-class StaticPageView(TemplateView):
+
+class StaticPageView(PageCacheMixin, TemplateView):
     template_name = ""
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
         return context
+
+
+class MetricsView(View):
+    """
+    The Prometheus metrics, for the scrapers which send the METRICS_TOKEN as a bearer token
+    """
+
+    def get(self, request):
+        if not settings.METRICS_TOKEN:
+            raise Http404
+
+        authorization: str = request.headers.get("Authorization", "")
+        if not constant_time_compare(authorization, f"Bearer {settings.METRICS_TOKEN}"):
+            return HttpResponse(status=401, headers={"WWW-Authenticate": "Bearer"})
+
+        return HttpResponse(generate_metrics(), content_type=CONTENT_TYPE_LATEST)
@@ -2,6 +2,10 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from civil_society_vote.common.pooled_postgresql.pool import make_psycopg_green
+
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "civil_society_vote.settings")
 
+make_psycopg_green()
+
 application = get_wsgi_application()
@@ -1,6 +1,6 @@
 import csv
 import io
-from typing import List, Set
+from typing import Dict, List, Set
 
 from django.conf import settings
 from django.contrib import admin, messages
@@ -8,10 +8,13 @@ from django.contrib.admin.filters import AllValuesFieldListFilter
 from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
 from django.contrib.auth.models import Group
 from django.contrib.sites.shortcuts import get_current_site
+from django.db import transaction
 from django.db.models import Count, QuerySet
 from django.http import HttpRequest
 from django.shortcuts import redirect, render
 from django.urls import path, reverse
+from django.utils import timezone
+from django.utils.html import format_html
 from django.utils.http import urlencode
 from django.utils.safestring import mark_safe
 from django.utils.translation import gettext_lazy as _
@@ -21,7 +24,9 @@ from sentry_sdk import capture_message
 
 from accounts.models import COMMITTEE_GROUP, User
 from civil_society_vote.common.admin import BasePermissionsAdmin
-from civil_society_vote.common.messaging import send_email
+from civil_society_vote.common.audit import bulk_log_changes
+from civil_society_vote.common.messaging import send_email_batch
+from hub.document_exports import candidates_documents_response, organizations_documents_response
 from hub.forms import ImportCitiesForm, OrganizationCreateFromNgohubForm
 from hub.models import (
     BlogPost,
@@ -37,12 +42,31 @@ from hub.models import (
     FeatureFlag,
     Organization,
     PHASE_CHOICES,
+    RequestProfile,
+    RequestStatistics,
     SETTINGS_CHOICES,
+    bulk_updated,
     get_feature_flag,
 )
+from hub.page_cache import purge_phase_page_cache
+from hub.signed_urls import VIEWER_CLASS_ADMIN, use_signed_urls
+from hub.workers.recompute_completeness import COMPLETENESS_FLAGS, recompute_completeness
 from hub.workers.update_organization import update_organization
 
 
+class SignedUrlFilesAdminMixin:
+    """
+    Display the files of the edited object with the cached signed URLs
+    """
+
+    def get_object(self, request, object_id, from_field=None):
+        obj = super().get_object(request, object_id, from_field)
+        if obj:
+            use_signed_urls(obj, VIEWER_CLASS_ADMIN)
+
+        return obj
+
+
 class CountyFilter(AllValuesFieldListFilter):
     template = "admin/dropdown_filter.html"
 
@@ -99,11 +123,6 @@ class OrganizationCandidatesInline(admin.TabularInline):
 
     supporters_count.short_description = _("Supporters")
 
-    def confirmations_count(self, obj):
-        return obj.count_confirmations()
-
-    confirmations_count.short_description = _("Confirmations")
-
 
 class CandidateVoteInline(admin.TabularInline):
     model = CandidateVote
@@ -189,24 +208,20 @@ class CandidateConfirmationsListFilter(admin.SimpleListFilter):
             return queryset.filter(confirmations_count__gte=5)
 
 
-def send_confirm_email_to_committee(request, candidate, to_email):
-    current_site = get_current_site(request)
-    protocol = "https" if request.is_secure() else "http"
-
+def _build_committee_confirmation_message(candidate: Candidate, base_url: str, to_emails: List[str]) -> Dict:
     confirmation_link_path = reverse("candidate-status-confirm", args=(candidate.pk,))
-    confirmation_link = f"{protocol}://{current_site.domain}{confirmation_link_path}"
 
-    send_email(
-        subject=f"[VOTONG] Confirmare candidatura: {candidate.name}",
-        context={
+    return {
+        "subject": f"[VOTONG] Confirmare candidatura: {candidate.name}",
+        "to_emails": to_emails,
+        "text_template": "hub/emails/05_confirmation.txt",
+        "html_template": "hub/emails/05_confirmation.html",
+        "context": {
             "candidate": candidate.name,
-            "status": Candidate.STATUS[candidate.status],
-            "confirmation_link": confirmation_link,
+            "status": str(Candidate.STATUS[candidate.status]),
+            "confirmation_link": f"{base_url}{confirmation_link_path}",
         },
-        to_emails=[to_email],
-        text_template="hub/emails/05_confirmation.txt",
-        html_template="hub/emails/05_confirmation.html",
-    )
+    }
 
 
 def _set_candidates_status(
@@ -215,20 +230,41 @@ def _set_candidates_status(
     status: str,
     send_committee_confirmation: bool = True,
 ):
-    committee_emails = Group.objects.get(name=COMMITTEE_GROUP).user_set.all().values_list("email", flat=True)
+    # only take action on the candidates where there is a change in the status
+    changed_candidates: List[Candidate] = list(queryset.exclude(status=status).select_related("org"))
+    if not changed_candidates:
+        return
+
+    changed_candidates_pks: List[int] = [candidate.pk for candidate in changed_candidates]
 
-    for candidate in queryset:
-        # only take action if there is a change in the status
-        if candidate.status != status:
-            CandidateConfirmation.objects.filter(candidate=candidate).delete()
+    with transaction.atomic():
+        CandidateConfirmation.bulk_delete(CandidateConfirmation.objects.filter(candidate__in=changed_candidates_pks))
 
-            if not send_committee_confirmation:
-                continue
+        Candidate.objects.filter(pk__in=changed_candidates_pks).update(
+            status=status, confirmations_count=0, modified=timezone.now()
+        )
+        bulk_log_changes((candidate, {"status": [candidate.status, status]}) for candidate in changed_candidates)
+        bulk_updated.send(sender=Candidate, pks=changed_candidates_pks)
+
+    if not send_committee_confirmation:
+        return
 
-            for to_email in committee_emails:
-                send_confirm_email_to_committee(request, candidate, to_email)
+    committee_emails: List[str] = list(
+        Group.objects.get(name=COMMITTEE_GROUP).user_set.all().values_list("email", flat=True)
+    )
+    if not committee_emails:
+        return
+
+    current_site = get_current_site(request)
+    protocol = "https" if request.is_secure() else "http"
+    base_url = f"{protocol}://{current_site.domain}"
 
-    queryset.update(status=status)
+    messages_batch: List[Dict] = []
+    for candidate in changed_candidates:
+        candidate.status = status
+        messages_batch.append(_build_committee_confirmation_message(candidate, base_url, committee_emails))
+
+    send_email_batch(messages_batch)
 
 
 def reject_candidates(_, request: HttpRequest, queryset: QuerySet[Candidate]):
@@ -252,6 +288,13 @@ def pending_candidates(_, request: HttpRequest, queryset: QuerySet[Candidate]):
 pending_candidates.short_description = _("Set selected candidates status to PENDING")
 
 
+def export_candidates_documents(_, __: HttpRequest, queryset: QuerySet[Candidate]):
+    return candidates_documents_response(queryset)
+
+
+export_candidates_documents.short_description = _("Download the documents of the selected candidates")
+
+
 class DomainResource(resources.ModelResource):
     class Meta:
         model = Domain
@@ -260,7 +303,7 @@ class DomainResource(resources.ModelResource):
 
 
 @admin.register(Organization)
-class OrganizationAdmin(BasePermissionsAdmin):
+class OrganizationAdmin(SignedUrlFilesAdminMixin, BasePermissionsAdmin):
     list_display = (
         "name",
         "get_user",
@@ -276,7 +319,7 @@ class OrganizationAdmin(BasePermissionsAdmin):
         "status",
         "created",
     )
-    list_filter = ("status", ("county", CountyFilter), "voting_domain")
+    list_filter = ("status", ("county", CountyFilter), "voting_domain", "completed", "completed_for_candidate")
 
     search_fields = ("name", "legal_representative_name", "email")
     readonly_fields = ["ngohub_org_id"] + list(Organization.ngohub_fields())
@@ -285,7 +328,7 @@ class OrganizationAdmin(BasePermissionsAdmin):
 
     inlines = (OrganizationUsersInline, OrganizationCandidatesInline)
 
-    actions = ("update_organizations",)
+    actions = ("update_organizations", "export_organizations_documents")
 
     fieldsets = (
         (
@@ -427,9 +470,14 @@ class OrganizationAdmin(BasePermissionsAdmin):
         for org in queryset:
             update_organization(org.id)
 
+    def export_organizations_documents(self, __, queryset: QuerySet[Organization]):
+        return organizations_documents_response(queryset)
+
+    export_organizations_documents.short_description = _("Download the documents of the selected organizations")
+
 
 @admin.register(Candidate)
-class CandidateAdmin(BasePermissionsAdmin):
+class CandidateAdmin(SignedUrlFilesAdminMixin, BasePermissionsAdmin):
     list_display = [
         "name",
         "org",
@@ -443,10 +491,17 @@ class CandidateAdmin(BasePermissionsAdmin):
     ]
     list_display_links = list_display
 
-    list_filter = ["is_proposed", "status", CandidateSupportersListFilter, CandidateConfirmationsListFilter, "domain"]
+    list_filter = [
+        "is_proposed",
+        "status",
+        CandidateSupportersListFilter,
+        CandidateConfirmationsListFilter,
+        "domain",
+        "completed",
+    ]
     search_fields = ["name", "org__name"]
     readonly_fields = ["status"]
-    actions = [accept_candidates, reject_candidates, pending_candidates]
+    actions = [accept_candidates, reject_candidates, pending_candidates, export_candidates_documents]
     list_per_page = 20
 
     fieldsets = (
@@ -494,12 +549,10 @@ class CandidateAdmin(BasePermissionsAdmin):
     #         queryset = queryset.annotate(
     #             votes_count=Count("votes", distinct=True),
     #             supporters_count=Count("supporters", distinct=True),
-    #             confirmations_count=Count("confirmations", distinct=True),
     #         )
     #     else:
     #         queryset = queryset.annotate(
     #             votes_count=Count("votes", distinct=True),
-    #             confirmations_count=Count("confirmations", distinct=True),
     #         )
     #     return queryset
 
@@ -533,11 +586,6 @@ class CandidateAdmin(BasePermissionsAdmin):
 
     supporters_count.short_description = _("Supporters")
 
-    def confirmations_count(self, obj):
-        return obj.confirmations.count()
-
-    confirmations_count.short_description = _("Confirmations")
-
     def has_add_permission(self, request, obj=None):
         return False
 
@@ -669,13 +717,32 @@ class FeatureFlagAdmin(BasePermissionsAdmin):
     def has_delete_permission(self, request, obj=None):
         return False
 
+    @staticmethod
+    def _refresh_completeness(changed_flags: List[str]):
+        if not set(changed_flags).intersection(COMPLETENESS_FLAGS):
+            return
+
+        # The completeness state is recomputed with the new flag values
+        FeatureFlag.delete_cache()
+        recompute_completeness()
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+
+        if "is_enabled" in form.changed_data:
+            self._refresh_completeness([obj.flag])
+
     def enable_flags(self, request, queryset):
-        queryset.update(is_enabled=True)
+        queryset.update(is_enabled=True, modified=timezone.now())
+        self._refresh_completeness(list(queryset.values_list("flag", flat=True)))
+        purge_phase_page_cache()
 
     enable_flags.short_description = _("Activate selected flags")
 
     def disable_flags(self, request, queryset):
-        queryset.update(is_enabled=False)
+        queryset.update(is_enabled=False, modified=timezone.now())
+        self._refresh_completeness(list(queryset.values_list("flag", flat=True)))
+        purge_phase_page_cache()
 
     disable_flags.short_description = _("Deactivate selected flags")
 
@@ -707,15 +774,19 @@ class FeatureFlagAdmin(BasePermissionsAdmin):
 
             return
 
-        FeatureFlag.objects.filter(flag__in=enabled).update(is_enabled=True)
-        FeatureFlag.objects.filter(flag__in=disabled).update(is_enabled=False)
+        FeatureFlag.objects.filter(flag__in=enabled).update(is_enabled=True, modified=timezone.now())
+        FeatureFlag.objects.filter(flag__in=disabled).update(is_enabled=False, modified=timezone.now())
         FeatureFlag.delete_cache()
+        self._refresh_completeness(enabled + disabled)
 
         if "enable_candidate_supporting" in enabled:
             FeatureFlag.objects.filter(flag=PHASE_CHOICES.enable_candidate_supporting).update(
-                is_enabled=get_feature_flag(SETTINGS_CHOICES.global_support_round)
+                is_enabled=get_feature_flag(SETTINGS_CHOICES.global_support_round), modified=timezone.now()
             )
 
+        # The public pages cached during the previous phase are discarded
+        purge_phase_page_cache()
+
         self.message_user(request, message=_(f"Flags set successfully for '{phase_name}'."), level=messages.SUCCESS)
 
     def flags_phase_pause(self, request, __: QuerySet[FeatureFlag]):
@@ -869,3 +940,117 @@ class BlogPostAdmin(BasePermissionsAdmin):
         if request.user.is_staff:
             return True
         return False
+
+
+@admin.register(RequestStatistics)
+class RequestStatisticsAdmin(BasePermissionsAdmin):
+    list_display = [
+        "day",
+        "method",
+        "url_name",
+        "requests",
+        "average_duration",
+        "max_duration_display",
+        "average_queries",
+        "average_query_time",
+        "cache_hit_ratio",
+        "average_ngohub_time",
+        "average_storage_time",
+        "slow_requests",
+        "errors",
+    ]
+    list_filter = ["day", "method"]
+    search_fields = ["url_name"]
+    ordering = ["-day", "-total_duration"]
+    date_hierarchy = "day"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @staticmethod
+    def _average(value: float, statistics: RequestStatistics) -> str:
+        return f"{value / statistics.requests:.1f}" if statistics.requests else "-"
+
+    def average_duration(self, obj: RequestStatistics):
+        return self._average(obj.total_duration, obj)
+
+    average_duration.short_description = _("Average duration (ms)")
+    average_duration.admin_order_field = "total_duration"
+
+    def max_duration_display(self, obj: RequestStatistics):
+        return f"{obj.max_duration:.1f}"
+
+    max_duration_display.short_description = _("Maximum duration (ms)")
+    max_duration_display.admin_order_field = "max_duration"
+
+    def average_queries(self, obj: RequestStatistics):
+        return self._average(obj.queries, obj)
+
+    average_queries.short_description = _("Average queries")
+    average_queries.admin_order_field = "queries"
+
+    def average_query_time(self, obj: RequestStatistics):
+        return self._average(obj.query_time, obj)
+
+    average_query_time.short_description = _("Average database time (ms)")
+    average_query_time.admin_order_field = "query_time"
+
+    def cache_hit_ratio(self, obj: RequestStatistics):
+        lookups: int = obj.cache_hits + obj.cache_misses
+        return f"{obj.cache_hits / lookups:.0%}" if lookups else "-"
+
+    cache_hit_ratio.short_description = _("Cache hits")
+
+    def average_ngohub_time(self, obj: RequestStatistics):
+        return self._average(obj.ngohub_time, obj)
+
+    average_ngohub_time.short_description = _("Average NGO Hub time (ms)")
+    average_ngohub_time.admin_order_field = "ngohub_time"
+
+    def average_storage_time(self, obj: RequestStatistics):
+        return self._average(obj.storage_time, obj)
+
+    average_storage_time.short_description = _("Average storage time (ms)")
+    average_storage_time.admin_order_field = "storage_time"
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(BasePermissionsAdmin):
+    list_display = ["created", "method", "path", "url_name", "status_code", "duration_display", "user"]
+    list_filter = ["method", "status_code"]
+    search_fields = ["path", "url_name", "user__email"]
+    ordering = ["-created"]
+    date_hierarchy = "created"
+
+    fields = [
+        "created",
+        "user",
+        "method",
+        "path",
+        "url_name",
+        "status_code",
+        "duration_display",
+        "profile",
+        "summary_display",
+    ]
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def duration_display(self, obj: RequestProfile):
+        return f"{obj.duration:.1f}"
+
+    duration_display.short_description = _("Duration (ms)")
+    duration_display.admin_order_field = "duration"
+
+    def summary_display(self, obj: RequestProfile):
+        return format_html("<pre>{}</pre>", obj.summary)
+
+    summary_display.short_description = _("Summary")
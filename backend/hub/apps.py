@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class HubConfig(AppConfig):
     name = "hub"
+
+    def ready(self):
+        from civil_society_vote.common import metrics  # noqa: F401
+        from hub import page_cache, thumbnails, viewer_profile  # noqa: F401
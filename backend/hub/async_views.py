@@ -0,0 +1,277 @@
+"""
+Async versions of the read-heavy public views, used when the application is served through ASGI (USE_ASGI).
+
+The database and cache work of each view is done with the async ORM and cache APIs before the response is built,
+so that the request never blocks the event loop. Template rendering (along with the context processors) is still
+done by Django in a synchronous thread, so lazy values left in the context are safe to use from the templates.
+"""
+
+from typing import Dict, List, Optional, Tuple, Union
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db.models import QuerySet
+from django.http import HttpRequest, JsonResponse
+
+from accounts.models import User
+from hub.models import PHASE_CHOICES, SETTINGS_CHOICES, Candidate, City, Domain, FeatureFlag, Organization
+from hub.views import (
+    BlogListView,
+    CandidateListView,
+    CandidateResultsView,
+    HealthView,
+    HomeView,
+    OrganizationListView,
+    group_elements_by_domain,
+)
+from hub.viewer_profile import get_viewer_profile
+
+
+@sync_to_async
+def aget_request_user(request: HttpRequest) -> Union[User, AnonymousUser]:
+    """
+    The request user is lazily loaded from the session (and replaced by the impersonation middleware),
+    which has to happen in a synchronous context
+    """
+    user = request.user
+    _ = user.is_anonymous
+
+    return user
+
+
+async def agroup_queryset_by_domain(
+    queryset: QuerySet, *, domain_variable_name: str, sort_variable: str = "name"
+) -> List[Dict[str, Union[Domain, List[Union[Organization, Candidate]]]]]:
+    all_domains = {pk: name async for pk, name in Domain.objects.values_list("pk", "name")}
+    elements = [element async for element in queryset]
+
+    return group_elements_by_domain(
+        elements, all_domains, domain_variable_name=domain_variable_name, sort_variable=sort_variable
+    )
+
+
+async def aget_current_domain(domain_id: Optional[str]) -> Optional[Domain]:
+    if not domain_id:
+        return None
+
+    try:
+        return await Domain.objects.aget(id=domain_id)
+    except Domain.DoesNotExist:
+        return None
+
+
+class AsyncHealthView(HealthView):
+    async def get(self, request):
+        user = await aget_request_user(request)
+
+        if not user.is_anonymous:
+            # Load the viewer profile (kept on the user) before building the response
+            await sync_to_async(get_viewer_profile)(user)
+
+        return JsonResponse(self.get_health_data(user))
+
+
+class AsyncHomeView(HomeView):
+    # The form views also define a synchronous "put" handler, which would prevent the view from being async
+    http_method_names = ["get", "post", "head", "options"]
+
+    async def get(self, request, *args, **kwargs):
+        return self.render_to_response(self.get_context_data())
+
+    async def post(self, request, *args, **kwargs):
+        # Validating the reCAPTCHA and sending the contact e-mail are blocking calls
+        return await sync_to_async(super().post)(request, *args, **kwargs)
+
+
+class AsyncListMixin:
+    """
+    Async "get" for list views: the queryset, the object count and the current page are fetched through the async ORM
+    and handed to the synchronous pagination, which then doesn't need to query the database anymore.
+
+    Empty lists are always allowed. Views using this mixin must override aget_queryset and aget_context_data
+    if their synchronous counterparts query the database or the cache.
+    """
+
+    _object_count: Optional[int] = None
+    _paginated_result: Optional[Tuple[Paginator, Page, List, bool]] = None
+
+    async def aget_queryset(self):
+        return self.get_queryset()
+
+    async def aget_context_data(self, **kwargs) -> Dict:
+        return self.get_context_data(**kwargs)
+
+    def get_paginator(self, queryset, per_page, orphans=0, allow_empty_first_page=True, **kwargs):
+        paginator = super().get_paginator(queryset, per_page, orphans, allow_empty_first_page, **kwargs)
+
+        if self._object_count is not None:
+            paginator.count = self._object_count
+
+        return paginator
+
+    def paginate_queryset(self, queryset, page_size):
+        if self._paginated_result is None:
+            self._paginated_result = super().paginate_queryset(queryset, page_size)
+
+        return self._paginated_result
+
+    async def apaginate_queryset(self, queryset, page_size) -> Tuple[Paginator, Page, List, bool]:
+        if isinstance(queryset, QuerySet):
+            self._object_count = await queryset.acount()
+
+        paginator, page, object_list, is_paginated = self.paginate_queryset(queryset, page_size)
+
+        if isinstance(object_list, QuerySet):
+            page.object_list = [element async for element in object_list]
+
+        self._paginated_result = (paginator, page, page.object_list, is_paginated)
+
+        return self._paginated_result
+
+    async def get(self, request, *args, **kwargs):
+        self.object_list = await self.aget_queryset()
+
+        page_size = self.get_paginate_by(self.object_list)
+        if page_size:
+            await self.apaginate_queryset(self.object_list, page_size)
+        elif isinstance(self.object_list, QuerySet):
+            self.object_list = [element async for element in self.object_list]
+
+        context = await self.aget_context_data()
+
+        return self.render_to_response(context)
+
+
+class AsyncOrganizationListView(AsyncListMixin, OrganizationListView):
+    async def get(self, request, *args, **kwargs):
+        response = await super().get(request, *args, **kwargs)
+
+        if self.request.GET.get("q"):
+            response["X-Robots-Tag"] = "noindex"
+
+        return response
+
+    async def aget_queryset(self):
+        queryset_filtered = self.get_filtered_queryset()
+
+        if await FeatureFlag.aflag_enabled(SETTINGS_CHOICES.enable_voting_domain):
+            return await agroup_queryset_by_domain(queryset_filtered, domain_variable_name="voting_domain")
+
+        return queryset_filtered
+
+    async def aget_cached_context(self, context_cache_key, orgs) -> Dict:
+        sentinel = object()
+        context_cache = await cache.aget(context_cache_key, sentinel)
+        if context_cache is not sentinel:
+            return context_cache
+
+        context_cache = {}
+
+        context_cache["counties"] = [
+            county async for county in orgs.order_by("county").values_list("county", flat=True).distinct("county")
+        ]
+        if self.request.GET.get("county"):
+            orgs = orgs.filter(county=self.request.GET.get("county"))
+
+        context_cache["cities"] = {city async for city in orgs.values_list("city__id", "city__city")}
+
+        context_cache["counters"] = {
+            "ngos_accepted": await Organization.objects.filter(status=Organization.STATUS.accepted).acount()
+        }
+
+        if self.request.GET.get("city"):
+            try:
+                context_cache["current_city_name"] = (await City.objects.aget(id=self.request.GET.get("city"))).city
+            except City.DoesNotExist:
+                context_cache["current_city_name"] = "-"
+
+        await cache.aset(context_cache_key, context_cache, settings.TIMEOUT_CACHE_SHORT)
+
+        return context_cache
+
+    async def aget_context_data(self, **kwargs) -> Dict:
+        # Skip OrganizationListView.get_context_data, which reads the context cache synchronously
+        context = super(OrganizationListView, self).get_context_data(**kwargs)
+        orgs: QuerySet[Organization] = self.search(self.get_qs())
+
+        context.update(self.get_listing_context())
+
+        context_cache = await self.aget_cached_context(self.get_context_cache_key(), orgs)
+        context.update(context_cache)
+
+        return context
+
+
+class AsyncCandidateListView(AsyncListMixin, CandidateListView):
+    async def aget_qs(self):
+        if await FeatureFlag.aflag_enabled(PHASE_CHOICES.enable_candidate_voting) or await FeatureFlag.aflag_enabled(
+            PHASE_CHOICES.enable_pending_results
+        ):
+            return self.get_candidates_to_vote()
+
+        if await FeatureFlag.aflag_enabled(PHASE_CHOICES.enable_results_display):
+            return Candidate.objects_with_org.none()
+
+        return self.get_candidates_proposed()
+
+    async def aget_queryset(self):
+        queryset_filtered = self.get_filtered_queryset(await self.aget_qs())
+
+        if not await FeatureFlag.aflag_enabled(SETTINGS_CHOICES.single_domain_round):
+            return await agroup_queryset_by_domain(queryset_filtered, domain_variable_name="domain")
+
+        return queryset_filtered
+
+    async def aget_context_data(self, **kwargs) -> Dict:
+        # Skip CandidateListView.get_context_data, which checks the feature flags synchronously
+        context = super(CandidateListView, self).get_context_data(**kwargs)
+        context["current_search"] = self.request.GET.get("q", "")
+
+        context["should_display_candidates"] = not await FeatureFlag.aflag_enabled(PHASE_CHOICES.enable_results_display)
+
+        current_domain = await aget_current_domain(self.request.GET.get("domain"))
+        if current_domain:
+            context["current_domain"] = current_domain
+
+        candidates = await self.aget_qs()
+        context["counters"] = {
+            "candidates_pending": await candidates.filter(is_proposed=True).acount(),
+        }
+        context["domains"] = [domain async for domain in Domain.objects.all()]
+        context.update(self.get_listing_context())
+
+        return context
+
+
+class AsyncCandidateResultsView(AsyncListMixin, CandidateResultsView):
+    async def aget_qs(self):
+        if await FeatureFlag.aflag_enabled("enable_results_display"):
+            return self.get_candidates_results()
+
+        user = await aget_request_user(self.request)
+        if not user.is_anonymous and await sync_to_async(user.in_staff_groups)():
+            return self.get_candidates_results()
+
+        return Candidate.objects_with_org.none()
+
+    async def aget_queryset(self):
+        return self.get_filtered_queryset(await self.aget_qs())
+
+    async def aget_context_data(self, **kwargs) -> Dict:
+        # Skip CandidateResultsView.get_context_data, which fetches the domains synchronously
+        context = super(CandidateResultsView, self).get_context_data(**kwargs)
+        context["current_search"] = self.request.GET.get("q", "")
+
+        current_domain = await aget_current_domain(self.request.GET.get("domain"))
+        if current_domain:
+            context["current_domain"] = current_domain
+
+        context["domains"] = [domain async for domain in Domain.objects.all()]
+        return context
+
+
+class AsyncBlogListView(AsyncListMixin, BlogListView):
+    pass
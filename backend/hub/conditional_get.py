@@ -0,0 +1,109 @@
+"""
+Conditional GET for the public pages: the anonymous visitors get an ETag and a Last-Modified date, computed from
+the last change of the rows displayed by the page and from the feature flags, and the page isn't rendered again
+when the copy they already have is still current.
+
+The logged-in users see their own actions on the same pages, so their responses don't get validators.
+"""
+
+import hashlib
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Max, QuerySet
+from django.db.models.functions import Greatest
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.utils.translation import get_language
+
+from hub.models import FeatureFlag
+from hub.page_cache import is_anonymous_page_request
+
+
+def get_rows_state(queryset: QuerySet, *fields: str) -> Dict[str, Any]:
+    """
+    The last modification date of the given fields (e.g. "modified", "org__modified") and the number of rows
+    in the queryset, which also changes when a row is deleted
+    """
+    last_modified = Max(fields[0]) if len(fields) == 1 else Greatest(*[Max(field) for field in fields])
+
+    return queryset.aggregate(last_modified=last_modified, count=Count("pk"))
+
+
+class ConditionalGetMixin:
+    """
+    Answer the conditional requests of the anonymous visitors with 304 responses, without rendering the page.
+    The views define the state of the page, along with its Cache-Control directives.
+    """
+
+    # Revalidated on every visit, so that the new phase is displayed right away
+    cache_control: Dict[str, Any] = {"public": True, "max_age": 0, "must_revalidate": True}
+
+    def get_page_state(self) -> Optional[Dict[str, Any]]:
+        """
+        The "last_modified" date of the rows displayed by the page, along with anything else which changes the page,
+        or None if the page doesn't exist
+        """
+        raise NotImplementedError
+
+    def _get_validators(self, request: HttpRequest) -> Optional[Tuple[str, datetime]]:
+        if not is_anonymous_page_request(request):
+            return None
+
+        page_state: Optional[Dict[str, Any]] = self.get_page_state()
+        if not page_state or not page_state.get("last_modified"):
+            return None
+
+        # The state can include the states of other rows displayed by the page, e.g. {"domains": get_rows_state(...)}
+        modified_dates = [page_state["last_modified"], FeatureFlag.get_flags_modified()] + [
+            value.get("last_modified") for value in page_state.values() if isinstance(value, dict)
+        ]
+        last_modified: datetime = max(modified for modified in modified_dates if modified)
+
+        state = sorted(page_state.items()) + [("language", get_language()), ("flags", FeatureFlag.get_flags_version())]
+        # noinspection InsecureHash
+        etag: str = quote_etag(hashlib.sha256(str(state).encode()).hexdigest()[:32])
+
+        return etag, last_modified
+
+    def _get_conditional_response(self, request: HttpRequest, validators) -> Optional[HttpResponse]:
+        if not validators:
+            return None
+
+        etag, last_modified = validators
+        response = get_conditional_response(request, etag=etag, last_modified=int(last_modified.timestamp()))
+
+        return self._set_validators(response, validators) if response is not None else None
+
+    def _set_validators(self, response: HttpResponse, validators) -> HttpResponse:
+        if not validators or response.status_code not in (200, 304):
+            return response
+
+        etag, last_modified = validators
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+        patch_cache_control(response, **self.cache_control)
+
+        return response
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return self._adispatch_conditional(request, *args, **kwargs)
+
+        validators = self._get_validators(request)
+        not_modified_response: Optional[HttpResponse] = self._get_conditional_response(request, validators)
+        if not_modified_response is not None:
+            return not_modified_response
+
+        return self._set_validators(super().dispatch(request, *args, **kwargs), validators)
+
+    async def _adispatch_conditional(self, request, *args, **kwargs):
+        # Loading the user from the session and reading the state of the page are blocking calls
+        validators = await sync_to_async(self._get_validators)(request)
+        not_modified_response: Optional[HttpResponse] = self._get_conditional_response(request, validators)
+        if not_modified_response is not None:
+            return not_modified_response
+
+        return self._set_validators(await super().dispatch(request, *args, **kwargs), validators)
@@ -3,9 +3,11 @@ from typing import Any, Dict
 from django.conf import settings
 from django.http import HttpRequest
 from django.urls import reverse
+from django.utils.functional import SimpleLazyObject
 
 from civil_society_vote.common.cache import cache_decorator
 from hub.models import FLAG_CHOICES, FeatureFlag
+from hub.viewer_profile import get_viewer_permissions, get_viewer_profile
 
 
 @cache_decorator(cache_key="hub_settings", timeout=settings.TIMEOUT_CACHE_SHORT)
@@ -65,3 +67,11 @@ def hub_settings(_: HttpRequest) -> Dict[str, Any]:
             or org_registration_enabled
         ),
     }
+
+
+def viewer_profile(request: HttpRequest) -> Dict[str, Any]:
+    # Both are evaluated only by the templates which use them
+    return {
+        "viewer": SimpleLazyObject(lambda: get_viewer_profile(request.user) or {}),
+        "viewer_permissions": get_viewer_permissions(request),
+    }
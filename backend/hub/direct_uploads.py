@@ -0,0 +1,104 @@
+"""
+Direct uploads: the browser uploads the documents straight to the S3 bucket with a presigned POST request
+(whose policy enforces the maximum document size), and the form only receives a signed token naming the object.
+"""
+
+import posixpath
+from typing import Dict, Optional, Type, Union
+from uuid import uuid4
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.db.models import FileField, Model
+from django.urls import reverse
+from django.utils.translation import gettext_lazy as _
+
+from hub.models import Candidate, Organization, file_validator
+
+DIRECT_UPLOAD_MODELS: Dict[str, Type[Union[Organization, Candidate]]] = {
+    "organization": Organization,
+    "candidate": Candidate,
+}
+
+DIRECT_UPLOAD_TOKEN_SALT = "hub.direct_uploads"
+DIRECT_UPLOAD_FIELD_SUFFIX = "__direct_upload"
+
+
+def get_direct_upload_file_field(instance: Model, field_name: str) -> Optional[FileField]:
+    if instance._meta.model_name not in DIRECT_UPLOAD_MODELS:
+        return None
+
+    field = next((field for field in instance._meta.concrete_fields if field.name == field_name), None)
+    if not isinstance(field, FileField):
+        return None
+
+    return field
+
+
+def get_direct_upload_url(instance: Model, field_name: str) -> str:
+    if not settings.ENABLE_DIRECT_UPLOADS or not instance.pk:
+        return ""
+
+    if not get_direct_upload_file_field(instance, field_name):
+        return ""
+
+    return reverse("direct-upload", args=[instance._meta.model_name, instance.pk, field_name])
+
+
+def create_presigned_upload(instance: Model, field_name: str, filename: str) -> Dict:
+    """
+    Presign the upload of a new object for the given file field, which is valid for a single object name
+    and for objects smaller than the maximum document size
+    """
+    field: FileField = get_direct_upload_file_field(instance, field_name)
+    storage = field.storage
+
+    # Every upload gets its own directory, so that the name never clashes with an existing file
+    name: str = field.generate_filename(instance, posixpath.join(uuid4().hex, posixpath.basename(filename)))
+    key: str = storage._normalize_name(name)
+
+    fields: Dict[str, str] = {}
+    conditions = [["content-length-range", 1, settings.MAX_DOCUMENT_SIZE]]
+    if storage.default_acl:
+        fields["acl"] = storage.default_acl
+        conditions.append({"acl": storage.default_acl})
+
+    presigned_post: Dict = storage.connection.meta.client.generate_presigned_post(
+        Bucket=storage.bucket_name,
+        Key=key,
+        Fields=fields,
+        Conditions=conditions,
+        ExpiresIn=settings.DIRECT_UPLOAD_EXPIRATION,
+    )
+
+    token: str = signing.dumps(
+        {"model": instance._meta.model_name, "pk": instance.pk, "field": field_name, "name": name},
+        salt=DIRECT_UPLOAD_TOKEN_SALT,
+    )
+
+    return {"url": presigned_post["url"], "fields": presigned_post["fields"], "token": token}
+
+
+def load_direct_upload(instance: Model, field_name: str, token: str) -> str:
+    """
+    Validate the token of a direct upload for the given file field and return the name of the uploaded object
+    """
+    try:
+        upload: Dict = signing.loads(token, salt=DIRECT_UPLOAD_TOKEN_SALT, max_age=settings.DIRECT_UPLOAD_EXPIRATION)
+    except signing.BadSignature:
+        raise ValidationError(_("The uploaded file has expired, please upload it again."))
+
+    if (upload["model"], upload["pk"], upload["field"]) != (instance._meta.model_name, instance.pk, field_name):
+        raise ValidationError(_("The uploaded file does not belong to this field."))
+
+    field: FileField = get_direct_upload_file_field(instance, field_name)
+    file = field.attr_class(instance, field, upload["name"])
+
+    try:
+        # The size check also makes sure that the object was uploaded
+        file_validator(file)
+    except FileNotFoundError:
+        raise ValidationError(_("The uploaded file could not be found, please upload it again."))
+
+    return upload["name"]
@@ -0,0 +1,154 @@
+"""
+ZIP archives with the documents of a batch of organizations or candidates, streamed while they are written:
+every document is read from the storage in chunks and added to the archive as it is, so neither the archive
+nor a whole document is ever kept in memory or in a temporary file.
+"""
+
+import logging
+import posixpath
+import zipfile
+from typing import Iterable, Iterator, List, Tuple, Type
+
+from django.db.models import FileField, Model, QuerySet
+from django.db.models.fields.files import FieldFile
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import content_disposition_header
+from django.utils.text import slugify
+from storages.backends.s3 import S3Storage
+
+from hub.models import Candidate, Organization
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_CHUNK_SIZE = 64 * 1024
+
+# The pictures are displayed on the site, only the documents are reviewed by the committee
+EXCLUDED_DOCUMENT_FIELDS = ("logo", "photo")
+
+MISSING_DOCUMENTS_FILE_NAME = "missing_documents.txt"
+
+
+def get_document_fields(model: Type[Model]) -> List[FileField]:
+    return [
+        field
+        for field in model._meta.concrete_fields
+        if isinstance(field, FileField) and field.name not in EXCLUDED_DOCUMENT_FIELDS
+    ]
+
+
+def _get_folder_name(instance: Model, name: str) -> str:
+    return f"{instance.pk}-{slugify(name)}"
+
+
+def _iter_instance_documents(instance: Model, folder: str) -> Iterator[Tuple[str, FieldFile]]:
+    for field in get_document_fields(type(instance)):
+        document: FieldFile = getattr(instance, field.name)
+        if not document:
+            continue
+
+        extension: str = posixpath.splitext(document.name)[1]
+        yield posixpath.join(folder, f"{field.name}{extension}"), document
+
+
+def iter_organizations_documents(queryset: QuerySet[Organization]) -> Iterator[Tuple[str, FieldFile]]:
+    for organization in queryset.order_by("pk").iterator(chunk_size=100):
+        yield from _iter_instance_documents(organization, _get_folder_name(organization, organization.name))
+
+
+def iter_candidates_documents(queryset: QuerySet[Candidate]) -> Iterator[Tuple[str, FieldFile]]:
+    """
+    The documents of every candidate, along with the documents of the candidate's organization
+    """
+    for candidate in queryset.select_related("org").order_by("pk").iterator(chunk_size=100):
+        folder: str = _get_folder_name(candidate, candidate.name)
+        yield from _iter_instance_documents(candidate, folder)
+
+        if candidate.org:
+            yield from _iter_instance_documents(candidate.org, posixpath.join(folder, "organization"))
+
+
+def iter_document_chunks(document: FieldFile) -> Iterator[bytes]:
+    storage = document.storage
+
+    if isinstance(storage, S3Storage):
+        # Opening the file through the storage would download the whole object first
+        response = storage.connection.meta.client.get_object(
+            Bucket=storage.bucket_name, Key=storage._normalize_name(document.name)
+        )
+        yield from response["Body"].iter_chunks(DOCUMENT_CHUNK_SIZE)
+        return
+
+    with storage.open(document.name, "rb") as document_file:
+        yield from document_file.chunks(DOCUMENT_CHUNK_SIZE)
+
+
+class _ZipStream:
+    """
+    A write-only file object which keeps the bytes written by the ZIP archive until they are sent
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_documents_zip(documents: Iterable[Tuple[str, FieldFile]]) -> Iterator[bytes]:
+    stream = _ZipStream()
+    date_time = timezone.localtime().timetuple()[:6]
+    missing_documents: List[str] = []
+
+    # The documents are mostly PDF files and pictures, which don't get smaller by compressing them again
+    with zipfile.ZipFile(stream, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for path, document in documents:
+            chunks = iter_document_chunks(document)
+            try:
+                # Reading the first chunk opens the document, before its entry is added to the archive
+                first_chunk: bytes = next(chunks, b"")
+            except Exception:
+                logger.exception("Cannot read the document %s", document.name)
+                missing_documents.append(path)
+                continue
+
+            with archive.open(zipfile.ZipInfo(path, date_time=date_time), mode="w") as entry:
+                entry.write(first_chunk)
+                for chunk in chunks:
+                    entry.write(chunk)
+                    yield stream.pop()
+
+            yield stream.pop()
+
+        if missing_documents:
+            archive.writestr(
+                zipfile.ZipInfo(MISSING_DOCUMENTS_FILE_NAME, date_time=date_time), "\n".join(missing_documents)
+            )
+
+    yield stream.pop()
+
+
+def documents_zip_response(documents: Iterable[Tuple[str, FieldFile]], file_name: str) -> StreamingHttpResponse:
+    response = StreamingHttpResponse(stream_documents_zip(documents), content_type="application/zip")
+    response["Content-Disposition"] = content_disposition_header(as_attachment=True, filename=file_name)
+
+    return response
+
+
+def organizations_documents_response(queryset: QuerySet[Organization]) -> StreamingHttpResponse:
+    file_name = f"organizations_documents_{timezone.localtime():%Y%m%d_%H%M}.zip"
+    return documents_zip_response(iter_organizations_documents(queryset), file_name)
+
+
+def candidates_documents_response(queryset: QuerySet[Candidate]) -> StreamingHttpResponse:
+    file_name = f"candidates_documents_{timezone.localtime():%Y%m%d_%H%M}.zip"
+    return documents_zip_response(iter_candidates_documents(queryset), file_name)
@@ -13,6 +13,7 @@ from sentry_sdk import capture_message
 
 from accounts.models import NGO_GROUP
 from civil_society_vote.common.messaging import send_email
+from hub.direct_uploads import DIRECT_UPLOAD_FIELD_SUFFIX, load_direct_upload
 from hub.models import FLAG_CHOICES, PHASE_CHOICES, Candidate, City, Domain, FeatureFlag, Organization
 
 UserModel = get_user_model()
@@ -142,7 +143,42 @@ class OrganizationCreateFromNgohubForm(forms.ModelForm):
         return organization
 
 
-class OrganizationUpdateForm(forms.ModelForm):
+class DirectUploadFormMixin:
+    """
+    Accept the files uploaded straight to the storage (see hub.direct_uploads) in place of the files sent with the form
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.direct_upload_tokens: Dict[str, str] = {}
+        if not settings.ENABLE_DIRECT_UPLOADS:
+            return
+
+        for field_name, field in self.fields.items():
+            token = self.data.get(f"{field_name}{DIRECT_UPLOAD_FIELD_SUFFIX}")
+            if token and isinstance(field, forms.FileField) and not field.disabled:
+                self.direct_upload_tokens[field_name] = token
+                field.required = False
+
+    def clean(self):
+        cleaned_data = super().clean()
+
+        for field_name, token in self.direct_upload_tokens.items():
+            try:
+                name = load_direct_upload(self.instance, field_name, token)
+            except ValidationError as e:
+                self.add_error(field_name, e)
+                continue
+
+            # The file fields missing from the request are otherwise left unchanged on the instance
+            cleaned_data[field_name] = name
+            setattr(self.instance, field_name, name)
+
+        return cleaned_data
+
+
+class OrganizationUpdateForm(DirectUploadFormMixin, forms.ModelForm):
     field_order = ORG_FIELD_ORDER
 
     class Meta:
@@ -251,7 +287,7 @@ class OrganizationUpdateForm(forms.ModelForm):
         return super().save(commit)
 
 
-class CandidateCommonForm(forms.ModelForm):
+class CandidateCommonForm(DirectUploadFormMixin, forms.ModelForm):
     field_order = [
         "domain",
         "name",
@@ -0,0 +1,408 @@
+import json
+import os
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, connections
+from django.http import HttpResponse
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import COMMITTEE_GROUP, User
+from civil_society_vote.common.pooled_postgresql.pool import close_connection_pools
+from hub.management.commands.seed_load_data import LOAD_TEST_EMAIL_DOMAIN, LOAD_TEST_PASSWORD
+from hub.models import PHASE_CHOICES, Candidate, CandidateVote, FeatureFlag, Organization
+
+PERCENTILES = (50, 95, 99)
+
+# The phase flags enabled while replaying each part of the load profile, as set by the admin phase actions
+PHASE_FLAGS: Dict[str, List[str]] = {
+    "supporting": [
+        PHASE_CHOICES.enable_org_registration,
+        PHASE_CHOICES.enable_org_editing,
+        PHASE_CHOICES.enable_org_approval,
+        PHASE_CHOICES.enable_candidate_registration,
+        PHASE_CHOICES.enable_candidate_editing,
+        PHASE_CHOICES.enable_candidate_supporting,
+    ],
+    "confirmation": [
+        PHASE_CHOICES.enable_org_registration,
+        PHASE_CHOICES.enable_org_editing,
+        PHASE_CHOICES.enable_org_approval,
+        PHASE_CHOICES.enable_candidate_confirmation,
+    ],
+    "voting": [
+        PHASE_CHOICES.enable_org_registration,
+        PHASE_CHOICES.enable_org_editing,
+        PHASE_CHOICES.enable_org_approval,
+        PHASE_CHOICES.enable_candidate_voting,
+    ],
+    "results": [
+        PHASE_CHOICES.enable_results_display,
+    ],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay an election-day load profile against the load test data (see `seed_load_data`) and report "
+        "the latency percentiles and the database queries of every endpoint. "
+        "The load profile runs on a copy of the database, which is dropped afterwards, "
+        "so every request commits its changes like in production and consecutive runs start from the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=50, help="Requests made to every endpoint")
+        parser.add_argument("--seed", type=int, default=42, help="Seed used to pick the users and the candidates")
+        parser.add_argument("--concurrency", type=int, default=1, help="Requests made at the same time")
+        parser.add_argument("--baseline", type=str, default="", help="JSON file with the results of a previous run")
+        parser.add_argument(
+            "--save-baseline",
+            action="store_true",
+            help="Store the results in the --baseline file instead of comparing them",
+        )
+        parser.add_argument(
+            "--latency-tolerance",
+            type=float,
+            default=0.25,
+            help="Allowed relative increase of the p95 latency over the baseline",
+        )
+        parser.add_argument(
+            "--queries-tolerance",
+            type=float,
+            default=0.1,
+            help="Allowed relative increase of the average number of queries over the baseline",
+        )
+
+    def handle(self, *args, **options):
+        if options["save_baseline"] and not options["baseline"]:
+            raise CommandError("The --save-baseline option requires a --baseline file")
+
+        if options["baseline"] and not options["save_baseline"] and not os.path.exists(options["baseline"]):
+            raise CommandError(f"The baseline file {options['baseline']} doesn't exist, create it with --save-baseline")
+
+        if options["concurrency"] < 1:
+            raise CommandError("The --concurrency option must be at least 1")
+
+        random.seed(options["seed"])
+        self.iterations: int = options["iterations"]
+        self.concurrency: int = options["concurrency"]
+        self.measurements: Dict[str, List[Tuple[float, int, bool]]] = {}
+
+        self._load_actors()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Replaying the load profile with {self.iterations} iterations "
+                f"and {self.concurrency} concurrent requests..."
+            )
+        )
+
+        with self._database_copy():
+            self._run_profile()
+
+        self._reset_flags_cache()
+
+        results = self._summarize()
+        self._print_results(results)
+
+        if not options["baseline"]:
+            return
+
+        if options["save_baseline"]:
+            with open(options["baseline"], "w") as baseline_file:
+                json.dump({"created": timezone.now().isoformat(), "endpoints": results}, baseline_file, indent=2)
+
+            self.stdout.write(self.style.SUCCESS(f"Baseline saved to {options['baseline']}"))
+            return
+
+        with open(options["baseline"]) as baseline_file:
+            baseline = json.load(baseline_file)["endpoints"]
+
+        regressions = self._find_regressions(
+            results, baseline, options["latency_tolerance"], options["queries_tolerance"]
+        )
+        if regressions:
+            raise CommandError("Performance regressions found:\n" + "\n".join(regressions))
+
+        self.stdout.write(self.style.SUCCESS("No performance regressions found"))
+
+    def _load_actors(self):
+        load_users = User.objects.filter(email__endswith=f"@{LOAD_TEST_EMAIL_DOMAIN}")
+
+        organization_users = load_users.filter(organization__status=Organization.STATUS.accepted)
+        voted_organizations = CandidateVote.objects.values("organization_id")
+
+        self.supporter_users: List[User] = list(
+            organization_users.select_related("organization").order_by("?")[: self.iterations]
+        )
+        self.voter_users: List[User] = list(
+            organization_users.exclude(organization__in=voted_organizations)
+            .select_related("organization")
+            .order_by("?")[: self.iterations]
+        )
+        self.committee_users: List[User] = list(load_users.filter(groups__name=COMMITTEE_GROUP))
+
+        self.candidate_pks: List[int] = list(
+            Candidate.objects_with_org.filter(
+                is_proposed=True, domain__isnull=False, org__email__endswith=f"@{LOAD_TEST_EMAIL_DOMAIN}"
+            ).values_list("pk", flat=True)
+        )
+        self.confirmed_candidate_pks_by_domain: Dict[int, List[int]] = {}
+        for candidate_pk, domain_pk, status in Candidate.objects_with_org.filter(pk__in=self.candidate_pks).values_list(
+            "pk", "domain_id", "status"
+        ):
+            if status == Candidate.STATUS.confirmed:
+                self.confirmed_candidate_pks_by_domain.setdefault(domain_pk, []).append(candidate_pk)
+
+        if not (self.supporter_users and self.voter_users and self.committee_users and self.candidate_pks):
+            raise CommandError("The load test data is missing, run the `seed_load_data` command first")
+
+    @contextmanager
+    def _database_copy(self) -> Iterator[None]:
+        """
+        Point all the connections to a fresh copy of the database, and drop it at the end
+        """
+        database_settings = connection.settings_dict
+        database_name: str = database_settings["NAME"]
+        copy_name: str = f"{database_name}_benchmark"
+
+        # Postgres only copies a database when nobody else is connected to it
+        self._close_connections()
+        try:
+            self._execute_without_database(
+                f"DROP DATABASE IF EXISTS {connection.ops.quote_name(copy_name)} WITH (FORCE)",
+                f"CREATE DATABASE {connection.ops.quote_name(copy_name)} "
+                f"TEMPLATE {connection.ops.quote_name(database_name)}",
+            )
+        except DatabaseError as e:
+            raise CommandError(
+                f"Cannot copy the {database_name} database, stop the web server and the background workers first: {e}"
+            )
+
+        database_settings["NAME"] = copy_name
+        try:
+            yield
+        finally:
+            self._close_connections()
+            database_settings["NAME"] = database_name
+
+            self._execute_without_database(f"DROP DATABASE {connection.ops.quote_name(copy_name)} WITH (FORCE)")
+
+    @staticmethod
+    def _close_connections():
+        connections.close_all()
+        close_connection_pools()
+
+    @staticmethod
+    def _execute_without_database(*statements: str):
+        with connection._nodb_cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+
+    def _reset_flags_cache(self):
+        FeatureFlag.delete_cache()
+        cache.delete("hub_settings")
+
+    def _switch_phase(self, phase: str):
+        enabled_flags: List[str] = PHASE_FLAGS[phase]
+
+        FeatureFlag.objects.filter(flag__in=enabled_flags).update(is_enabled=True)
+        FeatureFlag.objects.filter(flag__in=[x[0] for x in PHASE_CHOICES]).exclude(flag__in=enabled_flags).update(
+            is_enabled=False
+        )
+        self._reset_flags_cache()
+
+    def _client(self, user: Optional[User] = None) -> Client:
+        client = Client(raise_request_exception=False)
+        if user:
+            client.force_login(user)
+
+        return client
+
+    def _measure(self, endpoint: str, request: Callable[[], HttpResponse], expected_status: int):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = request()
+            duration = (time.perf_counter() - start) * 1000
+
+        # The test client keeps the connection of the thread open, unlike the servers at the end of every request
+        connection.close()
+
+        self.measurements.setdefault(endpoint, []).append(
+            (duration, len(queries.captured_queries), response.status_code == expected_status)
+        )
+
+    def _run_phase(self, phase: str, iterations: List[Callable[[], None]]):
+        """
+        Switch to the given phase and run its iterations, with up to --concurrency of them at the same time
+        """
+        self._switch_phase(phase)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for _ in executor.map(lambda iteration: iteration(), iterations):
+                pass
+
+    def _run_profile(self):
+        # The users and the candidates are picked up front, so that the runs with the same seed make the same requests
+        def supporting_iteration(user: User, candidate_pk: int) -> Callable[[], None]:
+            def run():
+                login_client = self._client()
+                anonymous_client = self._client()
+
+                self._measure(
+                    "supporting:login",
+                    lambda: login_client.post(
+                        reverse("login"), {"username": user.email, "password": LOAD_TEST_PASSWORD}
+                    ),
+                    302,
+                )
+                self._measure("supporting:home", lambda: anonymous_client.get(reverse("home")), 200)
+                self._measure("supporting:candidate-list", lambda: anonymous_client.get(reverse("candidates")), 200)
+                self._measure("supporting:ngo-list", lambda: anonymous_client.get(reverse("ngos")), 200)
+                self._measure(
+                    "supporting:candidate-detail",
+                    lambda: login_client.get(reverse("candidate-detail", args=[candidate_pk])),
+                    200,
+                )
+                self._measure(
+                    "supporting:candidate-support",
+                    lambda: login_client.post(reverse("candidate-support", args=[candidate_pk])),
+                    302,
+                )
+
+            return run
+
+        def confirmation_iteration(committee_user: User, candidate_pk: int) -> Callable[[], None]:
+            def run():
+                committee_client = self._client(committee_user)
+
+                self._measure(
+                    "confirmation:committee-ngos", lambda: committee_client.get(reverse("committee-ngos")), 200
+                )
+                self._measure(
+                    "confirmation:committee-candidates",
+                    lambda: committee_client.get(reverse("committee-candidates")),
+                    200,
+                )
+                self._measure(
+                    "confirmation:candidate-detail",
+                    lambda: committee_client.get(reverse("candidate-detail", args=[candidate_pk])),
+                    200,
+                )
+
+            return run
+
+        def voting_iteration(user: User, candidate_pk: int) -> Callable[[], None]:
+            def run():
+                voter_client = self._client(user)
+                anonymous_client = self._client()
+
+                self._measure("voting:candidate-list", lambda: anonymous_client.get(reverse("candidates")), 200)
+                self._measure("voting:votes", lambda: voter_client.get(reverse("votes")), 200)
+                self._measure(
+                    "voting:candidate-detail",
+                    lambda: voter_client.get(reverse("candidate-detail", args=[candidate_pk])),
+                    200,
+                )
+                self._measure(
+                    "voting:candidate-vote",
+                    lambda: voter_client.post(reverse("candidate-vote", args=[candidate_pk])),
+                    302,
+                )
+
+            return run
+
+        def results_iteration():
+            anonymous_client = self._client()
+
+            self._measure("results:results", lambda: anonymous_client.get(reverse("results")), 200)
+            self._measure("results:candidate-list", lambda: anonymous_client.get(reverse("candidates")), 200)
+
+        self._run_phase(
+            "supporting",
+            [supporting_iteration(user, random.choice(self.candidate_pks)) for user in self.supporter_users],
+        )
+
+        self._run_phase(
+            "confirmation",
+            [
+                confirmation_iteration(
+                    self.committee_users[index % len(self.committee_users)], random.choice(self.candidate_pks)
+                )
+                for index in range(self.iterations)
+            ],
+        )
+
+        voting_iterations: List[Callable[[], None]] = []
+        for user in self.voter_users:
+            domain_candidate_pks: List[int] = self.confirmed_candidate_pks_by_domain.get(
+                user.organization.voting_domain_id
+            ) or random.choice(list(self.confirmed_candidate_pks_by_domain.values()))
+            voting_iterations.append(voting_iteration(user, random.choice(domain_candidate_pks)))
+        self._run_phase("voting", voting_iterations)
+
+        self._run_phase("results", [results_iteration] * self.iterations)
+
+    def _summarize(self) -> Dict[str, Dict]:
+        results: Dict[str, Dict] = {}
+        for endpoint, measurements in self.measurements.items():
+            durations = [duration for duration, _, _ in measurements]
+            queries = [queries_count for _, queries_count, _ in measurements]
+
+            if len(durations) > 1:
+                quantiles = statistics.quantiles(durations, n=100, method="inclusive")
+            else:
+                quantiles = durations * 99
+
+            results[endpoint] = {
+                "requests": len(measurements),
+                "errors": len([ok for _, _, ok in measurements if not ok]),
+                "queries": round(statistics.mean(queries), 2),
+                **{f"p{percentile}": round(quantiles[percentile - 1], 2) for percentile in PERCENTILES},
+            }
+
+        return results
+
+    def _print_results(self, results: Dict[str, Dict]):
+        header = f"{'Endpoint':<36}{'Requests':>10}{'Errors':>8}{'Queries':>10}" + "".join(
+            f"{f'p{percentile} (ms)':>12}" for percentile in PERCENTILES
+        )
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+
+        for endpoint, result in results.items():
+            self.stdout.write(
+                f"{endpoint:<36}{result['requests']:>10}{result['errors']:>8}{result['queries']:>10}"
+                + "".join(f"{result[f'p{percentile}']:>12}" for percentile in PERCENTILES)
+            )
+
+    @staticmethod
+    def _find_regressions(
+        results: Dict[str, Dict], baseline: Dict[str, Dict], latency_tolerance: float, queries_tolerance: float
+    ) -> List[str]:
+        regressions: List[str] = []
+        for endpoint, result in results.items():
+            if result["errors"]:
+                regressions.append(f"{endpoint}: {result['errors']} unexpected responses")
+
+            if endpoint not in baseline:
+                continue
+
+            expected = baseline[endpoint]
+            if result["p95"] > expected["p95"] * (1 + latency_tolerance):
+                regressions.append(f"{endpoint}: p95 latency {result['p95']} ms, baseline {expected['p95']} ms")
+            if result["queries"] > expected["queries"] * (1 + queries_tolerance):
+                regressions.append(
+                    f"{endpoint}: {result['queries']} queries per request, baseline {expected['queries']}"
+                )
+
+        return regressions
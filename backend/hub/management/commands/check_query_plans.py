@@ -0,0 +1,148 @@
+import json
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from hub.models import Candidate, CandidateSupporter, CandidateVote, Organization
+
+
+def _iterate_plan_nodes(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield plan
+    for child_plan in plan.get("Plans", []):
+        yield from _iterate_plan_nodes(child_plan)
+
+
+class Command(BaseCommand):
+    """
+    Console command for checking that the hot lookups use their indexes
+    """
+
+    help = (
+        "Run EXPLAIN on the hot lookups (votes by organization and domain, supporters by user and candidate, "
+        "proposed candidates by status and domain, outdated organizations, registered organizations by email) and fail "
+        "if any of them reads its whole table or has no data to check. Run it on a database with realistic data "
+        "(see `seed_load_data`), or let it generate the data with --seed-organizations, "
+        "since Postgres scans the small tables sequentially anyway."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--skip-analyze",
+            action="store_true",
+            help="Don't refresh the table statistics used by the query planner before checking the plans",
+        )
+        parser.add_argument(
+            "--seed-organizations",
+            type=int,
+            default=0,
+            help="Check the plans on the load test data of this many organizations, which is rolled back afterwards",
+        )
+
+    def handle(self, *args, **options):
+        if not options["seed_organizations"]:
+            self._check_plans(options["skip_analyze"])
+            return
+
+        with transaction.atomic():
+            call_command("seed_load_data", organizations=options["seed_organizations"], stdout=self.stdout)
+            self._check_plans(skip_analyze=False)
+
+            transaction.set_rollback(True)
+
+    def _check_plans(self, skip_analyze: bool):
+        if not skip_analyze:
+            with connection.cursor() as cursor:
+                for model in (Organization, Candidate, CandidateVote, CandidateSupporter):
+                    cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
+
+        failures: List[str] = []
+        missing_data: List[str] = []
+        for name, get_queryset in self._get_hot_lookups():
+            queryset = get_queryset()
+            if queryset is None:
+                missing_data.append(name)
+                self.stdout.write(self.style.ERROR(f"{name}: no data to check"))
+                continue
+
+            table: str = queryset.model._meta.db_table
+            plan: Dict[str, Any] = json.loads(queryset.explain(format="json"))[0]["Plan"]
+            scans: List[Tuple[str, str]] = [
+                (node["Node Type"], node.get("Index Name", ""))
+                for node in _iterate_plan_nodes(plan)
+                if node.get("Relation Name") == table
+            ]
+
+            description = ", ".join(f"{node_type} {index_name}".strip() for node_type, index_name in scans)
+            if any(node_type == "Seq Scan" for node_type, _ in scans):
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f"{name}: {description}"))
+            else:
+                self.stdout.write(f"{name}: {description}")
+
+        if failures:
+            raise CommandError(f"The hot lookups read their whole table: {', '.join(failures)}")
+
+        if missing_data:
+            raise CommandError(
+                f"No data to check the hot lookups: {', '.join(missing_data)}. "
+                "Run the `seed_load_data` command first, or use --seed-organizations"
+            )
+
+        self.stdout.write(self.style.SUCCESS("All the hot lookups use indexes"))
+
+    @staticmethod
+    def _get_hot_lookups() -> List[Tuple[str, Callable[[], QuerySet]]]:
+        """
+        The lookups made on every vote, support and registration, with values taken from the existing data
+        """
+
+        def votes_by_organization_and_domain():
+            vote = CandidateVote.objects.order_by("?").first()
+            if not vote:
+                return None
+
+            return CandidateVote.objects.filter(organization_id=vote.organization_id, domain_id=vote.domain_id)
+
+        def supporters_by_user_and_candidate():
+            supporter = CandidateSupporter.objects.select_related("user").order_by("?").first()
+            if not supporter:
+                return None
+
+            return CandidateSupporter.objects.filter(
+                user__pk__in=supporter.user.org_user_pks(), candidate_id=supporter.candidate_id
+            )
+
+        def proposed_candidates_by_status():
+            # The committee reviews the accepted candidates, which are few next to the confirmed ones
+            candidate = Candidate.proposed.filter(status=Candidate.STATUS.accepted).order_by("?").first()
+            if not candidate:
+                return None
+
+            return Candidate.proposed.filter(status=candidate.status, domain_id=candidate.domain_id)
+
+        def outdated_organizations():
+            return Organization.objects.filter(
+                modified__lte=timezone.now() - timezone.timedelta(days=7),
+                status__in=(Organization.STATUS.accepted, Organization.STATUS.pending),
+            ).order_by("modified")[:100]
+
+        def registered_organizations_by_email():
+            organization = Organization.objects.exclude(email="").order_by("?").first()
+            if not organization:
+                return None
+
+            return Organization.objects.filter(
+                email=organization.email, status__in=[Organization.STATUS.accepted, Organization.STATUS.pending]
+            )
+
+        return [
+            ("Votes by organization and domain", votes_by_organization_and_domain),
+            ("Supporters by user and candidate", supporters_by_user_and_candidate),
+            ("Proposed candidates by status and domain", proposed_candidates_by_status),
+            ("Outdated organizations", outdated_organizations),
+            ("Registered organizations by email", registered_organizations_by_email),
+        ]
@@ -0,0 +1,35 @@
+from django.core.management import BaseCommand
+
+from hub.models import Candidate, Organization
+from hub.thumbnails import THUMBNAIL_FIELDS, get_thumbnails_field_name, thumbnails_outdated, update_thumbnails
+
+
+class Command(BaseCommand):
+    """
+    Console command for creating the missing thumbnails of the logos and photos
+    """
+
+    help = "Create the thumbnails of the organization logos and candidate photos which don't have them yet"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Create the thumbnails of all the pictures again")
+
+    def handle(self, *args, **options):
+        for model in (Organization, Candidate):
+            field_name: str = THUMBNAIL_FIELDS[model._meta.model_name]
+            thumbnails_field_name: str = get_thumbnails_field_name(field_name)
+
+            queryset = model.objects.exclude(**{field_name: ""})
+            if options["force"]:
+                # The thumbnails keep their names, so the existing files are replaced
+                queryset.update(**{thumbnails_field_name: {}})
+
+            count = 0
+            for instance in queryset.iterator(chunk_size=100):
+                if thumbnails_outdated(instance, field_name):
+                    update_thumbnails(instance, field_name)
+                    count += 1
+
+            self.stdout.write(
+                self.style.SUCCESS(f"Created the thumbnails of {count} {model._meta.verbose_name_plural}")
+            )
@@ -0,0 +1,109 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from hub.management.commands.benchmark import PERCENTILES
+
+
+class Command(BaseCommand):
+    """
+    Console command for checking the number of database connections of a running server under load
+    """
+
+    help = (
+        "Send many concurrent requests to a running server (e.g., gunicorn with the gevent workers) "
+        "and report the number of database connections opened meanwhile, along with the latency percentiles. "
+        "The connections are counted in pg_stat_activity, so the server must use the same database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", type=str, default="http://localhost:8000/", help="URL requested by the clients")
+        parser.add_argument("--concurrency", type=int, default=200, help="Number of concurrent clients")
+        parser.add_argument("--requests", type=int, default=2000, help="Total number of requests")
+        parser.add_argument("--interval", type=float, default=0.2, help="Seconds between the connection counts")
+        parser.add_argument(
+            "--max-connections",
+            type=int,
+            default=0,
+            help="Fail if the server opens more database connections than this (e.g., workers * pool size)",
+        )
+
+    def handle(self, *args, **options):
+        self.connection_counts: List[int] = []
+        self.results: List[Tuple[float, bool]] = []
+        self.running = threading.Event()
+        self.running.set()
+
+        sampler = threading.Thread(target=self._count_connections, args=(options["interval"],))
+        sampler.start()
+
+        started = time.monotonic()
+        try:
+            with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+                with requests.Session() as session:
+                    adapter = requests.adapters.HTTPAdapter(pool_maxsize=options["concurrency"])
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+
+                    for _ in executor.map(lambda _: self._request(session, options["url"]), range(options["requests"])):
+                        pass
+        finally:
+            self.running.clear()
+            sampler.join()
+
+        self._print_results(time.monotonic() - started)
+
+        max_connections: int = max(self.connection_counts, default=0)
+        if options["max_connections"] and max_connections > options["max_connections"]:
+            raise CommandError(
+                f"The server opened {max_connections} database connections, more than {options['max_connections']}"
+            )
+
+    def _request(self, session: requests.Session, url: str):
+        started = time.monotonic()
+        try:
+            ok: bool = session.get(url, timeout=60).status_code < 500
+        except requests.RequestException:
+            ok = False
+
+        self.results.append(((time.monotonic() - started) * 1000, ok))
+
+    def _count_connections(self, interval: float):
+        try:
+            with connection.cursor() as cursor:
+                while self.running.is_set():
+                    cursor.execute(
+                        "SELECT COUNT(*) FROM pg_stat_activity "
+                        "WHERE datname = current_database() AND pid <> pg_backend_pid()"
+                    )
+                    self.connection_counts.append(cursor.fetchone()[0])
+                    time.sleep(interval)
+        finally:
+            connection.close()
+
+    def _print_results(self, duration: float):
+        durations: List[float] = [duration for duration, _ in self.results]
+        if len(durations) > 1:
+            quantiles = statistics.quantiles(durations, n=100, method="inclusive")
+        else:
+            quantiles = durations * 99
+
+        self.stdout.write(f"Requests: {len(self.results)} in {duration:.1f} s")
+        self.stdout.write(f"Errors: {len([ok for _, ok in self.results if not ok])}")
+        if quantiles:
+            self.stdout.write(
+                "Latency: "
+                + ", ".join(f"p{percentile} {quantiles[percentile - 1]:.0f} ms" for percentile in PERCENTILES)
+            )
+
+        if self.connection_counts:
+            self.stdout.write(
+                f"Database connections: min {min(self.connection_counts)}, max {max(self.connection_counts)}, "
+                f"at the end {self.connection_counts[-1]}"
+            )
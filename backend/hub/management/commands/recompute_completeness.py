@@ -0,0 +1,16 @@
+from django.core.management import BaseCommand
+
+from hub.workers.recompute_completeness import recompute_completeness_process
+
+
+class Command(BaseCommand):
+    """
+    Console command for refreshing the stored completeness state
+    """
+
+    help = "Recompute the stored completeness state of all the organizations and candidates"
+
+    def handle(self, *args, **options):
+        recompute_completeness_process()
+
+        self.stdout.write(self.style.SUCCESS("Successfully recomputed the completeness state"))
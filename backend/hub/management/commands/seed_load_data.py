@@ -0,0 +1,377 @@
+import random
+from typing import Dict, List
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, Permission
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from faker import Faker
+from guardian.models import UserObjectPermission
+from guardian.shortcuts import assign_perm
+
+from accounts.models import COMMITTEE_GROUP, COMMITTEE_GROUP_READ_ONLY, NGO_GROUP, STAFF_GROUP, SUPPORT_GROUP, User
+from hub.models import (
+    COUNTY_RESIDENCE,
+    FLAG_CHOICES,
+    Candidate,
+    CandidateConfirmation,
+    CandidateSupporter,
+    CandidateVote,
+    City,
+    Domain,
+    FeatureFlag,
+    Organization,
+)
+
+# All the generated users and organizations have their e-mail address on this domain
+LOAD_TEST_EMAIL_DOMAIN = "load-test.example.com"
+LOAD_TEST_PASSWORD = "secret"
+
+fake = Faker()
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate an election-day sized data set (organizations, users, candidates, supporters, votes) "
+        "for load testing. Only use it on a local database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--organizations", type=int, default=10000, help="Number of organizations")
+        parser.add_argument("--domains", type=int, default=5, help="Number of voting domains")
+        parser.add_argument("--seats", type=int, default=5, help="Number of seats in each domain")
+        parser.add_argument("--candidates-per-domain", type=int, default=200, help="Proposed candidates per domain")
+        parser.add_argument("--users-per-organization", type=int, default=2, help="Users of every organization")
+        parser.add_argument("--supporters-per-candidate", type=int, default=20, help="Supporters of every candidate")
+        parser.add_argument(
+            "--voted-organizations",
+            type=float,
+            default=0.5,
+            help="Ratio of the accepted organizations which have already cast their votes",
+        )
+        parser.add_argument("--committee-members", type=int, default=7, help="Members of the electoral committee")
+        parser.add_argument("--batch-size", type=int, default=2000, help="Rows written with a single INSERT")
+        parser.add_argument("--seed", type=int, default=42, help="Seed of the random generators")
+
+    def handle(self, *args, **options):
+        random.seed(options["seed"])
+        Faker.seed(options["seed"])
+
+        self.batch_size: int = options["batch_size"]
+
+        if Organization.objects.filter(email__endswith=f"@{LOAD_TEST_EMAIL_DOMAIN}").exists():
+            raise CommandError("The load test data has already been generated in this database")
+
+        if options["users_per_organization"] < 1:
+            raise CommandError("Every organization needs at least one user")
+
+        if not Group.objects.filter(name=NGO_GROUP).exists():
+            raise CommandError("The user groups are missing, run the `init` command first")
+
+        self.stdout.write(self.style.SUCCESS("Generating the load test data..."))
+
+        with transaction.atomic():
+            for flag in [x[0] for x in FLAG_CHOICES]:
+                FeatureFlag.objects.get_or_create(flag=flag)
+
+            password_hash: str = make_password(LOAD_TEST_PASSWORD)
+
+            cities = self._create_cities()
+            domains = self._create_domains(options["domains"], options["seats"])
+            organizations = self._create_organizations(options["organizations"], cities, domains)
+            users_by_organization = self._create_organization_users(
+                organizations, options["users_per_organization"], password_hash
+            )
+            committee_users = self._create_committee_users(options["committee_members"], password_hash)
+            candidates = self._create_candidates(organizations, domains, options["candidates_per_domain"])
+
+            self._create_confirmations(candidates, committee_users)
+            self._create_supporters(candidates, users_by_organization, options["supporters_per_candidate"])
+            self._create_votes(candidates, organizations, users_by_organization, options["voted_organizations"])
+
+            # The bulk created rows skip the save() which stores their completeness state
+            Organization.recompute_completeness(Organization.objects.filter(pk__in=[x.pk for x in organizations]))
+            Candidate.recompute_completeness(Candidate.objects.filter(pk__in=[x.pk for x in candidates]))
+
+        self.stdout.write(self.style.SUCCESS("Load test data generated"))
+
+    def _create_cities(self) -> List[City]:
+        City.objects.bulk_create(
+            [City(city=city, county=county, is_county_residence=True) for county, city in COUNTY_RESIDENCE],
+            ignore_conflicts=True,
+        )
+
+        return list(City.objects.all())
+
+    def _create_domains(self, domains_count: int, seats: int) -> List[Domain]:
+        domains = [
+            Domain.objects.get_or_create(
+                name=f"Load test domain {index + 1}", defaults={"description": fake.text(), "seats": seats}
+            )[0]
+            for index in range(domains_count)
+        ]
+
+        self.stdout.write(f"Created {len(domains)} domains")
+
+        return domains
+
+    def _create_organizations(
+        self, organizations_count: int, cities: List[City], domains: List[Domain]
+    ) -> List[Organization]:
+        organizations: List[Organization] = []
+        for index in range(organizations_count):
+            city: City = random.choice(cities)
+            organization_status = [Organization.STATUS.pending, Organization.STATUS.rejected][index % 2]
+            if index % 10 < 8:
+                organization_status = Organization.STATUS.accepted
+
+            organizations.append(
+                Organization(
+                    name=f"{fake.company()} {index + 1}",
+                    county=city.county,
+                    city=city,
+                    address=fake.address(),
+                    email=f"org-{index + 1}@{LOAD_TEST_EMAIL_DOMAIN}",
+                    phone=fake.phone_number()[:30],
+                    description=fake.text(),
+                    registration_number=f"RO{index + 1:08d}",
+                    legal_representative_name=fake.name(),
+                    legal_representative_email=fake.safe_email(),
+                    legal_representative_phone=fake.phone_number()[:30],
+                    board_council=fake.name(),
+                    voting_domain=domains[index % len(domains)],
+                    status=organization_status,
+                    accept_terms_and_conditions=True,
+                )
+            )
+
+        organizations = Organization.objects.bulk_create(organizations, batch_size=self.batch_size)
+        organization_pks: List[int] = [organization.pk for organization in organizations]
+
+        # The same object permissions as the ones granted by Organization.save
+        organizations_queryset = Organization.objects.filter(pk__in=organization_pks)
+        for group_name in (STAFF_GROUP, SUPPORT_GROUP, COMMITTEE_GROUP, COMMITTEE_GROUP_READ_ONLY):
+            assign_perm("view_data_organization", Group.objects.get(name=group_name), organizations_queryset)
+        assign_perm("approve_organization", Group.objects.get(name=COMMITTEE_GROUP), organizations_queryset)
+
+        self.stdout.write(f"Created {len(organizations)} organizations")
+
+        return organizations
+
+    def _create_organization_users(
+        self, organizations: List[Organization], users_per_organization: int, password_hash: str
+    ) -> Dict[int, List[User]]:
+        users: List[User] = []
+        for organization in organizations:
+            for index in range(users_per_organization):
+                email = f"user-{organization.pk}-{index + 1}@{LOAD_TEST_EMAIL_DOMAIN}"
+                users.append(
+                    User(
+                        username=email,
+                        email=email,
+                        password=password_hash,
+                        first_name=fake.first_name(),
+                        last_name=fake.last_name(),
+                        organization=organization,
+                    )
+                )
+
+        users = User.objects.bulk_create(users, batch_size=self.batch_size)
+
+        ngo_group = Group.objects.get(name=NGO_GROUP)
+        User.groups.through.objects.bulk_create(
+            [User.groups.through(user_id=user.pk, group_id=ngo_group.pk) for user in users],
+            batch_size=self.batch_size,
+        )
+
+        organization_content_type = ContentType.objects.get_for_model(Organization)
+        permissions = Permission.objects.filter(
+            content_type=organization_content_type,
+            codename__in=["view_data_organization", "view_organization", "change_organization"],
+        )
+        UserObjectPermission.objects.bulk_create(
+            [
+                UserObjectPermission(
+                    permission=permission,
+                    user_id=user.pk,
+                    content_type=organization_content_type,
+                    object_pk=str(user.organization_id),
+                )
+                for user in users
+                for permission in permissions
+            ],
+            batch_size=self.batch_size,
+        )
+
+        users_by_organization: Dict[int, List[User]] = {}
+        for user in users:
+            users_by_organization.setdefault(user.organization_id, []).append(user)
+
+        self.stdout.write(f"Created {len(users)} organization users")
+
+        return users_by_organization
+
+    def _create_committee_users(self, committee_members: int, password_hash: str) -> List[User]:
+        users: List[User] = []
+        for index in range(committee_members):
+            email = f"committee-{index + 1}@{LOAD_TEST_EMAIL_DOMAIN}"
+            users.append(
+                User(
+                    username=email,
+                    email=email,
+                    password=password_hash,
+                    first_name=fake.first_name(),
+                    last_name=fake.last_name(),
+                )
+            )
+
+        users = User.objects.bulk_create(users)
+
+        committee_group = Group.objects.get(name=COMMITTEE_GROUP)
+        User.groups.through.objects.bulk_create(
+            [User.groups.through(user_id=user.pk, group_id=committee_group.pk) for user in users]
+        )
+
+        self.stdout.write(f"Created {len(users)} committee members")
+
+        return users
+
+    def _create_candidates(
+        self, organizations: List[Organization], domains: List[Domain], candidates_per_domain: int
+    ) -> List[Candidate]:
+        candidate_statuses = (
+            [Candidate.STATUS.confirmed] * 14
+            + [Candidate.STATUS.accepted] * 3
+            + [Candidate.STATUS.pending] * 2
+            + [Candidate.STATUS.rejected]
+        )
+
+        candidates: List[Candidate] = []
+        candidates_count_by_domain: Dict[int, int] = {domain.pk: 0 for domain in domains}
+        for organization in organizations:
+            if organization.status != Organization.STATUS.accepted:
+                continue
+
+            domain_pk: int = organization.voting_domain_id
+            if candidates_count_by_domain[domain_pk] >= candidates_per_domain:
+                continue
+
+            candidates.append(
+                Candidate(
+                    org=organization,
+                    domain_id=domain_pk,
+                    name=organization.legal_representative_name,
+                    role=fake.job()[:254],
+                    status=candidate_statuses[len(candidates) % len(candidate_statuses)],
+                    is_proposed=True,
+                )
+            )
+            candidates_count_by_domain[domain_pk] += 1
+
+        candidates = Candidate.objects.bulk_create(candidates, batch_size=self.batch_size)
+
+        # The same object permissions as the ones granted by Candidate.save
+        candidate_content_type = ContentType.objects.get_for_model(Candidate)
+        permissions = Permission.objects.filter(
+            content_type=candidate_content_type,
+            codename__in=["view_candidate", "change_candidate", "delete_candidate", "view_data_candidate"],
+        )
+        organization_users = User.objects.filter(organization__in=[candidate.org_id for candidate in candidates])
+        UserObjectPermission.objects.bulk_create(
+            [
+                UserObjectPermission(
+                    permission=permission,
+                    user_id=user_pk,
+                    content_type=candidate_content_type,
+                    object_pk=str(candidate_pk),
+                )
+                for user_pk, candidate_pk in organization_users.values_list("pk", "organization__candidate")
+                for permission in permissions
+            ],
+            batch_size=self.batch_size,
+        )
+
+        self.stdout.write(f"Created {len(candidates)} candidates")
+
+        return candidates
+
+    def _create_confirmations(self, candidates: List[Candidate], committee_users: List[User]):
+        confirmations: List[CandidateConfirmation] = []
+        for candidate in candidates:
+            if candidate.status == Candidate.STATUS.confirmed:
+                confirming_users = committee_users
+            elif candidate.status == Candidate.STATUS.accepted:
+                confirming_users = random.sample(committee_users, random.randrange(len(committee_users) or 1))
+            else:
+                continue
+
+            confirmations.extend(CandidateConfirmation(user=user, candidate=candidate) for user in confirming_users)
+
+        CandidateConfirmation.objects.bulk_create(confirmations, batch_size=self.batch_size)
+        Candidate.recount_confirmations([candidate.pk for candidate in candidates])
+
+        self.stdout.write(f"Created {len(confirmations)} confirmations")
+
+    def _create_supporters(
+        self, candidates: List[Candidate], users_by_organization: Dict[int, List[User]], supporters_per_candidate: int
+    ):
+        supporting_organizations: List[int] = list(users_by_organization.keys())
+
+        supporters: List[CandidateSupporter] = []
+        for candidate in candidates:
+            organization_pks = random.sample(
+                supporting_organizations, min(supporters_per_candidate + 1, len(supporting_organizations))
+            )
+            organization_pks = [pk for pk in organization_pks if pk != candidate.org_id][:supporters_per_candidate]
+
+            supporters.extend(
+                CandidateSupporter(user=users_by_organization[organization_pk][0], candidate=candidate)
+                for organization_pk in organization_pks
+            )
+
+        CandidateSupporter.objects.bulk_create(supporters, batch_size=self.batch_size)
+
+        self.stdout.write(f"Created {len(supporters)} supporters")
+
+    def _create_votes(
+        self,
+        candidates: List[Candidate],
+        organizations: List[Organization],
+        users_by_organization: Dict[int, List[User]],
+        voted_organizations_ratio: float,
+    ):
+        confirmed_candidates_by_domain: Dict[int, List[Candidate]] = {}
+        for candidate in candidates:
+            if candidate.status == Candidate.STATUS.confirmed:
+                confirmed_candidates_by_domain.setdefault(candidate.domain_id, []).append(candidate)
+
+        accepted_organizations = [
+            organization for organization in organizations if organization.status == Organization.STATUS.accepted
+        ]
+        voting_organizations = random.sample(
+            accepted_organizations, int(len(accepted_organizations) * voted_organizations_ratio)
+        )
+
+        votes: List[CandidateVote] = []
+        for organization in voting_organizations:
+            domain: Domain = organization.voting_domain
+            domain_candidates = [
+                candidate
+                for candidate in confirmed_candidates_by_domain.get(domain.pk, [])
+                if candidate.org_id != organization.pk
+            ]
+
+            votes.extend(
+                CandidateVote(
+                    user=users_by_organization[organization.pk][0],
+                    organization=organization,
+                    candidate=candidate,
+                    domain=domain,
+                )
+                for candidate in random.sample(domain_candidates, min(domain.seats, len(domain_candidates)))
+            )
+
+        CandidateVote.objects.bulk_create(votes, batch_size=self.batch_size)
+
+        self.stdout.write(f"Created {len(votes)} votes from {len(voting_organizations)} organizations")
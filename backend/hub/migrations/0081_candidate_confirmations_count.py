@@ -0,0 +1,38 @@
+# Generated by Django 4.2.17 on 2026-10-19 13:01
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def count_existing_confirmations(apps, _):
+    Candidate = apps.get_model("hub", "Candidate")
+    CandidateConfirmation = apps.get_model("hub", "CandidateConfirmation")
+
+    confirmations_count = (
+        CandidateConfirmation.objects.filter(candidate=models.OuterRef("pk"))
+        .order_by()
+        .values("candidate")
+        .annotate(count=models.Count("user", distinct=True))
+        .values("count")
+    )
+
+    Candidate.objects.update(confirmations_count=Coalesce(models.Subquery(confirmations_count), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("hub", "0080_alter_featureflag_flag"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="candidate",
+            name="confirmations_count",
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name="Confirmations"),
+        ),
+        migrations.RunPython(
+            code=count_existing_confirmations,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.17 on 2026-10-19 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("hub", "0081_candidate_confirmations_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="candidate",
+            name="completed",
+            field=models.BooleanField(db_index=True, default=False, editable=False, verbose_name="Is complete?"),
+        ),
+        migrations.AddField(
+            model_name="candidate",
+            name="missing_fields",
+            field=models.JSONField(blank=True, default=list, editable=False, verbose_name="Missing fields"),
+        ),
+        migrations.AddField(
+            model_name="organization",
+            name="completed",
+            field=models.BooleanField(db_index=True, default=False, editable=False, verbose_name="Is complete?"),
+        ),
+        migrations.AddField(
+            model_name="organization",
+            name="completed_for_candidate",
+            field=models.BooleanField(
+                db_index=True, default=False, editable=False, verbose_name="Is complete for proposing a candidate?"
+            ),
+        ),
+        migrations.AddField(
+            model_name="organization",
+            name="missing_fields",
+            field=models.JSONField(blank=True, default=list, editable=False, verbose_name="Missing fields"),
+        ),
+    ]
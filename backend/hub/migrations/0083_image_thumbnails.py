@@ -0,0 +1,23 @@
+# Generated by Django 4.2.17 on 2026-10-19 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("hub", "0082_completeness_state"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="candidate",
+            name="photo_thumbnails",
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name="Photo thumbnails"),
+        ),
+        migrations.AddField(
+            model_name="organization",
+            name="logo_thumbnails",
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name="Logo thumbnails"),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.17 on 2026-10-19 18:05
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # The indexes are built without locking the tables for writes
+    atomic = False
+
+    dependencies = [
+        ("hub", "0083_image_thumbnails"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="candidate",
+            index=models.Index(
+                condition=models.Q(("is_proposed", True)),
+                fields=["status", "domain"],
+                name="candidate_proposed_status",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="candidatevote",
+            index=models.Index(fields=["organization", "domain"], name="candidate_vote_org_domain"),
+        ),
+        AddIndexConcurrently(
+            model_name="organization",
+            index=models.Index(
+                condition=models.Q(("status__in", ["accepted", "pending"])),
+                fields=["email"],
+                name="organization_registered_email",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="organization",
+            index=models.Index(
+                condition=models.Q(("status__in", ["accepted", "pending"])),
+                fields=["modified"],
+                name="organization_registered_mod",
+            ),
+        ),
+    ]
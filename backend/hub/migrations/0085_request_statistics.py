@@ -0,0 +1,41 @@
+# Generated by Django 4.2.17 on 2026-10-19 19:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("hub", "0084_hot_lookup_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RequestStatistics",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("day", models.DateField(verbose_name="Day")),
+                ("url_name", models.CharField(blank=True, default="", max_length=254, verbose_name="URL name")),
+                ("method", models.CharField(max_length=10, verbose_name="Method")),
+                ("requests", models.PositiveBigIntegerField(default=0, verbose_name="Requests")),
+                ("errors", models.PositiveBigIntegerField(default=0, verbose_name="Server errors")),
+                ("slow_requests", models.PositiveBigIntegerField(default=0, verbose_name="Slow requests")),
+                ("total_duration", models.FloatField(default=0, verbose_name="Total duration")),
+                ("max_duration", models.FloatField(default=0, verbose_name="Maximum duration")),
+                ("queries", models.PositiveBigIntegerField(default=0, verbose_name="Database queries")),
+                ("query_time", models.FloatField(default=0, verbose_name="Database time")),
+                ("cache_hits", models.PositiveBigIntegerField(default=0, verbose_name="Cache hits")),
+                ("cache_misses", models.PositiveBigIntegerField(default=0, verbose_name="Cache misses")),
+                ("ngohub_time", models.FloatField(default=0, verbose_name="NGO Hub time")),
+                ("storage_time", models.FloatField(default=0, verbose_name="Storage time")),
+            ],
+            options={
+                "verbose_name": "Request statistics",
+                "verbose_name_plural": "Request statistics",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="requeststatistics",
+            constraint=models.UniqueConstraint(fields=("day", "url_name", "method"), name="unique_request_statistics"),
+        ),
+    ]
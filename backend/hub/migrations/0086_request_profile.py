@@ -0,0 +1,71 @@
+# Generated by Django 4.2.17 on 2026-10-19 14:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import model_utils.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("hub", "0085_request_statistics"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RequestProfile",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                (
+                    "created",
+                    model_utils.fields.AutoCreatedField(
+                        default=django.utils.timezone.now,
+                        editable=False,
+                        verbose_name="created",
+                    ),
+                ),
+                (
+                    "modified",
+                    model_utils.fields.AutoLastModifiedField(
+                        default=django.utils.timezone.now,
+                        editable=False,
+                        verbose_name="modified",
+                    ),
+                ),
+                ("method", models.CharField(max_length=10, verbose_name="Method")),
+                ("path", models.CharField(max_length=2000, verbose_name="Path")),
+                ("url_name", models.CharField(blank=True, default="", max_length=254, verbose_name="URL name")),
+                ("status_code", models.PositiveSmallIntegerField(verbose_name="Status code")),
+                ("duration", models.FloatField(verbose_name="Duration")),
+                ("summary", models.TextField(blank=True, default="", verbose_name="Summary")),
+                (
+                    "profile",
+                    models.FileField(
+                        blank=True,
+                        default="",
+                        help_text="Open the file in https://www.speedscope.app/ to see the flame graph",
+                        max_length=300,
+                        upload_to="request_profiles/",
+                        verbose_name="Speedscope profile",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="User",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Request profile",
+                "verbose_name_plural": "Request profiles",
+            },
+        ),
+    ]
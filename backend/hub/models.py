@@ -1,5 +1,9 @@
+import hashlib
 import logging
-from typing import List, Set
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
 
 from auditlog.registry import auditlog
 from django.conf import settings
@@ -8,9 +12,13 @@ from django.contrib.auth.models import Group
 from django.core.exceptions import ValidationError
 from django.core.files.storage import storages
 from django.core.validators import MinLengthValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Coalesce, Greatest
 from django.db.models.query_utils import DeferredAttribute
+from django.db.models.signals import post_delete
+from django.dispatch import Signal, receiver
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.crypto import get_random_string
 from django.utils.translation import gettext_lazy as _
 from guardian.shortcuts import assign_perm
@@ -18,7 +26,16 @@ from model_utils import Choices
 from model_utils.models import StatusModel, TimeStampedModel
 from tinymce.models import HTMLField
 
-from accounts.models import COMMITTEE_GROUP, COMMITTEE_GROUP_READ_ONLY, NGO_GROUP, STAFF_GROUP, SUPPORT_GROUP, User
+from accounts.models import (
+    COMMITTEE_GROUP,
+    COMMITTEE_GROUP_READ_ONLY,
+    NGO_GROUP,
+    STAFF_GROUP,
+    SUPPORT_GROUP,
+    User,
+    get_committee_size,
+)
+from civil_society_vote.common.audit import bulk_delete_with_audit, bulk_log_changes
 from civil_society_vote.common.cache import cache_decorator, delete_cache_key
 from civil_society_vote.common.formatting import get_human_readable_size
 
@@ -29,6 +46,15 @@ REPORTS_HELP_TEXT = (
 
 logger = logging.getLogger(__name__)
 
+# Feature flags read once for a batch of objects, see FeatureFlag.pinned
+_pinned_feature_flags: ContextVar[Optional[Dict[str, bool]]] = ContextVar("pinned_feature_flags", default=None)
+
+# The candidates whose confirmations are deleted in bulk, see CandidateConfirmation.bulk_delete
+_bulk_deleted_confirmations: ContextVar[Optional[Set[int]]] = ContextVar("bulk_deleted_confirmations", default=None)
+
+# Sent with the "pks" of the objects changed through QuerySet.update() or bulk_update(), which send no post_save
+bulk_updated = Signal()
+
 
 def file_validator(file):
     if file.size > settings.MAX_DOCUMENT_SIZE:
@@ -153,12 +179,31 @@ class FeatureFlag(TimeStampedModel):
     @staticmethod
     def delete_cache():
         delete_cache_key("feature_flags")
+        delete_cache_key("feature_flags_modified")
 
     @staticmethod
     @cache_decorator(cache_key="feature_flags", timeout=settings.TIMEOUT_CACHE_SHORT)
     def get_feature_flags():
         return {flag.flag: flag.is_enabled for flag in FeatureFlag.objects.all()}
 
+    @staticmethod
+    @cache_decorator(cache_key="feature_flags_modified", timeout=settings.TIMEOUT_CACHE_SHORT)
+    def get_flags_modified() -> Optional[datetime]:
+        """
+        The last time a flag was changed, which changes the pages along with the data they display
+        """
+        return FeatureFlag.objects.aggregate(modified=models.Max("modified"))["modified"]
+
+    @staticmethod
+    def get_flags_version() -> str:
+        """
+        A short hash of the current flag values, which changes along with the phase
+        """
+        flags = ",".join(f"{flag}={int(enabled)}" for flag, enabled in sorted(FeatureFlag.get_feature_flags().items()))
+
+        # noinspection InsecureHash
+        return hashlib.sha256(flags.encode()).hexdigest()[:12]
+
     @staticmethod
     def flag_enabled(flag: str) -> bool:
         """
@@ -167,7 +212,39 @@ class FeatureFlag(TimeStampedModel):
         if not flag:
             return False
 
-        return FeatureFlag.get_feature_flags().get(flag, False)
+        feature_flags = _pinned_feature_flags.get()
+        if feature_flags is None:
+            feature_flags = FeatureFlag.get_feature_flags()
+
+        return feature_flags.get(flag, False)
+
+    @staticmethod
+    @contextmanager
+    def pinned() -> Iterator[None]:
+        """
+        Read the feature flags only once for the code in this context, instead of reading them from the cache
+        on every check, e.g. while processing a batch of objects
+        """
+        token = _pinned_feature_flags.set(FeatureFlag.get_feature_flags())
+        try:
+            yield
+        finally:
+            _pinned_feature_flags.reset(token)
+
+    @staticmethod
+    @cache_decorator(cache_key="feature_flags", timeout=settings.TIMEOUT_CACHE_SHORT)
+    async def aget_feature_flags():
+        return {flag.flag: flag.is_enabled async for flag in FeatureFlag.objects.all()}
+
+    @staticmethod
+    async def aflag_enabled(flag: str) -> bool:
+        """
+        Async version of flag_enabled, sharing the same cache entry
+        """
+        if not flag:
+            return False
+
+        return (await FeatureFlag.aget_feature_flags()).get(flag, False)
 
 
 class BlogPost(TimeStampedModel):
@@ -247,9 +324,23 @@ class City(models.Model):
 
 
 class BaseCompleteModel(models.Model):
+    # The completeness state is stored on save, so that it can be filtered on and read without recomputing it
+    completed = models.BooleanField(_("Is complete?"), default=False, db_index=True, editable=False)
+    missing_fields = models.JSONField(_("Missing fields"), default=list, blank=True, editable=False)
+
+    COMPLETENESS_FIELDS: Tuple[str, ...] = ("completed", "missing_fields")
+
     class Meta:
         abstract = True
 
+    def save(self, *args, **kwargs):
+        self.update_completeness()
+
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = set(kwargs["update_fields"]).union(self.COMPLETENESS_FIELDS)
+
+        super().save(*args, **kwargs)
+
     @classmethod
     def required_fields(cls) -> List[DeferredAttribute]:
         raise NotImplementedError
@@ -258,11 +349,46 @@ class BaseCompleteModel(models.Model):
         missing_fields = []
 
         for field in deferred_required_fields:
-            if not getattr(self, field.field.name):
+            # Check the foreign keys by their ID, without loading the related object
+            if not getattr(self, field.field.attname):
                 missing_fields.append(field.field)
 
         return missing_fields
 
+    def get_completeness_state(self) -> Dict[str, Any]:
+        return {
+            "completed": self.is_complete,
+            "missing_fields": [field.name for field in self.get_missing_fields()],
+        }
+
+    def update_completeness(self) -> bool:
+        """
+        Refresh the stored completeness state and return whether it changed
+        """
+        changed = False
+        for field_name, value in self.get_completeness_state().items():
+            if getattr(self, field_name) != value:
+                setattr(self, field_name, value)
+                changed = True
+
+        return changed
+
+    @classmethod
+    def recompute_completeness(cls, queryset: models.QuerySet, batch_size: int = 500) -> int:
+        """
+        Refresh the stored completeness state of the given objects, writing only the changed ones
+        """
+        with FeatureFlag.pinned():
+            changed_objects = [obj for obj in queryset.iterator(chunk_size=batch_size) if obj.update_completeness()]
+        cls.objects.bulk_update(changed_objects, fields=cls.COMPLETENESS_FIELDS, batch_size=batch_size)
+        if changed_objects:
+            bulk_updated.send(sender=cls, pks=[obj.pk for obj in changed_objects])
+
+        return len(changed_objects)
+
+    def get_missing_fields_verbose_names(self) -> List[str]:
+        return [str(self._meta.get_field(field_name).verbose_name) for field_name in self.missing_fields]
+
     def get_missing_fields(self):
         deferred_required_fields = self.required_fields()
         missing_fields = self.check_deferred_fields(deferred_required_fields)
@@ -352,6 +478,7 @@ class Organization(StatusModel, TimeStampedModel, BaseCompleteModel):
         blank=True,
         default="",
     )
+    logo_thumbnails = models.JSONField(_("Logo thumbnails"), default=dict, blank=True, editable=False)
     last_balance_sheet = models.FileField(
         _("First page of last balance sheet for %(CURRENT_EDITION_YEAR)s")
         % {"CURRENT_EDITION_YEAR": str(settings.CURRENT_EDITION_YEAR - 1)},
@@ -443,9 +570,15 @@ class Organization(StatusModel, TimeStampedModel, BaseCompleteModel):
 
     filename_cache = models.JSONField(_("Filename cache"), editable=False, default=dict, blank=False, null=False)
 
+    completed_for_candidate = models.BooleanField(
+        _("Is complete for proposing a candidate?"), default=False, db_index=True, editable=False
+    )
+
     ngohub_last_update_started = models.DateTimeField(_("Last NGO Hub update"), null=True, blank=True, editable=False)
     ngohub_last_update_ended = models.DateTimeField(_("Last NGO Hub update"), null=True, blank=True, editable=False)
 
+    COMPLETENESS_FIELDS = BaseCompleteModel.COMPLETENESS_FIELDS + ("completed_for_candidate",)
+
     objects = models.Manager()
     admin = OrganizationAdminManager()
     accepted = OrganizationAcceptedManager()
@@ -454,6 +587,20 @@ class Organization(StatusModel, TimeStampedModel, BaseCompleteModel):
         verbose_name_plural = _("Organizations")
         verbose_name = _("Organization")
         ordering = ["name"]
+        indexes = [
+            # The registration forms look for the registered organizations with the same email
+            models.Index(
+                fields=["email"],
+                name="organization_registered_email",
+                condition=models.Q(status__in=["accepted", "pending"]),
+            ),
+            # The weekly NGO Hub update takes the registered organizations which weren't updated for the longest time
+            models.Index(
+                fields=["modified"],
+                name="organization_registered_mod",
+                condition=models.Q(status__in=["accepted", "pending"]),
+            ),
+        ]
 
         permissions = (
             ("view_data_organization", "View data organization"),
@@ -579,6 +726,14 @@ class Organization(StatusModel, TimeStampedModel, BaseCompleteModel):
 
         return missing_fields
 
+    def get_completeness_state(self) -> Dict[str, Any]:
+        return {
+            "completed": self.is_complete,
+            "completed_for_candidate": self.is_complete_for_candidate,
+            # The fields required for proposing a candidate include all the other required fields
+            "missing_fields": [field.name for field in self.get_missing_fields_for_candidate()],
+        }
+
     @property
     def is_complete(self):
         """
@@ -630,21 +785,34 @@ class Organization(StatusModel, TimeStampedModel, BaseCompleteModel):
         return reverse("ngo-detail", args=[self.pk])
 
     def _remove_votes_supports_candidates(self):
-        if FeatureFlag.flag_enabled(PHASE_CHOICES.enable_candidate_supporting):
-            # Remove votes for candidates that are not in the voting domain
-            # This should be done only if we're in the registering and supporting phase
-            for candidate in self.candidates.all():
-                if candidate.is_proposed:
-                    candidate.delete()
-
-            # Remove support that the organization has given
-            for supporter in CandidateSupporter.objects.filter(user__organization=self):
-                supporter.delete()
-
-        if FeatureFlag.flag_enabled(PHASE_CHOICES.enable_candidate_voting):
-            # Remove votes that the organization has given
-            for vote in CandidateVote.objects.filter(organization=self):
-                vote.delete()
+        with transaction.atomic():
+            if FeatureFlag.flag_enabled(PHASE_CHOICES.enable_candidate_supporting):
+                # Remove votes for candidates that are not in the voting domain
+                # This should be done only if we're in the registering and supporting phase
+                proposed_candidates = self.candidates.filter(is_proposed=True)
+
+                # The related rows are removed explicitly beforehand, to keep an audit record for each of them
+                bulk_delete_with_audit(
+                    CandidateVote.objects.filter(candidate__in=proposed_candidates).with_audit_relations()
+                )
+                bulk_delete_with_audit(
+                    CandidateSupporter.objects.filter(candidate__in=proposed_candidates).with_audit_relations()
+                )
+                CandidateConfirmation.bulk_delete(
+                    CandidateConfirmation.objects.filter(candidate__in=proposed_candidates)
+                )
+                # An organization has a single candidate, which goes through the regular deletion, so the receivers
+                # (the audit log, the cached pages and the viewer profiles) handle it
+                proposed_candidates.delete()
+
+                # Remove support that the organization has given
+                bulk_delete_with_audit(
+                    CandidateSupporter.objects.filter(user__organization=self).with_audit_relations()
+                )
+
+            if FeatureFlag.flag_enabled(PHASE_CHOICES.enable_candidate_voting):
+                # Remove votes that the organization has given
+                bulk_delete_with_audit(CandidateVote.objects.filter(organization=self).with_audit_relations())
 
     def _change_candidates_domain(self, voting_domain):
         if hasattr(self, "candidate") and self.candidate:
@@ -678,6 +846,9 @@ class Organization(StatusModel, TimeStampedModel, BaseCompleteModel):
         if FeatureFlag.flag_enabled(FLAG_CHOICES.enable_voting_domain):
             Candidate.objects.filter(org=self).update(domain=self.voting_domain)
 
+        # The candidate's completeness depends on the organization's voting domain
+        Candidate.recompute_completeness(Candidate.objects.filter(org=self))
+
         if self.users:
             user: UserModel
             for user in self.users.all():
@@ -769,6 +940,8 @@ class Candidate(StatusModel, TimeStampedModel, BaseCompleteModel):
 
     is_proposed = models.BooleanField(_("Is proposed?"), default=False)
 
+    confirmations_count = models.PositiveIntegerField(_("Confirmations"), default=0, editable=False)
+
     name = models.CharField(
         _("Representative name"),
         max_length=254,
@@ -789,6 +962,7 @@ class Candidate(StatusModel, TimeStampedModel, BaseCompleteModel):
         default="",
         validators=[file_validator],
     )
+    photo_thumbnails = models.JSONField(_("Photo thumbnails"), default=dict, blank=True, editable=False)
 
     # files expected in different cases
     statement = models.FileField(
@@ -863,6 +1037,12 @@ class Candidate(StatusModel, TimeStampedModel, BaseCompleteModel):
         verbose_name_plural = _("Candidates")
         verbose_name = _("Candidate")
         ordering = ["name"]
+        indexes = [
+            # The lists of the proposed candidates are filtered by status and domain
+            models.Index(
+                fields=["status", "domain"], name="candidate_proposed_status", condition=models.Q(is_proposed=True)
+            ),
+        ]
 
         permissions = (
             ("view_data_candidate", "View data candidate"),
@@ -914,11 +1094,15 @@ class Candidate(StatusModel, TimeStampedModel, BaseCompleteModel):
         if not FeatureFlag.flag_enabled("enable_voting_domain"):
             return True
 
-        if self.domain != self.org.voting_domain:
+        if not self.org or self.domain_id != self.org.voting_domain_id:
             return False
 
         return True
 
+    @classmethod
+    def recompute_completeness(cls, queryset: models.QuerySet, batch_size: int = 500) -> int:
+        return super().recompute_completeness(queryset.select_related("org"), batch_size)
+
     def get_absolute_url(self):
         return reverse("candidate-detail", args=[self.pk])
 
@@ -933,6 +1117,23 @@ class Candidate(StatusModel, TimeStampedModel, BaseCompleteModel):
         unique_confirmations = confirmations.values("user").distinct()
         return unique_confirmations.count()
 
+    @staticmethod
+    def recount_confirmations(candidate_pks: List[int]) -> int:
+        """
+        Synchronize the stored confirmations counter of the given candidates with a single UPDATE
+        """
+        confirmations_count = (
+            CandidateConfirmation.objects.filter(candidate=models.OuterRef("pk"))
+            .order_by()
+            .values("candidate")
+            .annotate(count=models.Count("user", distinct=True))
+            .values("count")
+        )
+
+        return Candidate.objects.filter(pk__in=candidate_pks).update(
+            confirmations_count=Coalesce(models.Subquery(confirmations_count), 0)
+        )
+
     def update_users_permissions(self):
         for org_user in self.org.users.all():
             assign_perm("view_candidate", org_user, self)
@@ -964,10 +1165,20 @@ class Candidate(StatusModel, TimeStampedModel, BaseCompleteModel):
             self.update_users_permissions()
 
 
+class CandidateActionQuerySet(models.QuerySet):
+    def with_audit_relations(self):
+        """
+        Load the relations used by the string representation, to be able to audit the rows in bulk
+        """
+        return self.select_related("user__organization", "candidate__org")
+
+
 class CandidateAction(models.Model):
     user: UserModel = None
     candidate: Candidate = None
 
+    objects = CandidateActionQuerySet.as_manager()
+
     class Meta:
         abstract = True
 
@@ -999,6 +1210,10 @@ class CandidateVote(TimeStampedModel, CandidateAction):
         constraints = [
             models.UniqueConstraint(fields=["user", "candidate"], name="unique_candidate_vote"),
         ]
+        indexes = [
+            # The votes of an organization are counted by domain before every vote
+            models.Index(fields=["organization", "domain"], name="candidate_vote_org_domain"),
+        ]
 
     def save(self, *args, **kwargs):
         self.domain = self.candidate.domain
@@ -1034,17 +1249,136 @@ class CandidateConfirmation(TimeStampedModel, CandidateAction):
         ]
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
-        candidate: Candidate = self.candidate
-        candidate_is_accepted: bool = candidate.status == Candidate.STATUS.accepted
-        if candidate_is_accepted:
-            candidate_has_all_confirmations: bool = (
-                candidate.count_confirmations() >= User.objects.filter(groups__name=COMMITTEE_GROUP).count()
+            # The counter is incremented in the database, so concurrent confirmations can't overwrite each other
+            Candidate.objects.filter(pk=self.candidate_id).update(
+                confirmations_count=models.F("confirmations_count") + 1
             )
-            if candidate_has_all_confirmations:
-                candidate.status = Candidate.STATUS.confirmed
-                candidate.save()
+
+            self._promote_candidate()
+
+    @staticmethod
+    def bulk_delete(queryset: models.QuerySet) -> int:
+        """
+        Delete the confirmations with an audit record for each of them, and recount the confirmations of their
+        candidates with a single UPDATE, instead of one for every deleted row
+        """
+        candidate_pks: Set[int] = set()
+        token = _bulk_deleted_confirmations.set(candidate_pks)
+        try:
+            with transaction.atomic():
+                deleted_count: int = bulk_delete_with_audit(queryset.with_audit_relations())
+                Candidate.recount_confirmations(list(candidate_pks))
+        finally:
+            _bulk_deleted_confirmations.reset(token)
+
+        return deleted_count
+
+    def _promote_candidate(self):
+        """
+        Confirm the candidate once the whole committee has confirmed it.
+
+        The check and the status change are done by a single conditional UPDATE, so only one of several concurrent
+        confirmations will promote the candidate.
+        """
+        promoted: int = Candidate.objects.filter(
+            pk=self.candidate_id,
+            status=Candidate.STATUS.accepted,
+            confirmations_count__gte=get_committee_size(),
+        ).update(status=Candidate.STATUS.confirmed, modified=timezone.now())
+
+        if promoted:
+            candidate: Candidate = self.candidate
+            bulk_log_changes([(candidate, {"status": [Candidate.STATUS.accepted, Candidate.STATUS.confirmed]})])
+            candidate.status = Candidate.STATUS.confirmed
+            bulk_updated.send(sender=Candidate, pks=[candidate.pk])
+
+
+@receiver(post_delete, sender=CandidateConfirmation)
+def decrement_confirmations_count(sender, instance: CandidateConfirmation, **kwargs):
+    """
+    Keep the counter in sync with every deletion, including the CASCADE ones (e.g., when a committee user is deleted)
+    """
+    bulk_deleted_candidate_pks: Optional[Set[int]] = _bulk_deleted_confirmations.get()
+    if bulk_deleted_candidate_pks is not None:
+        bulk_deleted_candidate_pks.add(instance.candidate_id)
+        return
+
+    Candidate.objects.filter(pk=instance.candidate_id).update(
+        confirmations_count=Greatest(models.F("confirmations_count") - 1, 0)
+    )
+
+
+class RequestStatistics(models.Model):
+    """
+    The daily totals of the requests served by every view, collected by the RequestMetricsMiddleware
+    """
+
+    day = models.DateField(_("Day"))
+    url_name = models.CharField(_("URL name"), max_length=254, blank=True, default="")
+    method = models.CharField(_("Method"), max_length=10)
+
+    requests = models.PositiveBigIntegerField(_("Requests"), default=0)
+    errors = models.PositiveBigIntegerField(_("Server errors"), default=0)
+    slow_requests = models.PositiveBigIntegerField(_("Slow requests"), default=0)
+
+    # All the durations are in milliseconds
+    total_duration = models.FloatField(_("Total duration"), default=0)
+    max_duration = models.FloatField(_("Maximum duration"), default=0)
+    queries = models.PositiveBigIntegerField(_("Database queries"), default=0)
+    query_time = models.FloatField(_("Database time"), default=0)
+    cache_hits = models.PositiveBigIntegerField(_("Cache hits"), default=0)
+    cache_misses = models.PositiveBigIntegerField(_("Cache misses"), default=0)
+    ngohub_time = models.FloatField(_("NGO Hub time"), default=0)
+    storage_time = models.FloatField(_("Storage time"), default=0)
+
+    class Meta:
+        verbose_name = _("Request statistics")
+        verbose_name_plural = _("Request statistics")
+        constraints = [
+            models.UniqueConstraint(fields=["day", "url_name", "method"], name="unique_request_statistics"),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.method} {self.url_name}"
+
+
+class RequestProfile(TimeStampedModel):
+    """
+    A profile of a single request, taken on demand by a staff user (see the ProfilerMiddleware)
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, verbose_name=_("User")
+    )
+    method = models.CharField(_("Method"), max_length=10)
+    path = models.CharField(_("Path"), max_length=2000)
+    url_name = models.CharField(_("URL name"), max_length=254, blank=True, default="")
+    status_code = models.PositiveSmallIntegerField(_("Status code"))
+    # In milliseconds
+    duration = models.FloatField(_("Duration"))
+
+    summary = models.TextField(_("Summary"), blank=True, default="")
+    profile = models.FileField(
+        _("Speedscope profile"),
+        upload_to="request_profiles/",
+        max_length=300,
+        blank=True,
+        default="",
+        help_text=_("Open the file in https://www.speedscope.app/ to see the flame graph"),
+    )
+
+    class Meta:
+        verbose_name = _("Request profile")
+        verbose_name_plural = _("Request profiles")
+
+    def __str__(self):
+        return f"{self.method} {self.path}"
 
 
 base_exclude_fields = ["created", "modified"]
@@ -1053,8 +1387,9 @@ organization_exclude_fields = base_exclude_fields + [
     "ngohub_last_update_started",
     "filename_cache",
 ]
-auditlog.register(Organization, exclude_fields=base_exclude_fields)
-auditlog.register(Candidate, exclude_fields=base_exclude_fields)
+completeness_exclude_fields = ["completed", "completed_for_candidate", "missing_fields"]
+auditlog.register(Organization, exclude_fields=base_exclude_fields + completeness_exclude_fields + ["logo_thumbnails"])
+auditlog.register(Candidate, exclude_fields=base_exclude_fields + completeness_exclude_fields + ["photo_thumbnails"])
 auditlog.register(CandidateVote, exclude_fields=base_exclude_fields)
 auditlog.register(CandidateSupporter, exclude_fields=base_exclude_fields)
 auditlog.register(CandidateConfirmation, exclude_fields=base_exclude_fields)
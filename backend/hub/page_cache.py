@@ -0,0 +1,283 @@
+"""
+The whole responses of the public pages, cached for the anonymous visitors.
+
+The cache keys contain the language and the version of the feature flags, so the pages of the previous phase
+are never displayed after the phase changes. Every page also has a few tags (e.g. "org:123", "candidates:domain:4")
+whose versions are stored in the cache along with the page; changing the objects displayed on a page purges its tags,
+which gives them a new version, and the cached page is discarded the next time it is requested.
+
+The votes and the supports only appear on the pages of the logged-in users, so they don't purge anything.
+"""
+
+import hashlib
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple, Type
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import HttpRequest, HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.translation import get_language
+
+from civil_society_vote.common.cache import delete_cache_key
+from hub.models import BlogPost, Candidate, Domain, FeatureFlag, Organization, bulk_updated
+
+PAGE_CACHE_KEY_PREFIX = "page_cache"
+
+PAGE_CACHE_TAG_PHASE = "phase"
+PAGE_CACHE_TAG_BLOG = "blog"
+PAGE_CACHE_TAG_ORGANIZATIONS = "orgs"
+PAGE_CACHE_TAG_CANDIDATES = "candidates"
+
+# The cached pages are shared by all the visitors, so the forms get the CSRF token of each visitor when they are sent
+PAGE_CACHE_CSRF_PLACEHOLDER = "pagecachecsrftokenplaceholder"
+
+
+def get_organization_tag(organization_id: int) -> str:
+    return f"org:{organization_id}"
+
+
+def get_candidate_tag(candidate_id: int) -> str:
+    return f"candidate:{candidate_id}"
+
+
+def get_candidates_domain_tag(domain_id) -> str:
+    return f"{PAGE_CACHE_TAG_CANDIDATES}:domain:{domain_id}"
+
+
+def get_candidates_listing_tag(domain_id: Optional[str]) -> str:
+    """
+    The candidate listings filtered by domain are purged only by the changes of the candidates in that domain
+    """
+    if domain_id and domain_id.isdigit():
+        return get_candidates_domain_tag(domain_id)
+
+    return PAGE_CACHE_TAG_CANDIDATES
+
+
+def _get_tag_cache_key(tag: str) -> str:
+    return f"{PAGE_CACHE_KEY_PREFIX}_tag__{tag}"
+
+
+def get_page_cache_key(request: HttpRequest) -> str:
+    # noinspection InsecureHash
+    url_hash = hashlib.sha256(request.build_absolute_uri().encode()).hexdigest()
+
+    return f"{PAGE_CACHE_KEY_PREFIX}__{get_language()}__{FeatureFlag.get_flags_version()}__{url_hash}"
+
+
+def is_anonymous_page_request(request: HttpRequest) -> bool:
+    """
+    Check if the request is for the page displayed to all the anonymous visitors
+    """
+    if request.method not in ("GET", "HEAD") or request.user.is_authenticated:
+        return False
+
+    # The messages are displayed only once, on the page which follows the action
+    return not len(get_messages(request))
+
+
+def is_page_cacheable(request: HttpRequest) -> bool:
+    return settings.ENABLE_PAGE_CACHE and is_anonymous_page_request(request)
+
+
+def purge_page_cache(*tags: str):
+    """
+    Discard the cached pages which have any of the given tags
+    """
+    if not settings.ENABLE_PAGE_CACHE or not tags:
+        return
+
+    cache.set_many({_get_tag_cache_key(tag): uuid.uuid4().hex for tag in tags}, timeout=None)
+
+
+def purge_phase_page_cache():
+    """
+    Discard all the cached pages after the feature flags are changed, along with the cached flags
+    """
+    FeatureFlag.delete_cache()
+    delete_cache_key("hub_settings")
+    purge_page_cache(PAGE_CACHE_TAG_PHASE)
+
+
+def _add_csrf_token(request: HttpRequest, response: HttpResponse) -> HttpResponse:
+    placeholder = PAGE_CACHE_CSRF_PLACEHOLDER.encode()
+    if placeholder in response.content:
+        response.content = response.content.replace(placeholder, get_token(request).encode())
+
+    return response
+
+
+class PageCacheMixin:
+    """
+    Serve the cached response of the view to the anonymous visitors.
+    The pages are always tagged with the phase tag, besides the tags of each view.
+    """
+
+    page_cache_tags: Tuple[str, ...] = ()
+
+    page_cache_key: Optional[str] = None
+    _page_cache_tag_versions: Optional[Dict[str, str]] = None
+
+    def get_page_cache_tags(self) -> List[str]:
+        return [PAGE_CACHE_TAG_PHASE, *self.page_cache_tags]
+
+    def get_page_cache_timeout(self) -> int:
+        return settings.PAGE_CACHE_TIMEOUT
+
+    def _get_cached_response(self, request: HttpRequest) -> Optional[HttpResponse]:
+        if not is_page_cacheable(request):
+            return None
+
+        self.page_cache_key = get_page_cache_key(request)
+        tag_cache_keys: Dict[str, str] = {tag: _get_tag_cache_key(tag) for tag in self.get_page_cache_tags()}
+        cached_values: Dict = cache.get_many([self.page_cache_key, *tag_cache_keys.values()])
+
+        # The versions are read before the page is rendered, so a purge made meanwhile discards the new page too
+        new_versions = {key: uuid.uuid4().hex for key in tag_cache_keys.values() if key not in cached_values}
+        if new_versions:
+            cache.set_many(new_versions, timeout=None)
+        cached_values.update(new_versions)
+        self._page_cache_tag_versions = {tag: cached_values[key] for tag, key in tag_cache_keys.items()}
+
+        cached_page: Optional[Dict] = cached_values.get(self.page_cache_key)
+        if not cached_page or cached_page["tags"] != self._page_cache_tag_versions:
+            return None
+
+        response = HttpResponse(cached_page["content"], status=cached_page["status"])
+        for header, value in cached_page["headers"]:
+            response[header] = value
+
+        return _add_csrf_token(request, response)
+
+    def _cache_response(self, request: HttpRequest, response: HttpResponse) -> HttpResponse:
+        if not self.page_cache_key or not hasattr(response, "add_post_render_callback"):
+            return response
+
+        def set_cached_page(rendered_response: HttpResponse) -> HttpResponse:
+            if request.method == "GET" and rendered_response.status_code == 200 and not rendered_response.cookies:
+                cached_page = {
+                    "tags": self._page_cache_tag_versions,
+                    "status": rendered_response.status_code,
+                    "headers": list(rendered_response.items()),
+                    "content": rendered_response.content,
+                }
+                cache.set(self.page_cache_key, cached_page, timeout=self.get_page_cache_timeout())
+
+            return _add_csrf_token(request, rendered_response)
+
+        # The templates are rendered by the request handler, after the view returns
+        response.add_post_render_callback(set_cached_page)
+
+        return response
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return self._adispatch_with_page_cache(request, *args, **kwargs)
+
+        cached_response: Optional[HttpResponse] = self._get_cached_response(request)
+        if cached_response is not None:
+            return cached_response
+
+        return self._cache_response(request, super().dispatch(request, *args, **kwargs))
+
+    async def _adispatch_with_page_cache(self, request, *args, **kwargs):
+        # Loading the user from the session and reading the database cache are blocking calls
+        cached_response: Optional[HttpResponse] = await sync_to_async(self._get_cached_response)(request)
+        if cached_response is not None:
+            return cached_response
+
+        return self._cache_response(request, await super().dispatch(request, *args, **kwargs))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+
+        if self.page_cache_key:
+            context["csrf_token"] = PAGE_CACHE_CSRF_PLACEHOLDER
+
+        return context
+
+
+def _get_candidates_tags(candidates: Iterable[Tuple[int, Optional[int], Optional[int]]]) -> List[str]:
+    tags: List[str] = [PAGE_CACHE_TAG_CANDIDATES]
+    for candidate_id, domain_id, old_domain_id in candidates:
+        tags.append(get_candidate_tag(candidate_id))
+        tags.extend(get_candidates_domain_tag(pk) for pk in (domain_id, old_domain_id) if pk)
+
+    return tags
+
+
+def get_instance_page_cache_tags(instance: Model) -> List[str]:
+    if isinstance(instance, Organization):
+        # The candidate pages display the name and the logo of the organization
+        candidates = Candidate.objects.filter(org_id=instance.pk).values_list("pk", "domain_id", "old_domain_id")
+
+        return [PAGE_CACHE_TAG_ORGANIZATIONS, get_organization_tag(instance.pk), *_get_candidates_tags(candidates)]
+
+    if isinstance(instance, Candidate):
+        tags = _get_candidates_tags([(instance.pk, instance.domain_id, instance.old_domain_id)])
+        if instance.org_id:
+            tags.append(get_organization_tag(instance.org_id))
+
+        return tags
+
+    if isinstance(instance, BlogPost):
+        return [PAGE_CACHE_TAG_BLOG]
+
+    # The domains are displayed on most of the pages
+    return [PAGE_CACHE_TAG_PHASE]
+
+
+def get_bulk_update_page_cache_tags(model: Type[Model], pks: List[int]) -> List[str]:
+    if model is Organization:
+        return [PAGE_CACHE_TAG_ORGANIZATIONS, *(get_organization_tag(pk) for pk in pks)]
+
+    candidates = Candidate.objects.filter(pk__in=pks)
+    tags: List[str] = _get_candidates_tags(candidates.values_list("pk", "domain_id", "old_domain_id"))
+    tags.extend(get_organization_tag(org_id) for org_id in candidates.values_list("org_id", flat=True) if org_id)
+
+    return tags
+
+
+def purge_instance_page_cache(instance: Model):
+    """
+    Discard the cached pages which display the instance, once the changes are committed
+    """
+    if not settings.ENABLE_PAGE_CACHE:
+        return
+
+    tags: List[str] = get_instance_page_cache_tags(instance)
+    transaction.on_commit(lambda: purge_page_cache(*tags))
+
+
+@receiver(post_save, sender=Organization)
+@receiver(post_delete, sender=Organization)
+@receiver(post_save, sender=Candidate)
+@receiver(post_delete, sender=Candidate)
+@receiver(post_save, sender=BlogPost)
+@receiver(post_delete, sender=BlogPost)
+@receiver(post_save, sender=Domain)
+@receiver(post_delete, sender=Domain)
+def purge_page_cache_on_change(instance: Model, **_):
+    purge_instance_page_cache(instance)
+
+
+@receiver(bulk_updated, sender=Organization)
+@receiver(bulk_updated, sender=Candidate)
+def purge_page_cache_on_bulk_update(sender: Type[Model], pks: List[int], **_):
+    if not settings.ENABLE_PAGE_CACHE or not pks:
+        return
+
+    tags: List[str] = get_bulk_update_page_cache_tags(sender, pks)
+    transaction.on_commit(lambda: purge_page_cache(*tags))
+
+
+@receiver(post_save, sender=FeatureFlag)
+def purge_page_cache_on_flag_change(**_):
+    transaction.on_commit(purge_phase_page_cache)
@@ -0,0 +1,96 @@
+"""
+The on-demand request profiles, stored for the admin.
+
+A staff user asks for a profile with the `profile` query parameter or the `X-Profile` header. The request is then
+run under the pyinstrument sampling profiler, and its call tree is saved as a speedscope profile.
+At most REQUEST_PROFILER_RATE_LIMIT profiles are taken every hour, so the profiler can stay enabled in production.
+"""
+
+import logging
+import threading
+import time
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.http import HttpRequest, HttpResponse
+from pyinstrument import Profiler
+from pyinstrument.renderers import SpeedscopeRenderer
+
+from accounts.models import User
+from hub.models import RequestProfile
+
+logger = logging.getLogger(__name__)
+
+PROFILE_QUERY_PARAMETER = "profile"
+PROFILE_HEADER = "HTTP_X_PROFILE"
+
+RATE_LIMIT_PERIOD = 3600
+
+# The profiles taken by this process in the current period, counted here when there's no shared cache
+# (ENABLE_CACHE=False, where the dummy cache can't count anything)
+_local_profile_count: Tuple[int, int] = (0, 0)
+_local_profile_count_lock = threading.Lock()
+
+
+def is_profile_requested(request: HttpRequest) -> bool:
+    if PROFILE_QUERY_PARAMETER in request.GET:
+        # Drop the parameter, which the admin changelists would take for a filter
+        query = request.GET.copy()
+        del query[PROFILE_QUERY_PARAMETER]
+        query._mutable = False
+        request.GET = query
+
+        return True
+
+    return bool(request.META.get(PROFILE_HEADER))
+
+
+def acquire_profile_slot() -> bool:
+    """
+    Count a new profile against the hourly limit, and return whether it can be taken
+    """
+    global _local_profile_count
+
+    period = int(time.time() // RATE_LIMIT_PERIOD)
+
+    if not settings.ENABLE_CACHE:
+        with _local_profile_count_lock:
+            count_period, count = _local_profile_count
+            _local_profile_count = (period, count + 1 if count_period == period else 1)
+
+            return _local_profile_count[1] <= settings.REQUEST_PROFILER_RATE_LIMIT
+
+    cache_key = f"request_profiles_{period}"
+    cache.add(cache_key, 0, timeout=RATE_LIMIT_PERIOD)
+
+    try:
+        return cache.incr(cache_key) <= settings.REQUEST_PROFILER_RATE_LIMIT
+    except ValueError:
+        # The key expired meanwhile
+        return False
+
+
+def save_request_profile(
+    request: HttpRequest, response: HttpResponse, user: User, profiler: Profiler, duration: float
+) -> Optional[RequestProfile]:
+    try:
+        request_profile = RequestProfile.objects.create(
+            user=user,
+            method=request.method,
+            path=request.get_full_path()[:2000],
+            url_name=request.resolver_match.view_name if request.resolver_match else "",
+            status_code=response.status_code,
+            duration=duration,
+            summary=profiler.output_text(unicode=True, color=False),
+        )
+        request_profile.profile.save(
+            f"{request_profile.pk}.speedscope.json", ContentFile(profiler.output(renderer=SpeedscopeRenderer()))
+        )
+    except Exception:
+        # The profile must never break the request
+        logger.exception("Cannot save the profile of %s %s", request.method, request.path)
+        return None
+
+    return request_profile
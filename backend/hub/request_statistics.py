@@ -0,0 +1,96 @@
+"""
+The per-view request statistics displayed in the admin.
+
+Every process adds up its requests in memory and writes the totals to the database at most once every
+REQUEST_STATISTICS_FLUSH_INTERVAL seconds, so the requests don't write to the database themselves.
+"""
+
+import logging
+import threading
+import time
+from datetime import date
+from typing import Dict, Tuple
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from civil_society_vote.common.instrumentation import SERVICE_NGOHUB, SERVICE_STORAGE, RequestMetrics
+from hub.models import RequestStatistics
+
+logger = logging.getLogger(__name__)
+
+# The counters added up on every flush, besides the maximum duration
+SUMMED_FIELDS = (
+    "requests",
+    "errors",
+    "slow_requests",
+    "total_duration",
+    "queries",
+    "query_time",
+    "cache_hits",
+    "cache_misses",
+    "ngohub_time",
+    "storage_time",
+)
+
+StatisticsKey = Tuple[date, str, str]
+
+_pending_statistics: Dict[StatisticsKey, Dict[str, float]] = {}
+_pending_statistics_lock = threading.Lock()
+_last_flush: float = time.monotonic()
+
+
+def record_request_statistics(
+    url_name: str, method: str, status_code: int, metrics: RequestMetrics, duration: float, is_slow: bool
+):
+    global _last_flush
+
+    key: StatisticsKey = (timezone.localdate(), url_name, method)
+    with _pending_statistics_lock:
+        statistics: Dict[str, float] = _pending_statistics.setdefault(
+            key, dict.fromkeys(SUMMED_FIELDS + ("max_duration",), 0)
+        )
+        statistics["requests"] += 1
+        statistics["errors"] += status_code >= 500
+        statistics["slow_requests"] += is_slow
+        statistics["total_duration"] += duration
+        statistics["max_duration"] = max(statistics["max_duration"], duration)
+        statistics["queries"] += metrics.queries
+        statistics["query_time"] += metrics.query_time
+        statistics["cache_hits"] += metrics.cache_hits
+        statistics["cache_misses"] += metrics.cache_misses
+        statistics["ngohub_time"] += metrics.service_time.get(SERVICE_NGOHUB, 0)
+        statistics["storage_time"] += metrics.service_time.get(SERVICE_STORAGE, 0)
+
+        now: float = time.monotonic()
+        if now - _last_flush < settings.REQUEST_STATISTICS_FLUSH_INTERVAL:
+            return
+
+        _last_flush = now
+        flushed_statistics = dict(_pending_statistics)
+        _pending_statistics.clear()
+
+    try:
+        _save_statistics(flushed_statistics)
+    except DatabaseError:
+        logger.exception("Cannot save the statistics of %d views", len(flushed_statistics))
+
+
+def _save_statistics(pending_statistics: Dict[StatisticsKey, Dict[str, float]]):
+    for (day, url_name, method), statistics in pending_statistics.items():
+        lookup = {"day": day, "url_name": url_name, "method": method}
+        increments = {field_name: F(field_name) + statistics[field_name] for field_name in SUMMED_FIELDS}
+        increments["max_duration"] = Greatest(F("max_duration"), statistics["max_duration"])
+
+        if RequestStatistics.objects.filter(**lookup).update(**increments):
+            continue
+
+        try:
+            with transaction.atomic():
+                RequestStatistics.objects.create(**lookup, **statistics)
+        except IntegrityError:
+            # Another process created the row meanwhile
+            RequestStatistics.objects.filter(**lookup).update(**increments)
@@ -0,0 +1,110 @@
+"""
+The private documents are served through signed URLs, and signing a URL on every page load costs CPU time
+and gives the browser a new link for the same document every time.
+
+The signed URLs are cached per storage key and viewer class, a bit less than their signature lifetime,
+so that a cached URL is always valid for at least SIGNED_URL_MIN_VALIDITY seconds after it is displayed.
+"""
+
+import hashlib
+from typing import Dict, Iterable, List, Optional, Type
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import FileField, Model
+from django.db.models.fields.files import FieldFile
+
+SIGNED_URL_CACHE_KEY_PREFIX = "signed_url"
+
+# The viewers of a document which are shown the same signed URL
+VIEWER_CLASS_PUBLIC = "public"
+VIEWER_CLASS_COMMITTEE = "committee"
+VIEWER_CLASS_ADMIN = "admin"
+
+
+def _has_signed_urls(file: FieldFile) -> bool:
+    return bool(getattr(file.storage, "querystring_auth", False))
+
+
+def get_signed_url_cache_key(file: FieldFile, viewer_class: str) -> str:
+    storage_key = f"{getattr(file.storage, 'bucket_name', '')}/{file.name}"
+
+    # noinspection InsecureHash
+    return f"{SIGNED_URL_CACHE_KEY_PREFIX}__{viewer_class}__{hashlib.sha256(storage_key.encode()).hexdigest()}"
+
+
+def get_signed_urls(files: Iterable[Optional[FieldFile]], viewer_class: str) -> List[str]:
+    """
+    Return the URLs of the given files, in the same order, loading all the cached URLs at once
+    """
+    files: List[Optional[FieldFile]] = list(files)
+    cache_keys: Dict[int, str] = {
+        index: get_signed_url_cache_key(file, viewer_class)
+        for index, file in enumerate(files)
+        if file and _has_signed_urls(file)
+    }
+    cached_urls: Dict[str, str] = cache.get_many(cache_keys.values()) if cache_keys else {}
+
+    urls: List[str] = []
+    new_urls: Dict[str, str] = {}
+    for index, file in enumerate(files):
+        if not file:
+            urls.append("")
+            continue
+
+        cache_key: Optional[str] = cache_keys.get(index)
+        url: Optional[str] = cached_urls.get(cache_key) if cache_key else None
+        if url is None:
+            url = file.url
+            if cache_key:
+                new_urls[cache_key] = url
+
+        urls.append(url)
+
+    if new_urls:
+        cache.set_many(new_urls, timeout=settings.SIGNED_URL_CACHE_TIMEOUT)
+
+    return urls
+
+
+def get_signed_url(file: Optional[FieldFile], viewer_class: str) -> str:
+    return get_signed_urls([file], viewer_class)[0]
+
+
+def get_document_urls(instance: Model, field_names: Iterable[str], viewer_class: str) -> Dict[str, str]:
+    """
+    The URLs of the given file fields of the instance, by field name, with empty URLs for the missing files
+    """
+    field_names: List[str] = list(field_names)
+    urls: List[str] = get_signed_urls([getattr(instance, field_name) for field_name in field_names], viewer_class)
+
+    return dict(zip(field_names, urls))
+
+
+_signed_url_file_classes: Dict[Type[FieldFile], Type[FieldFile]] = {}
+
+
+def _get_signed_url_file_class(attr_class: Type[FieldFile]) -> Type[FieldFile]:
+    if attr_class not in _signed_url_file_classes:
+        _signed_url_file_classes[attr_class] = type(
+            f"SignedUrl{attr_class.__name__}", (attr_class,), {"url": property(lambda self: self.signed_url)}
+        )
+
+    return _signed_url_file_classes[attr_class]
+
+
+def use_signed_urls(instance: Model, viewer_class: str):
+    """
+    Replace the files of the instance with files whose URLs come from the signed URL cache,
+    for the pages which access the URLs through the file fields, like the admin widgets
+    """
+    fields: List[FileField] = [field for field in instance._meta.concrete_fields if isinstance(field, FileField)]
+    files: List[FieldFile] = [getattr(instance, field.name) for field in fields]
+
+    for field, file, url in zip(fields, files, get_signed_urls(files, viewer_class)):
+        if not file:
+            continue
+
+        signed_url_file: FieldFile = _get_signed_url_file_class(field.attr_class)(instance, field, file.name)
+        signed_url_file.signed_url = url
+        setattr(instance, field.attname, signed_url_file)
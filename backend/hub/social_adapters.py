@@ -15,6 +15,7 @@ from django.urls import reverse
 from django.utils.translation import gettext as _
 
 from accounts.models import NGO_GROUP, NGO_USERS_GROUP, STAFF_GROUP, User
+from civil_society_vote.common.instrumentation import SERVICE_NGOHUB, measure_service_call
 from hub.exceptions import (
     ClosedRegistrationException,
     MissingOrganizationException,
@@ -33,7 +34,8 @@ def ngohub_api_get(path: str, token: str):
     auth_headers = {"Authorization": f"Bearer {token}"}
     api_url = settings.NGOHUB_API_BASE + path
 
-    response = requests.get(api_url, headers=auth_headers)
+    with measure_service_call(SERVICE_NGOHUB):
+        response = requests.get(api_url, headers=auth_headers)
     if response.status_code != requests.codes.ok:
         logger.error("%s while retrieving %s", response.status_code, api_url)
         raise NGOHubHTTPException
@@ -1,26 +1,36 @@
 from django import template
 from django.conf import settings
+from django.db.models import Model
+from django.forms import BoundField
+from django.forms.utils import flatatt
 from django.template.loader import render_to_string
 from django.templatetags.static import static
 from django.utils import timezone
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import SafeString
 from django.utils.translation import gettext as _
 
-from accounts.models import User
-from hub.models import CandidateConfirmation, Organization
+from hub.direct_uploads import get_direct_upload_url
+from hub.models import Candidate
+from hub.thumbnails import MIME_TYPES, MODERN_FORMATS, get_thumbnail_urls, select_thumbnail_url
+from hub.viewer_profile import ViewerPermissions, get_viewer_profile
 
 register = template.Library()
 
 
 @register.filter
-def already_confirmed_candidate_status(user, candidate):
-    if CandidateConfirmation.objects.filter(user=user, candidate=candidate).exists():
-        return True
-    return False
+def already_confirmed_candidate_status(viewer_permissions: ViewerPermissions, candidate: Candidate) -> bool:
+    return viewer_permissions.has_confirmed(candidate)
+
+
+@register.filter
+def direct_upload_url(field: BoundField) -> str:
+    return get_direct_upload_url(field.form.instance, field.name)
 
 
 @register.filter
 def has_all_org_documents(user):
-    return user.organization.is_complete()
+    return user.organization.completed
 
 
 @register.simple_tag
@@ -35,13 +45,8 @@ def show_blog_post_date_prefix(published_date):
 
 
 @register.filter
-def has_permission(user: User, permission: str) -> bool:
-    user_groups = user.groups.all()
-    user_group_has_perm = any([group.permissions.filter(codename=permission).exists() for group in user_groups])
-
-    user_has_perm = user.has_perm(permission)
-
-    return user_group_has_perm or user_has_perm
+def has_permission(viewer_permissions: ViewerPermissions, permission: str) -> bool:
+    return viewer_permissions.has_permission(permission)
 
 
 @register.simple_tag
@@ -52,19 +57,16 @@ def org_logo(user, width=settings.AVATAR_DEFAULT_SIZE, height=None, **kwargs):
     if not user:
         return ""
 
-    org = Organization.objects.filter(users__pk=user.pk).only("logo").first()
-    logo_url = static(settings.AVATAR_DEFAULT_URL)
-    if org and org.logo:
-        logo_url = org.logo.url
-    elif user.is_superuser:
-        logo_url = static(settings.AVATAR_DEFAULT_ADMIN_URL)
+    profile = get_viewer_profile(user)
+    if not profile:
+        return ""
 
     kwargs["aria-label"] = "Avatar"
 
     context = {
         "user": user,
-        "url": logo_url,
-        "alt": str(org),
+        "url": profile["logo_url"],
+        "alt": profile["logo_alt"],
         "width": width,
         "height": height,
         "kwargs": kwargs,
@@ -74,6 +76,51 @@ def org_logo(user, width=settings.AVATAR_DEFAULT_SIZE, height=None, **kwargs):
     return render_to_string(template_name, context)
 
 
+@register.simple_tag
+def responsive_image(instance: Model, field_name: str, width: int, placeholder: str = "", alt: str = "", **kwargs):
+    """
+    Display the logo or the photo of the instance at the given width (in CSS pixels) through its thumbnails,
+    letting the browser pick the format and the resolution; the original picture is displayed
+    while the thumbnails are missing, and the placeholder (a static file) if there is no picture
+    """
+    picture = getattr(instance, field_name)
+    if not picture:
+        if not placeholder:
+            return ""
+
+        return format_html('<img src="{}" alt="{}"{}>', static(placeholder), alt, flatatt(kwargs))
+
+    thumbnail_urls = get_thumbnail_urls(instance, field_name)
+    if not thumbnail_urls:
+        return format_html('<img src="{}" alt="{}"{}>', picture.url, alt, flatatt(kwargs))
+
+    def srcset(urls) -> SafeString:
+        return format_html_join(", ", "{} {}w", ((url, thumbnail_width) for thumbnail_width, url in urls))
+
+    sizes = f"{width}px"
+    sources = format_html_join(
+        "",
+        '<source type="{}" srcset="{}" sizes="{}">',
+        (
+            (MIME_TYPES[image_format], srcset(thumbnail_urls["formats"][image_format]), sizes)
+            for image_format in MODERN_FORMATS
+            if image_format in thumbnail_urls["formats"]
+        ),
+    )
+
+    fallback_urls = thumbnail_urls["formats"][thumbnail_urls["fallback"]]
+
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" alt="{}"{}></picture>',
+        sources,
+        select_thumbnail_url(fallback_urls, width),
+        srcset(fallback_urls),
+        sizes,
+        alt,
+        flatatt(kwargs),
+    )
+
+
 # taken from templatetags/allauth.py
 @register.tag(name="set_var")
 def do_setvar(parser, token):
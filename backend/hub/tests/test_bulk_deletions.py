@@ -0,0 +1,151 @@
+"""
+The bulk deletions of the candidate actions keep an audit record of every deleted row and the stored counters
+in sync, with a number of queries which doesn't grow with the number of rows
+"""
+
+from typing import List, Type
+
+import pytest
+from auditlog.models import LogEntry
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Model
+from django.urls import reverse
+
+from accounts.models import User
+from hub.models import (
+    PHASE_CHOICES,
+    Candidate,
+    CandidateConfirmation,
+    CandidateSupporter,
+    CandidateVote,
+    Domain,
+    FeatureFlag,
+    Organization,
+)
+from hub.utils import create_expiring_url_token
+
+RELATED_ROWS = 2000
+
+# Django's collector deletes the rows in batches of 100 and the audit entries are inserted in batches of 1000,
+# so ~100 queries delete the ~6000 related rows of an organization, instead of several queries for every row
+MAX_QUERIES = 120
+
+
+def _count_deletion_entries(model: Type[Model]) -> int:
+    return LogEntry.objects.filter(
+        content_type=ContentType.objects.get_for_model(model), action=LogEntry.Action.DELETE
+    ).count()
+
+
+def _create_users(prefix: str, count: int, organization: Organization = None) -> List[User]:
+    return User.objects.bulk_create(
+        User(email=f"{prefix}{index}@example.com", username=f"{prefix}{index}", organization=organization)
+        for index in range(count)
+    )
+
+
+@pytest.fixture
+def domain(db) -> Domain:
+    return Domain.objects.create(name="Domain", description="Domain", seats=3)
+
+
+@pytest.fixture
+def voting_phase(db):
+    for flag in (PHASE_CHOICES.enable_candidate_supporting, PHASE_CHOICES.enable_candidate_voting):
+        FeatureFlag.objects.update_or_create(flag=flag, defaults={"is_enabled": True})
+
+
+def _create_organization(name: str, domain: Domain) -> Organization:
+    organization = Organization.objects.create(name=name, email=f"{name.lower()}@example.com", voting_domain=domain)
+
+    # An organization can only be accepted once it has users
+    Organization.objects.filter(pk=organization.pk).update(status=Organization.STATUS.accepted)
+    organization.status = Organization.STATUS.accepted
+
+    return organization
+
+
+def _create_candidate(organization: Organization, domain: Domain) -> Candidate:
+    return Candidate.objects.create(
+        org=organization,
+        initial_org=organization,
+        name=f"Candidate of {organization.name}",
+        domain=domain,
+        is_proposed=True,
+        status=Candidate.STATUS.accepted,
+    )
+
+
+@pytest.mark.django_db
+def test_remove_votes_supports_candidates(domain, voting_phase, django_assert_max_num_queries):
+    organization = _create_organization("Organization", domain)
+    candidate = _create_candidate(organization, domain)
+    organization_users = _create_users("member", 2, organization)
+
+    other_organization = _create_organization("Other", domain)
+    other_candidate = _create_candidate(other_organization, domain)
+    other_users = _create_users("voter", RELATED_ROWS, other_organization)
+
+    CandidateVote.objects.bulk_create(
+        CandidateVote(user=user, organization=other_organization, candidate=candidate, domain=domain)
+        for user in other_users
+    )
+    CandidateSupporter.objects.bulk_create(CandidateSupporter(user=user, candidate=candidate) for user in other_users)
+    CandidateConfirmation.objects.bulk_create(
+        CandidateConfirmation(user=user, candidate=candidate) for user in other_users
+    )
+
+    # The votes and the supports given by the organization
+    CandidateVote.objects.bulk_create(
+        CandidateVote(user=user, organization=organization, candidate=other_candidate, domain=domain)
+        for user in organization_users
+    )
+    CandidateSupporter.objects.bulk_create(
+        CandidateSupporter(user=user, candidate=other_candidate) for user in organization_users
+    )
+
+    with django_assert_max_num_queries(MAX_QUERIES):
+        organization._remove_votes_supports_candidates()
+
+    assert not Candidate.objects.filter(pk=candidate.pk).exists()
+    assert not CandidateVote.objects.exists()
+    assert not CandidateSupporter.objects.exists()
+    assert not CandidateConfirmation.objects.exists()
+
+    assert _count_deletion_entries(CandidateVote) == RELATED_ROWS + len(organization_users)
+    assert _count_deletion_entries(CandidateSupporter) == RELATED_ROWS + len(organization_users)
+    assert _count_deletion_entries(CandidateConfirmation) == RELATED_ROWS
+    assert _count_deletion_entries(Candidate) == 1
+
+
+@pytest.mark.django_db
+def test_reset_candidate_confirmations(client, domain, django_assert_max_num_queries):
+    committee_user = User.objects.create_superuser(
+        username="committee", email="committee@example.com", password="secret"
+    )
+    other_committee_user = User.objects.create_user(
+        username="other-committee", email="other-committee@example.com", password="secret"
+    )
+
+    candidates = Candidate.objects.bulk_create(
+        Candidate(name=f"Candidate {index}", domain=domain, is_proposed=True, status=Candidate.STATUS.accepted)
+        for index in range(RELATED_ROWS)
+    )
+    for user in (committee_user, other_committee_user):
+        CandidateConfirmation.objects.bulk_create(
+            CandidateConfirmation(user=user, candidate=candidate) for candidate in candidates
+        )
+    Candidate.objects.update(confirmations_count=2)
+
+    client.force_login(committee_user)
+    url = reverse("reset-candidate-confirmations", args=[create_expiring_url_token(committee_user.pk)])
+
+    with django_assert_max_num_queries(MAX_QUERIES):
+        response = client.post(url)
+
+    assert response.status_code == 302
+    assert not CandidateConfirmation.objects.filter(user=committee_user).exists()
+    assert CandidateConfirmation.objects.filter(user=other_committee_user).count() == RELATED_ROWS
+
+    assert set(Candidate.objects.values_list("confirmations_count", flat=True)) == {1}
+    assert _count_deletion_entries(CandidateConfirmation) == RELATED_ROWS
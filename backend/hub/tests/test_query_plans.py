@@ -0,0 +1,31 @@
+"""
+The hot lookups use their indexes on a realistic amount of data, see the `check_query_plans` command
+"""
+
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from hub.models import Organization
+
+# Enough rows for Postgres to prefer the indexes over reading the small tables sequentially
+SEEDED_ORGANIZATIONS = 2000
+
+
+@pytest.mark.django_db
+def test_hot_lookups_use_indexes():
+    output = StringIO()
+
+    call_command("check_query_plans", seed_organizations=SEEDED_ORGANIZATIONS, stdout=output)
+
+    assert "All the hot lookups use indexes" in output.getvalue()
+
+    # The generated data is rolled back
+    assert not Organization.objects.exists()
+
+
+@pytest.mark.django_db
+def test_check_fails_without_data():
+    with pytest.raises(CommandError, match="No data to check the hot lookups"):
+        call_command("check_query_plans", stdout=StringIO())
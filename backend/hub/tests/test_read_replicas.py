@@ -0,0 +1,93 @@
+"""
+The read-only views keep reading from the replicas after their own cache misses, and only the writes to the data
+of the pages keep the user on the primary database
+"""
+
+from typing import Callable, Dict
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.urls import ResolverMatch
+from django.views import View
+
+from civil_society_vote.common.db_router import PRIMARY_DATABASE_COOKIE, _request_database_state
+from civil_society_vote.middleware import ReadReplicaMiddleware
+from hub.models import Domain
+
+
+@pytest.fixture
+def database_cache(db, settings):
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "civil_society_vote.common.cache.InstrumentedDatabaseCache",
+            "LOCATION": "test_read_replica_cache",
+        }
+    }
+    call_command("createcachetable", verbosity=0)
+
+
+@pytest.fixture
+def read_replica_middleware(settings) -> Callable[[Callable], ReadReplicaMiddleware]:
+    settings.DATABASE_REPLICAS = ["default"]
+
+    def create_middleware(handler: Callable) -> ReadReplicaMiddleware:
+        class ReadReplicaView(View):
+            read_replica = True
+
+            def get(self, request):
+                return handler(request)
+
+        view = ReadReplicaView.as_view()
+
+        def get_response(request):
+            request.resolver_match = ResolverMatch(view, (), {})
+            middleware.process_view(request, view, (), {})
+
+            return view(request)
+
+        middleware = ReadReplicaMiddleware(get_response)
+
+        return middleware
+
+    return create_middleware
+
+
+def _get_database_state() -> Dict[str, bool]:
+    state = _request_database_state.get()
+
+    return {"replica_allowed": state.replica_allowed, "wrote_to_primary": state.wrote_to_primary}
+
+
+def test_cache_miss_keeps_the_replica(rf, database_cache, read_replica_middleware):
+    states = []
+
+    def handler(request):
+        # The miss is stored in the database cache, and the expired keys may be culled meanwhile
+        value = cache.get_or_set("read-replica-test", "value")
+        cache.delete("read-replica-missing")
+        states.append(_get_database_state())
+
+        return HttpResponse(value)
+
+    response = read_replica_middleware(handler)(rf.get("/"))
+
+    assert cache.get("read-replica-test") == "value"
+    assert states == [{"replica_allowed": True, "wrote_to_primary": False}]
+    assert PRIMARY_DATABASE_COOKIE not in response.cookies
+
+
+def test_write_keeps_the_user_on_the_primary_database(rf, database_cache, read_replica_middleware):
+    states = []
+
+    def handler(request):
+        Domain.objects.create(name="Domain", description="Domain", seats=3)
+        states.append(_get_database_state())
+
+        return HttpResponse()
+
+    response = read_replica_middleware(handler)(rf.get("/"))
+
+    assert states == [{"replica_allowed": True, "wrote_to_primary": True}]
+    assert PRIMARY_DATABASE_COOKIE in response.cookies
@@ -0,0 +1,240 @@
+"""
+Thumbnails of the organization logos and of the candidate photos, which the pages display at less than 150px.
+
+Every picture gets resized copies in THUMBNAIL_WIDTHS, in the modern formats which Pillow can write (WebP,
+and AVIF when a plugin adds it), plus a PNG or JPEG fallback. They are generated in the background after
+the picture is uploaded or imported from NGO Hub, and their names are stored in the "<field>_thumbnails" field.
+Until then, the pages keep displaying the original picture.
+"""
+
+import io
+import logging
+import posixpath
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Model
+from django.db.models.fields.files import FieldFile
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django_q.tasks import async_task
+from PIL import Image, ImageOps
+
+from hub.models import Candidate, Organization
+from hub.page_cache import purge_instance_page_cache
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_FIELDS: Dict[str, str] = {
+    "organization": "logo",
+    "candidate": "photo",
+}
+
+# The modern formats, in the order in which the browsers should pick them
+MODERN_FORMATS: Tuple[str, ...] = ("avif", "webp")
+
+MIME_TYPES: Dict[str, str] = {
+    "avif": "image/avif",
+    "webp": "image/webp",
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+}
+
+
+def get_thumbnails_field_name(field_name: str) -> str:
+    return f"{field_name}_thumbnails"
+
+
+def get_thumbnail_formats() -> List[str]:
+    Image.init()
+    available_formats = {image_format.lower() for image_format in Image.SAVE}
+
+    return [image_format for image_format in MODERN_FORMATS if image_format in available_formats]
+
+
+def thumbnails_outdated(instance: Model, field_name: str) -> bool:
+    picture: FieldFile = getattr(instance, field_name)
+    thumbnails: Dict = getattr(instance, get_thumbnails_field_name(field_name)) or {}
+
+    return (picture.name or "") != thumbnails.get("source", "")
+
+
+def _get_thumbnail_name(source_name: str, width: int, image_format: str) -> str:
+    # The extension stays in the path, so that e.g. "logo.png" and "logo.jpg" don't share their thumbnails
+    directory, file_name = posixpath.split(source_name)
+
+    return posixpath.join(directory, "thumbnails", file_name, f"{width}.{image_format}")
+
+
+def _iter_thumbnail_names(thumbnails: Dict):
+    for names in thumbnails.get("formats", {}).values():
+        yield from names.values()
+
+
+def _save_thumbnail(picture: FieldFile, image: Image.Image, width: int, image_format: str) -> str:
+    if image_format == "jpeg" and image.mode != "RGB":
+        image = image.convert("RGB")
+    elif image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA")
+
+    content = io.BytesIO()
+    image.save(content, format=image_format.upper(), quality=settings.THUMBNAIL_QUALITY)
+
+    # The names don't change for the same picture, so an outdated copy is replaced
+    name: str = _get_thumbnail_name(picture.name, width, image_format)
+    picture.storage.delete(name)
+
+    return picture.storage.save(name, ContentFile(content.getvalue()))
+
+
+def create_thumbnails(picture: FieldFile) -> Dict:
+    with picture.open("rb"):
+        image: Image.Image = Image.open(picture)
+        image.load()
+
+    image = ImageOps.exif_transpose(image)
+    has_transparency: bool = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+    fallback_format: str = "png" if has_transparency else "jpeg"
+    if has_transparency:
+        image = image.convert("RGBA")
+
+    formats: Dict[str, Dict[str, str]] = {}
+    for width in sorted(settings.THUMBNAIL_WIDTHS):
+        # The pictures are never enlarged, the largest copy has the size of the original
+        if width >= image.width:
+            width = image.width
+            resized_image = image
+        else:
+            resized_image = image.resize(
+                (width, max(round(image.height * width / image.width), 1)), Image.Resampling.LANCZOS
+            )
+
+        for image_format in get_thumbnail_formats() + [fallback_format]:
+            formats.setdefault(image_format, {})[str(width)] = _save_thumbnail(
+                picture, resized_image, width, image_format
+            )
+
+        if width == image.width:
+            break
+
+    return {"source": picture.name, "fallback": fallback_format, "formats": formats}
+
+
+def update_thumbnails(instance: Model, field_name: str):
+    """
+    Create the thumbnails of the current picture and delete the thumbnails of the previous one
+    """
+    if not thumbnails_outdated(instance, field_name):
+        return
+
+    thumbnails_field_name: str = get_thumbnails_field_name(field_name)
+    picture: FieldFile = getattr(instance, field_name)
+    previous_thumbnails: Dict = getattr(instance, thumbnails_field_name) or {}
+
+    thumbnails: Dict = {}
+    if picture:
+        try:
+            thumbnails = create_thumbnails(picture)
+        except (OSError, Image.DecompressionBombError):
+            logger.exception(f"Cannot create the thumbnails of {picture.name}")
+            thumbnails = {"source": picture.name}
+
+    current_names = set(_iter_thumbnail_names(thumbnails))
+    for name in _iter_thumbnail_names(previous_thumbnails):
+        if name not in current_names:
+            picture.storage.delete(name)
+
+    # The thumbnails are saved without the other fields and without the model signals,
+    # but the modification date still changes for the conditional responses of the pages
+    setattr(instance, thumbnails_field_name, thumbnails)
+    type(instance).objects.filter(pk=instance.pk).update(
+        **{thumbnails_field_name: thumbnails, "modified": timezone.now()}
+    )
+
+    # The cached pages still display the original picture
+    purge_instance_page_cache(instance)
+
+
+def get_thumbnail_urls(instance: Model, field_name: str) -> Optional[Dict]:
+    """
+    The URLs of the thumbnails by format, as lists of (width, URL), or None if the thumbnails aren't available
+    """
+    if thumbnails_outdated(instance, field_name):
+        return None
+
+    thumbnails: Dict = getattr(instance, get_thumbnails_field_name(field_name))
+    if not thumbnails.get("formats"):
+        return None
+
+    storage = getattr(instance, field_name).storage
+    return {
+        "fallback": thumbnails["fallback"],
+        "formats": {
+            image_format: sorted((int(width), storage.url(name)) for width, name in names.items())
+            for image_format, names in thumbnails["formats"].items()
+        },
+    }
+
+
+def select_thumbnail_url(urls: List[Tuple[int, str]], width: int) -> str:
+    """
+    The URL of the smallest thumbnail which is at least as wide as the given width, or of the largest one
+    """
+    return next((url for thumbnail_width, url in urls if thumbnail_width >= width), urls[-1][1])
+
+
+def get_thumbnail_url(instance: Model, field_name: str, width: int) -> str:
+    """
+    The URL of the fallback thumbnail for the given width, or of the original picture if there are no thumbnails
+    """
+    picture: FieldFile = getattr(instance, field_name)
+    if not picture:
+        return ""
+
+    thumbnail_urls: Optional[Dict] = get_thumbnail_urls(instance, field_name)
+    if not thumbnail_urls:
+        return picture.url
+
+    return select_thumbnail_url(thumbnail_urls["formats"][thumbnail_urls["fallback"]], width)
+
+
+def generate_thumbnails_process(model_name: str, pk: int):
+    model = Organization if model_name == "organization" else Candidate
+    instance: Optional[Model] = model.objects.filter(pk=pk).first()
+    if not instance:
+        return
+
+    update_thumbnails(instance, THUMBNAIL_FIELDS[model_name])
+
+
+def generate_thumbnails(instance: Model, field_name: str):
+    """
+    Update the thumbnails of the picture (asynchronously, like the organization updates)
+    """
+    if settings.UPDATE_ORGANIZATION_METHOD == "async":
+        async_task(
+            generate_thumbnails_process,
+            instance._meta.model_name,
+            instance.pk,
+            cluster=settings.BACKGROUND_QUEUE_BATCH,
+        )
+    else:
+        update_thumbnails(instance, field_name)
+
+
+def _schedule_thumbnails(instance: Model, field_name: str):
+    if thumbnails_outdated(instance, field_name):
+        transaction.on_commit(lambda: generate_thumbnails(instance, field_name))
+
+
+@receiver(post_save, sender=Organization)
+def schedule_organization_thumbnails(instance: Organization, **_):
+    _schedule_thumbnails(instance, THUMBNAIL_FIELDS["organization"])
+
+
+@receiver(post_save, sender=Candidate)
+def schedule_candidate_thumbnails(instance: Candidate, **_):
+    _schedule_thumbnails(instance, THUMBNAIL_FIELDS["candidate"])
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import include, path
 from django.utils.translation import gettext_lazy as _
 from django.views.generic import RedirectView
@@ -13,7 +14,11 @@ from hub.views import (
     CandidateUpdateView,
     CityAutocomplete,
     CommitteeCandidatesListView,
+    CommitteeDocumentsExportView,
     CommitteeOrganizationListView,
+    CommitteeReviewQueueItemsView,
+    CommitteeReviewQueueView,
+    DirectUploadView,
     ElectorCandidatesListView,
     HealthView,
     HomeView,
@@ -30,6 +35,16 @@ from hub.views import (
     reset_candidate_confirmations,
 )
 
+if settings.USE_ASGI:
+    from hub.async_views import (
+        AsyncBlogListView as BlogListView,
+        AsyncCandidateListView as CandidateListView,
+        AsyncCandidateResultsView as CandidateResultsView,
+        AsyncHealthView as HealthView,
+        AsyncHomeView as HomeView,
+        AsyncOrganizationListView as OrganizationListView,
+    )
+
 urlpatterns = [
     path("", HomeView.as_view(), name="home"),
     path(_("health/"), HealthView.as_view(), name="health"),
@@ -58,6 +73,13 @@ urlpatterns = [
     ),
     path(_("committee/ngos/"), CommitteeOrganizationListView.as_view(), name="committee-ngos"),
     path(_("committee/candidates/"), CommitteeCandidatesListView.as_view(), name="committee-candidates"),
+    path(_("committee/review/"), CommitteeReviewQueueView.as_view(), name="committee-review-queue"),
+    path(_("committee/review/items/"), CommitteeReviewQueueItemsView.as_view(), name="committee-review-queue-items"),
+    path(
+        _("committee/documents/<str:model_name>/"),
+        CommitteeDocumentsExportView.as_view(),
+        name="committee-documents-export",
+    ),
     path(_("ngos/"), OrganizationListView.as_view(), name="ngos"),
     path(
         _("ngos/register"),
@@ -69,6 +91,7 @@ urlpatterns = [
     path(_("ngos/<int:pk>/update"), OrganizationUpdateView.as_view(), name="ngo-update"),
     path(_("ngo-update/<int:pk>"), update_organization_information, name="ngo-update-post"),
     path("ngos/city-autocomplete/", CityAutocomplete.as_view(), name="city-autocomplete"),
+    path("uploads/<str:model_name>/<int:pk>/<str:field_name>/", DirectUploadView.as_view(), name="direct-upload"),
     path("blog/", BlogListView.as_view(), name="blog-list"),
     path("blog/<slug:slug>", BlogPostView.as_view(), name="blog-post"),
     path("i18n/", include("django.conf.urls.i18n")),
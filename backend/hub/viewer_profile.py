@@ -0,0 +1,206 @@
+"""
+The "viewer profile" holds what the header and the account pages need to know about the logged-in user
+(their organization, its logo and the user's roles), so that it isn't queried again on every page.
+
+The profile is built at login and cached per user; it is dropped whenever the user, their groups,
+their organization or its candidate change, and rebuilt on the next request.
+
+The viewer permissions are the per-request lookups which the templates check for every row of a list.
+"""
+
+from typing import Dict, Iterable, Optional, Set, Union
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.auth.signals import user_logged_in
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.http import HttpRequest
+from django.templatetags.static import static
+from django.utils.functional import cached_property
+
+from accounts.models import (
+    COMMITTEE_GROUP,
+    COMMITTEE_GROUP_READ_ONLY,
+    NGO_GROUP,
+    NGO_USERS_GROUP,
+    STAFF_GROUP,
+    SUPPORT_GROUP,
+    User,
+)
+from hub.models import Candidate, CandidateConfirmation, Organization
+from hub.thumbnails import get_thumbnail_url
+
+VIEWER_PROFILE_CACHE_KEY_PREFIX = "viewer_profile"
+
+# Signed storage URLs expire after an hour, so the cached logo URL must be refreshed well before that
+VIEWER_PROFILE_CACHE_TIMEOUT = settings.TIMEOUT_CACHE_NORMAL
+
+# The header displays the logo at 55px, on screens with up to twice the pixel density
+HEADER_LOGO_WIDTH = 110
+
+
+def get_viewer_profile_cache_key(user_pk: int) -> str:
+    return f"{VIEWER_PROFILE_CACHE_KEY_PREFIX}__{user_pk}"
+
+
+def build_viewer_profile(user: User) -> Dict:
+    group_names: Set[str] = set(user.groups.values_list("name", flat=True))
+    is_staff_group = bool(group_names & {STAFF_GROUP, SUPPORT_GROUP})
+    is_committee_group = bool(group_names & {COMMITTEE_GROUP, COMMITTEE_GROUP_READ_ONLY})
+
+    organization: Optional[Organization] = None
+    if user.organization_id:
+        organization = (
+            Organization.objects.filter(pk=user.organization_id)
+            .select_related("candidate")
+            .only("id", "name", "registration_number", "logo", "logo_thumbnails", "voting_domain_id", "candidate__id")
+            .first()
+        )
+
+    if organization and organization.logo:
+        logo_url = get_thumbnail_url(organization, "logo", HEADER_LOGO_WIDTH)
+    elif user.is_superuser:
+        logo_url = static(settings.AVATAR_DEFAULT_ADMIN_URL)
+    else:
+        logo_url = static(settings.AVATAR_DEFAULT_URL)
+
+    organization_profile = None
+    if organization:
+        candidate: Optional[Candidate] = getattr(organization, "candidate", None)
+        organization_profile = {
+            "id": organization.id,
+            "name": organization.name,
+            "registration_number": organization.registration_number,
+            "voting_domain_id": organization.voting_domain_id,
+            "candidate_id": candidate.id if candidate else None,
+        }
+
+    return {
+        "user_id": user.pk,
+        "email": user.email,
+        "logo_url": logo_url,
+        "logo_alt": str(organization),
+        "organization": organization_profile,
+        "roles": {
+            "committee_or_staff": is_committee_group or is_staff_group,
+            "commission": is_committee_group and not is_staff_group,
+            "voting_commission": COMMITTEE_GROUP in group_names and not is_staff_group,
+            "staff": is_staff_group,
+            "ngo": bool(group_names & {NGO_GROUP, NGO_USERS_GROUP}),
+        },
+    }
+
+
+def refresh_viewer_profile(user: User) -> Dict:
+    profile = build_viewer_profile(user)
+    cache.set(get_viewer_profile_cache_key(user.pk), profile, timeout=VIEWER_PROFILE_CACHE_TIMEOUT)
+
+    return profile
+
+
+def get_viewer_profile(user: Union[User, AnonymousUser, None]) -> Optional[Dict]:
+    """
+    Return the cached profile of the user, which is also kept on the user object for the rest of the request
+    """
+    if not user or user.is_anonymous:
+        return None
+
+    profile = getattr(user, "_viewer_profile", None)
+    if profile is not None:
+        return profile
+
+    profile = cache.get(get_viewer_profile_cache_key(user.pk))
+    if profile is None:
+        profile = refresh_viewer_profile(user)
+
+    user._viewer_profile = profile
+
+    return profile
+
+
+def delete_viewer_profiles(user_pks: Iterable[int]):
+    cache.delete_many([get_viewer_profile_cache_key(user_pk) for user_pk in user_pks])
+
+
+class ViewerPermissions:
+    """
+    The candidates confirmed by the user and the user's permission codenames, each loaded with a single query
+    the first time it is needed
+    """
+
+    def __init__(self, user: Union[User, AnonymousUser]):
+        self.user = user
+
+    @cached_property
+    def confirmed_candidate_ids(self) -> Set[int]:
+        if self.user.is_anonymous:
+            return set()
+
+        return set(CandidateConfirmation.objects.filter(user=self.user).values_list("candidate_id", flat=True))
+
+    @cached_property
+    def permission_codenames(self) -> Set[str]:
+        if self.user.is_anonymous:
+            return set()
+
+        # The permissions of the user and of their groups, as "app_label.codename"
+        return {permission.split(".", 1)[-1] for permission in self.user.get_all_permissions()}
+
+    def has_confirmed(self, candidate: Candidate) -> bool:
+        return candidate.pk in self.confirmed_candidate_ids
+
+    def has_permission(self, permission: str) -> bool:
+        if self.user.is_superuser:
+            return True
+
+        return permission.split(".", 1)[-1] in self.permission_codenames
+
+
+def get_viewer_permissions(request: HttpRequest) -> ViewerPermissions:
+    if not hasattr(request, "_viewer_permissions"):
+        request._viewer_permissions = ViewerPermissions(request.user)
+
+    return request._viewer_permissions
+
+
+@receiver(user_logged_in)
+def refresh_viewer_profile_on_login(user: User, **_):
+    refresh_viewer_profile(user)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def reset_viewer_profile_on_user_change(instance: User, update_fields=None, **_):
+    # Logging in only updates the last login date, and the profile is rebuilt right after that
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+
+    delete_viewer_profiles([instance.pk])
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def reset_viewer_profile_on_groups_change(instance, reverse: bool, pk_set: Optional[Set[int]], **_):
+    if not reverse:
+        delete_viewer_profiles([instance.pk])
+    elif pk_set:
+        delete_viewer_profiles(pk_set)
+    else:
+        # The group is being cleared, the users are still in it when the "pre_clear" signal is sent
+        delete_viewer_profiles(User.objects.filter(groups=instance).values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Organization)
+@receiver(pre_delete, sender=Organization)
+def reset_viewer_profile_on_organization_change(instance: Organization, **_):
+    delete_viewer_profiles(User.objects.filter(organization_id=instance.pk).values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Candidate)
+@receiver(post_delete, sender=Candidate)
+def reset_viewer_profile_on_candidate_change(instance: Candidate, **_):
+    if not instance.org_id:
+        return
+
+    delete_viewer_profiles(User.objects.filter(organization_id=instance.org_id).values_list("pk", flat=True))
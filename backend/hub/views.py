@@ -2,7 +2,7 @@ import hashlib
 import logging
 import unicodedata
 from datetime import datetime
-from typing import Dict, List, Union
+from typing import Any, Dict, Iterable, List, Union
 from urllib.parse import unquote
 
 from django.conf import settings
@@ -15,26 +15,27 @@ from django.contrib.sites.shortcuts import get_current_site
 from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
 from django.db import transaction
-from django.db.models import Count, Q, QuerySet
+from django.db.models import Count, Exists, OuterRef, Q, QuerySet
 from django.db.utils import IntegrityError
-from django.http import Http404, JsonResponse
+from django.http import Http404, JsonResponse, QueryDict
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.translation import gettext as _
 from django.views import View
-from django.views.generic import CreateView, DetailView, FormView, ListView, UpdateView
+from django.views.generic import CreateView, DetailView, FormView, ListView, TemplateView, UpdateView
 from django.views.generic.base import ContextMixin
 from guardian.decorators import permission_required_or_403
 from guardian.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from sentry_sdk import capture_message
 
-from accounts.models import (
-    NGO_GROUP,
-    NGO_USERS_GROUP,
-    User,
-)
+from accounts.models import User
 from civil_society_vote.common.messaging import send_email
+from civil_society_vote.common.pooled_postgresql.pool import get_pool_stats
+from civil_society_vote.common.tracing import trace
+from hub.direct_uploads import DIRECT_UPLOAD_MODELS, create_presigned_upload, get_direct_upload_file_field
+from hub.document_exports import candidates_documents_response, organizations_documents_response
+from hub.conditional_get import ConditionalGetMixin, get_rows_state
 from hub.forms import (
     CandidateRegisterForm,
     CandidateUpdateForm,
@@ -55,8 +56,19 @@ from hub.models import (
     Domain,
     FeatureFlag,
     Organization,
+    bulk_updated,
+)
+from hub.page_cache import (
+    PAGE_CACHE_TAG_BLOG,
+    PAGE_CACHE_TAG_ORGANIZATIONS,
+    PageCacheMixin,
+    get_candidate_tag,
+    get_candidates_listing_tag,
+    get_organization_tag,
 )
+from hub.signed_urls import VIEWER_CLASS_COMMITTEE, VIEWER_CLASS_PUBLIC, get_document_urls
 from hub.utils import decode_url_token_from_request, expiring_url
+from hub.viewer_profile import get_viewer_permissions, get_viewer_profile
 from hub.workers.update_organization import update_organization
 
 logger = logging.getLogger(__name__)
@@ -67,13 +79,25 @@ UserModel = get_user_model()
 def group_queryset_by_domain(
     queryset: QuerySet, *, domain_variable_name: str, sort_variable: str = "name"
 ) -> List[Dict[str, Union[Domain, List[Union[Organization, Candidate]]]]]:
-    queryset_by_domain_dict: Dict[Domain, List[Union[Organization, Candidate]]] = {}
-
     all_domains = dict(Domain.objects.values_list("pk", "name"))
 
+    return group_elements_by_domain(
+        queryset, all_domains, domain_variable_name=domain_variable_name, sort_variable=sort_variable
+    )
+
+
+def group_elements_by_domain(
+    elements: Iterable[Union[Organization, Candidate]],
+    all_domains: Dict[int, str],
+    *,
+    domain_variable_name: str,
+    sort_variable: str = "name",
+) -> List[Dict[str, Union[Domain, List[Union[Organization, Candidate]]]]]:
+    queryset_by_domain_dict: Dict[Domain, List[Union[Organization, Candidate]]] = {}
+
     domain_variable_name = f"{domain_variable_name}_id"
 
-    for element in queryset:
+    for element in elements:
         element_domain_pk: Domain = getattr(element, domain_variable_name)
 
         if not element_domain_pk:
@@ -105,6 +129,15 @@ def group_queryset_by_domain(
     return queryset_by_domain_list
 
 
+def _get_domains_state() -> Dict[str, Any]:
+    return get_rows_state(Domain.objects.all(), "modified")
+
+
+def _get_candidates_listing_state() -> Dict[str, Any]:
+    # The listings display the organizations of the candidates and group them by domain
+    return {**get_rows_state(Candidate.objects.all(), "modified", "org__modified"), "domains": _get_domains_state()}
+
+
 def _filter_letter(char: str) -> bool:
     if char.isalpha():
         return True
@@ -119,6 +152,9 @@ class HealthView(View):
     revision = None
 
     def get(self, request):
+        return JsonResponse(self.get_health_data(request.user))
+
+    def get_health_data(self, user: User) -> Dict:
         if not self.version:
             self.version = settings.VERSION
         if not self.revision:
@@ -131,23 +167,22 @@ class HealthView(View):
             "revision": self.revision,
         }
 
-        user = request.user
-
         if user.is_anonymous:
-            return JsonResponse(base_response)
+            return base_response
 
         base_response["user"] = {
             "email": user.email,
         }
 
-        if user.organization:
+        viewer_organization = get_viewer_profile(user)["organization"]
+        if viewer_organization:
             base_response["user"]["organization"] = {
-                "name": user.organization.name,
-                "raf": user.organization.registration_number,
+                "name": viewer_organization["name"],
+                "raf": viewer_organization["registration_number"],
             }
 
         if not user.is_impersonate and not user.is_staff:
-            return JsonResponse(base_response)
+            return base_response
 
         if user.is_staff:
             base_response["user"].update(
@@ -157,9 +192,11 @@ class HealthView(View):
                     "is_impersonate": user.is_impersonate,
                 }
             )
+            # The pools of the worker process which served the request
+            base_response["database_pools"] = get_pool_stats()
 
         if not user.is_impersonate:
-            return JsonResponse(base_response)
+            return base_response
 
         base_response["user"]["is_impersonate"] = user.is_impersonate
 
@@ -170,7 +207,7 @@ class HealthView(View):
             "is_impersonate": user.impersonator.is_impersonate,
         }
 
-        return JsonResponse(base_response)
+        return base_response
 
 
 class MenuMixin(ContextMixin):
@@ -182,7 +219,7 @@ class MenuMixin(ContextMixin):
         return context
 
 
-class HomeView(MenuMixin, SuccessMessageMixin, FormView):
+class HomeView(PageCacheMixin, MenuMixin, SuccessMessageMixin, FormView):
     template_name = "hub/home.html"
     form_class = ContactForm
     success_url = "/#contact"
@@ -245,21 +282,41 @@ class HubUpdateView(MenuMixin, SuccessMessageMixin, UpdateView):
 
 
 class CommitteeOrganizationListView(LoginRequiredMixin, SearchMixin):
-    allow_filters = ["status"]
+    read_replica = True
+    allow_filters = ["status", "completed_for_candidate"]
     paginate_by = 9
     template_name = "hub/committee/list.html"
 
+    BOOLEAN_FILTER_VALUES = {"true": True, "1": True, "yes": True, "false": False, "0": False, "no": False}
+
+    @classmethod
+    def get_filters(cls, query: QueryDict) -> Dict[str, Union[str, bool]]:
+        filters = {name: query[name] for name in cls.allow_filters if query.get(name)}
+
+        # The raw value would make the boolean lookup raise a ValidationError
+        if completed_for_candidate := filters.get("completed_for_candidate"):
+            try:
+                filters["completed_for_candidate"] = cls.BOOLEAN_FILTER_VALUES[completed_for_candidate.lower()]
+            except KeyError:
+                raise Http404
+
+        return filters
+
     def get_queryset(self):
         user = self.request.user
         if not user or user.is_anonymous or not user.in_committee_or_staff_groups():
             raise PermissionDenied
 
-        filters = {name: self.request.GET[name] for name in self.allow_filters if self.request.GET.get(name)}
-
+        filters = self.get_filters(self.request.GET)
         if not filters:
-            return Organization.objects.filter(status=Organization.STATUS.pending).order_by("-created")
+            filters = {"status": Organization.STATUS.pending}
 
-        return Organization.objects.filter(**filters).order_by("-created")
+        # Only the columns displayed in the list are loaded
+        return (
+            Organization.objects.filter(**filters)
+            .only("id", "name", "logo", "logo_thumbnails", "created")
+            .order_by("-created")
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -269,18 +326,38 @@ class CommitteeOrganizationListView(LoginRequiredMixin, SearchMixin):
 
 
 def _get_candidates_counters():
-    return {
-        "ngos_pending": Organization.objects.filter(status=Organization.STATUS.pending).count(),
-        "ngos_accepted": Organization.objects.filter(status=Organization.STATUS.accepted).count(),
-        "ngos_rejected": Organization.objects.filter(status=Organization.STATUS.rejected).count(),
-        "candidates_pending": Candidate.proposed.filter(status=Candidate.STATUS.pending).count(),
-        "candidates_accepted": Candidate.proposed.filter(status=Candidate.STATUS.accepted).count(),
-        "candidates_confirmed": Candidate.proposed.filter(status=Candidate.STATUS.confirmed).count(),
-        "candidates_rejected": Candidate.proposed.filter(status=Candidate.STATUS.rejected).count(),
-    }
+    organizations_counters = Organization.objects.aggregate(
+        ngos_pending=Count("pk", filter=Q(status=Organization.STATUS.pending)),
+        ngos_accepted=Count("pk", filter=Q(status=Organization.STATUS.accepted)),
+        ngos_rejected=Count("pk", filter=Q(status=Organization.STATUS.rejected)),
+    )
+    candidates_counters = Candidate.proposed.aggregate(
+        candidates_pending=Count("pk", filter=Q(status=Candidate.STATUS.pending)),
+        candidates_accepted=Count("pk", filter=Q(status=Candidate.STATUS.accepted)),
+        candidates_confirmed=Count("pk", filter=Q(status=Candidate.STATUS.confirmed)),
+        candidates_rejected=Count("pk", filter=Q(status=Candidate.STATUS.rejected)),
+    )
+
+    return {**organizations_counters, **candidates_counters}
+
+
+def _get_committee_candidates(user: User, **filters) -> QuerySet[Candidate]:
+    """
+    The proposed candidates, along with everything the committee lists display for them:
+    the organization, the domain, the supporters and confirmations counters and whether the user confirmed them
+    """
+    return (
+        Candidate.proposed.filter(**filters)
+        .select_related("org", "domain")
+        .annotate(
+            supporters_count=Count("supporters"),
+            viewer_confirmed=Exists(CandidateConfirmation.objects.filter(user=user, candidate=OuterRef("pk"))),
+        )
+    )
 
 
 class CommitteeCandidatesListView(LoginRequiredMixin, SearchMixin):
+    read_replica = True
     allow_filters = ["status"]
     paginate_by = 9
     template_name = "hub/committee/candidates.html"
@@ -291,11 +368,7 @@ class CommitteeCandidatesListView(LoginRequiredMixin, SearchMixin):
             raise PermissionDenied
 
         filters = {name: self.request.GET[name] for name in self.allow_filters if self.request.GET.get(name)}
-        return (
-            Candidate.proposed.filter(**filters)
-            .annotate(supporters_count=Count("supporters"))
-            .order_by("domain__name", "-supporters_count")
-        )
+        return _get_committee_candidates(user, **filters).order_by("domain__name", "-supporters_count")
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -304,6 +377,103 @@ class CommitteeCandidatesListView(LoginRequiredMixin, SearchMixin):
         return context
 
 
+class CommitteeReviewQueueView(LoginRequiredMixin, MenuMixin, TemplateView):
+    """
+    The accepted candidates which the user hasn't confirmed yet, reviewed one after the other from the keyboard.
+    The page loads the queue in batches from the JSON endpoint, ahead of the candidate being reviewed.
+    """
+
+    template_name = "hub/committee/review_queue.html"
+    prefetch_size = 5
+
+    def dispatch(self, request, *args, **kwargs):
+        user = request.user
+        if user.is_authenticated and not user.in_committee_or_staff_groups():
+            raise PermissionDenied
+
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["filtering"] = "review-queue"
+        context["counters"] = _get_candidates_counters()
+        context["prefetch_size"] = self.prefetch_size
+        return context
+
+
+class CommitteeReviewQueueItemsView(LoginRequiredMixin, View):
+    def get(self, request):
+        user = request.user
+        if not user.in_committee_or_staff_groups():
+            raise PermissionDenied
+
+        try:
+            after_pk = int(request.GET.get("after", 0))
+            limit = max(1, min(int(request.GET.get("limit", CommitteeReviewQueueView.prefetch_size)), 50))
+        except ValueError:
+            raise Http404
+
+        candidates = (
+            _get_committee_candidates(user, status=Candidate.STATUS.accepted, pk__gt=after_pk)
+            .filter(viewer_confirmed=False)
+            .order_by("pk")[:limit]
+        )
+
+        items = [
+            {
+                "id": candidate.pk,
+                "name": candidate.name,
+                "role": candidate.role,
+                "organization": candidate.org.name,
+                "domain": candidate.domain.name if candidate.domain else "",
+                "photo": candidate.photo.url if candidate.photo else "",
+                "supporters": candidate.supporters_count,
+                "confirmations": candidate.confirmations_count,
+                "detail_url": reverse("candidate-detail", args=[candidate.pk]),
+                "confirm_url": reverse("candidate-status-confirm", args=[candidate.pk]),
+            }
+            for candidate in candidates
+        ]
+
+        return JsonResponse({"items": items})
+
+
+class CommitteeDocumentsExportView(LoginRequiredMixin, View):
+    """
+    Stream a ZIP archive with the documents of the organizations or candidates in a committee list,
+    using the same filters as the list, optionally narrowed down to the given "id" values
+    """
+
+    def get(self, request, model_name: str):
+        user = request.user
+        if not user.in_committee_or_staff_groups():
+            raise PermissionDenied
+
+        try:
+            pks = [int(pk) for pk in request.GET.getlist("id")]
+        except ValueError:
+            raise Http404
+
+        if model_name == "organization":
+            filters = CommitteeOrganizationListView.get_filters(request.GET)
+            queryset = Organization.objects.filter(**(filters or {"status": Organization.STATUS.pending}))
+        elif model_name == "candidate":
+            filters = {
+                name: request.GET[name] for name in CommitteeCandidatesListView.allow_filters if request.GET.get(name)
+            }
+            queryset = Candidate.proposed.filter(**filters)
+        else:
+            raise Http404
+
+        if pks:
+            queryset = queryset.filter(pk__in=pks)
+
+        if model_name == "organization":
+            return organizations_documents_response(queryset)
+
+        return candidates_documents_response(queryset)
+
+
 class ElectorCandidatesListView(LoginRequiredMixin, SearchMixin):
     allow_filters = ["status"]
     paginate_by = 9
@@ -312,31 +482,43 @@ class ElectorCandidatesListView(LoginRequiredMixin, SearchMixin):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        domains = []
+        domains = Domain.objects.order_by("id")
 
         if FeatureFlag.flag_enabled(SETTINGS_CHOICES.enable_voting_domain):
-            user_org = self.request.user.organization
-            if user_org and user_org.voting_domain:
-                domains = [user_org.voting_domain]
-        else:
-            domains = Domain.objects.order_by("id").all()
+            organization = get_viewer_profile(self.request.user)["organization"]
+            voting_domain_id = organization["voting_domain_id"] if organization else None
+            domains = domains.filter(pk=voting_domain_id) if voting_domain_id else Domain.objects.none()
 
         context["domains"] = domains
 
         return context
 
     def get_queryset(self):
-        if not self.request.user.groups.filter(name__in=[NGO_GROUP, NGO_USERS_GROUP]).exists():
+        viewer_profile = get_viewer_profile(self.request.user)
+        if not viewer_profile["roles"]["ngo"]:
             raise PermissionDenied
 
-        voted_candidates = CandidateVote.objects.filter(organization__pk=self.request.user.organization_id)
-        return [element.candidate for element in voted_candidates]
+        if not viewer_profile["organization"]:
+            return Candidate.objects.none()
+
+        return (
+            Candidate.objects.filter(votes__organization_id=viewer_profile["organization"]["id"])
+            .select_related("org", "domain")
+            .order_by("domain__name", "name")
+        )
 
 
-class OrganizationListView(SearchMixin):
+class OrganizationListView(ConditionalGetMixin, PageCacheMixin, SearchMixin):
+    read_replica = True
     allow_filters = ["county", "city"]
     paginate_by = 9
     template_name = "hub/ngo/list.html"
+    page_cache_tags = (PAGE_CACHE_TAG_ORGANIZATIONS,)
+    cache_control = {"public": True, "max_age": settings.TIMEOUT_CACHE_SHORT}
+
+    def get_page_state(self) -> Dict[str, Any]:
+        # The status changes move the organizations out of the listing, so all of them are checked
+        return {**get_rows_state(Organization.objects.all(), "modified"), "domains": _get_domains_state()}
 
     def get(self, request, *args, **kwargs):
         response = super().get(request, *args, **kwargs)
@@ -349,10 +531,13 @@ class OrganizationListView(SearchMixin):
     def get_qs(self):
         return Organization.objects.filter(status=Organization.STATUS.accepted)
 
-    def get_queryset(self):
+    def get_filtered_queryset(self) -> QuerySet[Organization]:
         queryset = self.search(self.get_qs())
         filters = {name: self.request.GET[name] for name in self.allow_filters if self.request.GET.get(name)}
-        queryset_filtered = queryset.filter(**filters)
+        return queryset.filter(**filters)
+
+    def get_queryset(self):
+        queryset_filtered = self.get_filtered_queryset()
 
         if FeatureFlag.flag_enabled(SETTINGS_CHOICES.enable_voting_domain):
             return group_queryset_by_domain(queryset_filtered, domain_variable_name="voting_domain")
@@ -391,30 +576,71 @@ class OrganizationListView(SearchMixin):
         context = super().get_context_data(**kwargs)
         orgs: QuerySet[Organization] = self.search(self.get_qs())
 
-        context["current_search"] = self.request.GET.get("q", "").strip()[:100]
-        context["current_county"] = self.request.GET.get("county")
-        context["current_city"] = self.request.GET.get("city")
+        context.update(self.get_listing_context())
+
+        context_cache = self.get_cached_context(self.get_context_cache_key(), orgs)
+        context.update(context_cache)
+
+        return context
+
+    def _get_listing_param_hash(self) -> str:
+        current_search = self.request.GET.get("q", "").strip()[:100]
+        current_county = self.request.GET.get("county")
+        current_city = self.request.GET.get("city")
 
         # noinspection InsecureHash
-        param_hash = hashlib.sha256(
-            f"{context['current_county'] or ''}_{context['current_city'] or ''}_{context['current_search']}".encode()
-        ).hexdigest()
+        return hashlib.sha256(f"{current_county or ''}_{current_city or ''}_{current_search}".encode()).hexdigest()
 
-        context["listing_cache_duration"] = settings.TIMEOUT_CACHE_SHORT
-        context["listing_cache_key"] = f"orgs_listing_{param_hash}"
-        context_cache_key = f"orgs_listing_context_{param_hash}"
+    def get_listing_context(self) -> Dict:
+        return {
+            "current_search": self.request.GET.get("q", "").strip()[:100],
+            "current_county": self.request.GET.get("county"),
+            "current_city": self.request.GET.get("city"),
+            "listing_cache_duration": settings.TIMEOUT_CACHE_SHORT,
+            "listing_cache_key": f"orgs_listing_{self._get_listing_param_hash()}",
+        }
 
-        context_cache = self.get_cached_context(context_cache_key, orgs)
-        context.update(context_cache)
+    def get_context_cache_key(self) -> str:
+        return f"orgs_listing_context_{self._get_listing_param_hash()}"
+
+
+ORGANIZATION_DOCUMENT_FIELDS = (
+    "last_balance_sheet",
+    "statute",
+    "fiscal_certificate_anaf",
+    "fiscal_certificate_local",
+    "report_2023",
+    "report_2022",
+    "report_2021",
+    "statement_discrimination",
+    "statement_political",
+)
+CANDIDATE_PUBLIC_DOCUMENT_FIELDS = ("mandate", "letter_of_intent", "cv", "declaration_of_interests", "statement")
+CANDIDATE_SECRET_DOCUMENT_FIELDS = ("fiscal_record", "criminal_record")
 
-        return context
 
+def _get_organization_document_urls(organization: Organization) -> Dict[str, str]:
+    # All the organization documents are only displayed to the committee and the staff
+    return get_document_urls(organization, ORGANIZATION_DOCUMENT_FIELDS, VIEWER_CLASS_COMMITTEE)
 
-class OrganizationDetailView(HubDetailView):
+
+class OrganizationDetailView(ConditionalGetMixin, PageCacheMixin, HubDetailView):
+    read_replica = True
     template_name = "hub/ngo/detail.html"
     context_object_name = "ngo"
     model = Organization
 
+    def get_page_cache_tags(self) -> List[str]:
+        return super().get_page_cache_tags() + [get_organization_tag(self.kwargs["pk"])]
+
+    def get_page_state(self) -> Dict[str, Any]:
+        # The page also links the candidate of the organization
+        return get_rows_state(
+            Organization.objects.filter(pk=self.kwargs["pk"], status=Organization.STATUS.accepted),
+            "modified",
+            "candidate__modified",
+        )
+
     def get_queryset(self):
         user: User = self.request.user
 
@@ -432,12 +658,14 @@ class OrganizationDetailView(HubDetailView):
 
         context["can_view_all_information"] = False
         context["should_display_organization_documents"] = False
+        context["organization_document_urls"] = {}
 
         if user.is_anonymous:
             return context
 
         if user.in_committee_or_staff_groups():
             context["can_view_all_information"] = True
+            context["organization_document_urls"] = _get_organization_document_urls(organization)
 
         if (
             organization.report_2023
@@ -599,10 +827,18 @@ def organization_vote(request, pk, action):
         return redirect("ngo-detail", pk=pk)
 
 
-class CandidateListView(SearchMixin):
+class CandidateListView(ConditionalGetMixin, PageCacheMixin, SearchMixin):
+    read_replica = True
     allow_filters = ["domain"]
     paginate_by = 200
     template_name = "hub/candidate/list.html"
+    cache_control = {"public": True, "max_age": settings.TIMEOUT_CACHE_SHORT}
+
+    def get_page_cache_tags(self) -> List[str]:
+        return super().get_page_cache_tags() + [get_candidates_listing_tag(self.request.GET.get("domain"))]
+
+    def get_page_state(self) -> Dict[str, Any]:
+        return _get_candidates_listing_state()
 
     @classmethod
     def get_candidates_to_vote(cls):
@@ -638,12 +874,15 @@ class CandidateListView(SearchMixin):
 
         return self.get_candidates_proposed()
 
-    def get_queryset(self):
-        qs = self.search(self.get_qs())
+    def get_filtered_queryset(self, qs: QuerySet[Candidate]) -> QuerySet[Candidate]:
+        qs = self.search(qs)
 
         filters = {name: self.request.GET[name] for name in self.allow_filters if self.request.GET.get(name)}
 
-        queryset_filtered = qs.filter(**filters)
+        return qs.filter(**filters)
+
+    def get_queryset(self):
+        queryset_filtered = self.get_filtered_queryset(self.get_qs())
 
         if not FeatureFlag.flag_enabled(SETTINGS_CHOICES.single_domain_round):
             return group_queryset_by_domain(queryset_filtered, domain_variable_name="domain")
@@ -673,51 +912,72 @@ class CandidateListView(SearchMixin):
 
         context["counters"] = self._get_candidate_counters()
         context["domains"] = Domain.objects.all()
-        context["listing_cache_duration"] = settings.TIMEOUT_CACHE_SHORT
+        context.update(self.get_listing_context())
+
+        return context
+
+    def get_listing_context(self) -> Dict:
+        current_search = self.request.GET.get("q", "")
+        current_domain = self.request.GET.get("domain")
+
         # noinspection InsecureHash
-        context["listing_cache_key"] = hashlib.sha256(
-            f"candidates_listing_{current_domain if current_domain else ''}_{context['current_search']}".encode()
+        listing_cache_key = hashlib.sha256(
+            f"candidates_listing_{current_domain if current_domain else ''}_{current_search}".encode()
         ).hexdigest()
 
-        return context
+        return {
+            "listing_cache_duration": settings.TIMEOUT_CACHE_SHORT,
+            "listing_cache_key": listing_cache_key,
+        }
 
 
 class CandidatesAllListView(CandidateListView):
     template_name = "hub/candidate/all.html"
 
     def get_queryset(self):
-        qs = self.search(self.get_candidates_proposed())
-
-        filters = {name: self.request.GET[name] for name in self.allow_filters if self.request.GET.get(name)}
-
-        queryset_filtered = qs.filter(**filters)
+        queryset_filtered = self.get_filtered_queryset(self.get_candidates_proposed())
 
         queryset_filtered = queryset_filtered.order_by("status", "domain__id", "name")
 
         return queryset_filtered
 
 
-class CandidateResultsView(SearchMixin):
+class CandidateResultsView(ConditionalGetMixin, PageCacheMixin, SearchMixin):
+    read_replica = True
     allow_filters = ["domain"]
     paginate_by = 100
     template_name = "hub/candidate/results.html"
+    cache_control = {"public": True, "max_age": settings.TIMEOUT_CACHE_SHORT}
+
+    def get_page_cache_tags(self) -> List[str]:
+        return super().get_page_cache_tags() + [get_candidates_listing_tag(self.request.GET.get("domain"))]
+
+    def get_page_state(self) -> Dict[str, Any]:
+        return {**_get_candidates_listing_state(), "votes": get_rows_state(CandidateVote.objects.all(), "modified")}
+
+    @classmethod
+    def get_candidates_results(cls):
+        return Candidate.objects_with_org.filter(
+            org__status=Organization.STATUS.accepted,
+            status=Candidate.STATUS.confirmed,
+            is_proposed=True,
+        )
 
     def get_qs(self):
         if FeatureFlag.flag_enabled("enable_results_display") or (
             not self.request.user.is_anonymous and self.request.user.in_staff_groups()
         ):
-            return Candidate.objects_with_org.filter(
-                org__status=Organization.STATUS.accepted,
-                status=Candidate.STATUS.confirmed,
-                is_proposed=True,
-            )
+            return self.get_candidates_results()
         return Candidate.objects_with_org.none()
 
-    def get_queryset(self):
-        qs = self.search(self.get_qs())
+    def get_filtered_queryset(self, qs: QuerySet[Candidate]) -> QuerySet[Candidate]:
+        qs = self.search(qs)
         filters = {name: self.request.GET[name] for name in self.allow_filters if self.request.GET.get(name)}
         return qs.filter(**filters)
 
+    def get_queryset(self):
+        return self.get_filtered_queryset(self.get_qs())
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context["current_search"] = self.request.GET.get("q", "")
@@ -733,11 +993,33 @@ class CandidateResultsView(SearchMixin):
         return context
 
 
-class CandidateDetailView(HubDetailView):
+class CandidateDetailView(ConditionalGetMixin, PageCacheMixin, HubDetailView):
+    read_replica = True
     template_name = "hub/candidate/detail.html"
     context_object_name = "candidate"
     model = Candidate
 
+    def get_page_cache_tags(self) -> List[str]:
+        return super().get_page_cache_tags() + [get_candidate_tag(self.kwargs["pk"])]
+
+    def get_page_state(self) -> Dict[str, Any]:
+        page_state = get_rows_state(
+            Candidate.objects_with_org.filter(
+                pk=self.kwargs["pk"], org__status=Organization.STATUS.accepted, is_proposed=True
+            ),
+            "modified",
+            "org__modified",
+        )
+
+        # The copy of the page kept by the browser must not link the documents through expired signed URLs
+        page_state["signed_urls"] = int(timezone.now().timestamp()) // max(settings.SIGNED_URL_MIN_VALIDITY, 1)
+
+        return page_state
+
+    def get_page_cache_timeout(self) -> int:
+        # The page links the documents through signed URLs, which must still be valid when the page is displayed
+        return min(super().get_page_cache_timeout(), settings.SIGNED_URL_MIN_VALIDITY)
+
     def get_queryset(self):
         user = self.request.user
         candidat_base_queryset = Candidate.objects_with_org.select_related("org").prefetch_related("domain")
@@ -807,7 +1089,8 @@ class CandidateDetailView(HubDetailView):
 
         context["can_approve_candidate"] = True
 
-        if CandidateConfirmation.objects.filter(user=user, candidate=candidate).exists():
+        # Shared with the validation label of the template
+        if get_viewer_permissions(self.request).has_confirmed(candidate):
             context["approved_candidate"] = True
 
         return context
@@ -923,6 +1206,10 @@ class CandidateDetailView(HubDetailView):
         context["candidate_status"] = candidate_status
         context["display_candidate_validation_label"] = False
         context["candidate_status_explainer"] = self._build_candidate_status_explainer()[candidate.status]
+        context["candidate_document_urls"] = get_document_urls(
+            candidate, CANDIDATE_PUBLIC_DOCUMENT_FIELDS, VIEWER_CLASS_PUBLIC
+        )
+        context["organization_document_urls"] = {}
 
         if user.is_anonymous:
             return context
@@ -941,6 +1228,12 @@ class CandidateDetailView(HubDetailView):
 
         if user.in_committee_or_staff_groups():
             context["can_view_all_information"] = True
+            context["candidate_document_urls"] = get_document_urls(
+                candidate,
+                CANDIDATE_PUBLIC_DOCUMENT_FIELDS + CANDIDATE_SECRET_DOCUMENT_FIELDS,
+                VIEWER_CLASS_COMMITTEE,
+            )
+            context["organization_document_urls"] = _get_organization_document_urls(candidate.org)
 
         if user.in_commission_groups() and candidate.status != Candidate.STATUS.pending:
             context["display_candidate_validation_label"] = True
@@ -1019,12 +1312,13 @@ class CandidateUpdateView(LoginRequiredMixin, PermissionRequiredMixin, HubUpdate
         user_org: Organization = user.organization
         candidate: Candidate = self.object
 
+        # The stored completeness state is refreshed whenever the organization or the candidate are saved
         if (
             FeatureFlag.flag_enabled(PHASE_CHOICES.enable_candidate_registration)
             and user_org
-            and user_org.is_complete_for_candidate
+            and user_org.completed_for_candidate
             and candidate
-            and candidate.is_complete
+            and candidate.completed
         ):
             can_propose_candidate = True
 
@@ -1034,13 +1328,15 @@ class CandidateUpdateView(LoginRequiredMixin, PermissionRequiredMixin, HubUpdate
         candidate_missing_fields = []
 
         if not can_propose_candidate:
-            if user_org and not user_org.is_complete_for_candidate:
-                organization_missing_fields = user_org.get_missing_fields_for_candidate()
-                organization_missing_fields = [f"'{str(field.verbose_name)}'" for field in organization_missing_fields]
+            if user_org and not user_org.completed_for_candidate:
+                organization_missing_fields = [
+                    f"'{verbose_name}'" for verbose_name in user_org.get_missing_fields_verbose_names()
+                ]
 
-            if candidate and not candidate.is_complete:
-                candidate_missing_fields = candidate.get_missing_fields()
-                candidate_missing_fields = [f"'{str(field.verbose_name)}'" for field in candidate_missing_fields]
+            if candidate and not candidate.completed:
+                candidate_missing_fields = [
+                    f"'{verbose_name}'" for verbose_name in candidate.get_missing_fields_verbose_names()
+                ]
 
         if organization_missing_fields or candidate_missing_fields:
             context["organization_missing_fields"] = ", ".join(organization_missing_fields)
@@ -1092,7 +1388,8 @@ def candidate_vote(request, pk):
         raise PermissionDenied(_("A candidate can't be voted twice by the same organization."))
 
     try:
-        vote = CandidateVote.objects.create(user=request.user, organization=user_org, candidate=candidate)
+        with trace("election.vote", "Vote the candidate", candidate_id=candidate.pk):
+            vote = CandidateVote.objects.create(user=request.user, organization=user_org, candidate=candidate)
     except Exception:
         raise PermissionDenied
 
@@ -1150,11 +1447,12 @@ def candidate_support(request, pk):
     if candidate.org == user_org:
         return redirect("candidate-detail", pk=pk)
 
-    supporter = CandidateSupporter.objects.filter(user__pk__in=request.user.org_user_pks(), candidate=candidate)
-    if supporter.exists():
-        supporter.delete()
-    else:
-        CandidateSupporter.objects.create(user=request.user, candidate=candidate)
+    with trace("election.support", "Support the candidate", candidate_id=candidate.pk):
+        supporter = CandidateSupporter.objects.filter(user__pk__in=request.user.org_user_pks(), candidate=candidate)
+        if supporter.exists():
+            supporter.delete()
+        else:
+            CandidateSupporter.objects.create(user=request.user, candidate=candidate)
 
     return redirect("candidate-detail", pk=pk)
 
@@ -1203,8 +1501,11 @@ def reset_candidate_confirmations(
     if request.user.pk != user_request_pk:
         raise PermissionDenied(_("Cannot delete another user's confirmations"))
 
-    for confirmation in CandidateConfirmation.objects.filter(user=request.user):
-        confirmation.delete()
+    user_confirmations = CandidateConfirmation.objects.filter(user=request.user)
+    with transaction.atomic():
+        confirmed_candidates_pks: List[int] = list(user_confirmations.values_list("candidate_id", flat=True))
+        CandidateConfirmation.bulk_delete(user_confirmations)
+        bulk_updated.send(sender=Candidate, pks=confirmed_candidates_pks)
 
     messages.success(request, _("Confirmations successfully deleted"))
 
@@ -1244,6 +1545,29 @@ def update_organization_information(request, pk):
     return redirect(redirect_path)
 
 
+class DirectUploadView(LoginRequiredMixin, View):
+    """
+    Presign the upload of a document straight to the storage, for a user who can change the document's owner
+    """
+
+    def post(self, request, model_name: str, pk: int, field_name: str):
+        if not settings.ENABLE_DIRECT_UPLOADS or model_name not in DIRECT_UPLOAD_MODELS:
+            raise Http404
+
+        instance = get_object_or_404(DIRECT_UPLOAD_MODELS[model_name], pk=pk)
+        if not get_direct_upload_file_field(instance, field_name):
+            raise Http404
+
+        if not request.user.has_perm(f"hub.change_{model_name}", instance):
+            raise PermissionDenied
+
+        filename: str = request.POST.get("filename", "")
+        if not filename:
+            return JsonResponse({"error": _("The file name is missing.")}, status=400)
+
+        return JsonResponse(create_presigned_upload(instance, field_name, filename))
+
+
 class CityAutocomplete(View):
     def get(self, request):
         response = []
@@ -1254,10 +1578,17 @@ class CityAutocomplete(View):
         return JsonResponse(response, safe=False)
 
 
-class BlogListView(MenuMixin, ListView):
+class BlogListView(ConditionalGetMixin, PageCacheMixin, MenuMixin, ListView):
+    read_replica = True
     model = BlogPost
     template_name = "hub/blog/list.html"
     paginate_by = 9
+    page_cache_tags = (PAGE_CACHE_TAG_BLOG,)
+    cache_control = {"public": True, "max_age": settings.TIMEOUT_CACHE_SHORT}
+
+    def get_page_state(self) -> Dict[str, Any]:
+        # The posts are published at the beginning of their publishing date
+        return {**get_rows_state(BlogPost.objects.all(), "modified"), "date": timezone.now().date()}
 
     def get_queryset(self):
         return BlogPost.objects.filter(is_visible=True, published_date__lte=timezone.now().date()).order_by(
@@ -1265,9 +1596,15 @@ class BlogListView(MenuMixin, ListView):
         )
 
 
-class BlogPostView(MenuMixin, DetailView):
+class BlogPostView(ConditionalGetMixin, PageCacheMixin, MenuMixin, DetailView):
+    read_replica = True
     model = BlogPost
     template_name = "hub/blog/post.html"
+    page_cache_tags = (PAGE_CACHE_TAG_BLOG,)
+    cache_control = {"public": True, "max_age": settings.TIMEOUT_CACHE_SHORT}
+
+    def get_page_state(self) -> Dict[str, Any]:
+        return get_rows_state(self.get_queryset().filter(slug=self.kwargs["slug"]), "modified")
 
     def get_queryset(self):
         return BlogPost.objects.filter(is_visible=True, published_date__lte=timezone.now().date())
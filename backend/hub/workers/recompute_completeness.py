@@ -0,0 +1,32 @@
+import logging
+
+from django.conf import settings
+from django_q.tasks import async_task
+
+from hub.models import FLAG_CHOICES, Candidate, Organization
+
+logger = logging.getLogger(__name__)
+
+# The feature flags which change the required fields of the organizations and candidates
+COMPLETENESS_FLAGS = (FLAG_CHOICES.enable_voting_domain,)
+
+
+def recompute_completeness_process():
+    organizations_count: int = Organization.recompute_completeness(Organization.objects.all())
+    candidates_count: int = Candidate.recompute_completeness(Candidate.objects.all())
+
+    logger.info(
+        f"Recomputed the completeness state, updated {organizations_count} organizations "
+        f"and {candidates_count} candidates."
+    )
+
+
+def recompute_completeness():
+    """
+    Recompute the stored completeness state of all the organizations and candidates
+    (asynchronously, like the organization updates)
+    """
+    if settings.UPDATE_ORGANIZATION_METHOD == "async":
+        async_task(recompute_completeness_process, cluster=settings.BACKGROUND_QUEUE_BATCH)
+    else:
+        recompute_completeness_process()
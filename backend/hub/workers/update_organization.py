@@ -15,7 +15,10 @@ from requests import Response
 
 from accounts.models import STAFF_GROUP, SUPPORT_GROUP, User
 from civil_society_vote.common.cache import cache_decorator
+from civil_society_vote.common.instrumentation import SERVICE_NGOHUB, measure_service_call
+from civil_society_vote.common.metrics import NGOHUB_UPDATES
 from civil_society_vote.common.messaging import send_email
+from civil_society_vote.common.tracing import trace
 from hub.exceptions import NGOHubHTTPException
 from hub.models import City, FeatureFlag, Organization
 from django.utils.translation import gettext as _
@@ -73,7 +76,10 @@ def copy_file_to_organization(organization: Organization, signed_file_url: str,
         logger.info(f"{file_type.upper()} file is already up to date.")
         return None
 
-    response: Response = requests.get(signed_file_url)
+    with trace("http.client", f"Download the {file_type} file from NGO Hub") as span:
+        with measure_service_call(SERVICE_NGOHUB):
+            response: Response = requests.get(signed_file_url)
+        span.set_http_status(response.status_code)
     if response.status_code != requests.codes.ok:
         logger.info(f"{file_type.upper()} file request status = {response.status_code}")
         error_message = f"ERROR: Could not download {file_type} file from NGO Hub, error status {response.status_code}."
@@ -85,7 +91,8 @@ def copy_file_to_organization(organization: Organization, signed_file_url: str,
     with tempfile.TemporaryFile() as fp:
         fp.write(response.content)
         fp.seek(0)
-        getattr(organization, file_type).save(f"{file_type}{extension}", File(fp))
+        with trace("file.upload", f"Save the {file_type} file", size=len(response.content)):
+            getattr(organization, file_type).save(f"{file_type}{extension}", File(fp))
 
     organization.filename_cache[file_type] = filename
 
@@ -99,7 +106,8 @@ def authenticate_with_ngohub() -> str:
         username=settings.NGOHUB_API_ACCOUNT,
         user_pool_region=settings.AWS_COGNITO_REGION,
     )
-    u.authenticate(password=settings.NGOHUB_API_KEY)
+    with trace("auth", "Authenticate with NGO Hub"), measure_service_call(SERVICE_NGOHUB):
+        u.authenticate(password=settings.NGOHUB_API_KEY)
 
     return u.id_token
 
@@ -116,7 +124,10 @@ def get_ngo_hub_data(ngohub_org_id: int, token: str = "") -> Dict:
         request_url: str = settings.NGOHUB_API_BASE + f"/organization/{ngohub_org_id}"
 
     auth_headers = {"Authorization": f"Bearer {token}"}
-    response: Response = requests.get(request_url, headers=auth_headers)
+    with trace("http.client", "Get the organization from NGO Hub", ngohub_org_id=ngohub_org_id) as span:
+        with measure_service_call(SERVICE_NGOHUB):
+            response: Response = requests.get(request_url, headers=auth_headers)
+        span.set_http_status(response.status_code)
 
     if response.status_code != requests.codes.ok:
         raise NGOHubHTTPException
@@ -125,6 +136,19 @@ def get_ngo_hub_data(ngohub_org_id: int, token: str = "") -> Dict:
 
 
 def update_organization_process(organization_id: int, token: str = ""):
+    try:
+        with trace("queue.task", "update_organization_process", organization_id=organization_id):
+            task_result: Dict[str, any] = _update_organization_process(organization_id, token)
+    except Exception:
+        NGOHUB_UPDATES.labels(result="failure").inc()
+        raise
+
+    NGOHUB_UPDATES.labels(result="errors" if task_result.get("errors") else "success").inc()
+
+    return task_result
+
+
+def _update_organization_process(organization_id: int, token: str = ""):
     errors: List[str] = []
     task_result: Dict[str, any] = {"organization_id": organization_id}
 
@@ -259,7 +283,7 @@ def update_organization(organization_id: int, token: str = ""):
     Update the organization with the given ID asynchronously.
     """
     if settings.UPDATE_ORGANIZATION_METHOD == "async":
-        async_task(update_organization_process, organization_id, token)
+        async_task(update_organization_process, organization_id, token, cluster=settings.BACKGROUND_QUEUE_NGOHUB)
     else:
         update_organization_process(organization_id, token)
 
@@ -320,5 +344,6 @@ def start_organization_update_schedule():
         schedule_type=Schedule.CRON,
         cron=cron_every_hour_at_past_10,
         repeats=-1,
+        cluster=settings.BACKGROUND_QUEUE_NGOHUB,
         next_run=timezone.now() + timezone.timedelta(seconds=30),
     )
@@ -41,3 +41,67 @@ document.addEventListener("DOMContentLoaded", () => {
     citySelect.attr("disabled", false);
   });
 });
+
+// Upload the documents straight to the storage before submitting the form, when direct uploads are enabled
+document.addEventListener("DOMContentLoaded", () => {
+  const directUploadSuffix = "__direct_upload";
+
+  async function directUpload(input, csrfToken) {
+    const file = input.files[0];
+
+    const presignData = new FormData();
+    presignData.append("filename", file.name);
+    const presignResponse = await fetch(input.dataset.directUploadUrl, {
+      method: "POST",
+      credentials: "same-origin",
+      headers: { "X-CSRFToken": csrfToken },
+      body: presignData,
+    });
+    if (!presignResponse.ok) {
+      throw new Error(`Could not prepare the upload of ${file.name}`);
+    }
+    const presignedUpload = await presignResponse.json();
+
+    const uploadData = new FormData();
+    Object.entries(presignedUpload.fields).forEach(([name, value]) => uploadData.append(name, value));
+    uploadData.append("file", file);
+    const uploadResponse = await fetch(presignedUpload.url, { method: "POST", body: uploadData });
+    if (!uploadResponse.ok) {
+      throw new Error(`Could not upload ${file.name}`);
+    }
+
+    const tokenInput = document.createElement("input");
+    tokenInput.type = "hidden";
+    tokenInput.name = input.name + directUploadSuffix;
+    tokenInput.value = presignedUpload.token;
+    input.form.appendChild(tokenInput);
+
+    // The file isn't sent with the form anymore
+    input.value = "";
+  }
+
+  document.querySelectorAll("form").forEach((form) => {
+    const inputs = form.querySelectorAll("input[type=file][data-direct-upload-url]");
+    if (!inputs.length) {
+      return;
+    }
+
+    form.addEventListener("submit", async (event) => {
+      const selectedInputs = Array.from(inputs).filter((input) => input.files.length > 0);
+      if (!selectedInputs.length) {
+        return;
+      }
+
+      event.preventDefault();
+      const csrfToken = form.querySelector("[name=csrfmiddlewaretoken]").value;
+      try {
+        await Promise.all(selectedInputs.map((input) => directUpload(input, csrfToken)));
+      } catch (error) {
+        alert(error.message);
+        return;
+      }
+
+      form.submit();
+    });
+  });
+});
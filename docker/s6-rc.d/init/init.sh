@@ -20,6 +20,12 @@ is_enabled() {
 
 cd "${BACKEND_ROOT:-/var/www/votong/backend}" || exit 1
 
+# Start the Prometheus metrics from zero, before any Django process writes them
+if [ -n "${PROMETHEUS_MULTIPROC_DIR}" ]; then
+    rm -rf "${PROMETHEUS_MULTIPROC_DIR}"
+    mkdir -p "${PROMETHEUS_MULTIPROC_DIR}"
+fi
+
 echo "Running Django self-checks"
 python3 manage.py check
 
@@ -28,6 +34,7 @@ if is_enabled "${RUN_MIGRATIONS:-False}"; then
     echo "Migrating database"
     python3 manage.py migrate --run-syncdb
     python3 manage.py createcachetable
+    python3 manage.py recompute_completeness
 fi
 
 # Compile the translation messages